@@ -16,11 +16,19 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import sys
+
+if __name__ == "__main__" and '--daemon' in sys.argv[1:]:
+    # Headless: dispatched before importing gi, as bin/gwe does, so that python -m gwe --daemon doesn't load Gtk
+    from gwe import daemon
+
+    sys.exit(daemon.main())
+
+# pylint: disable=wrong-import-position
 import signal
 import locale
 import gettext
 import logging
-import sys
 from types import TracebackType
 from typing import Type
 from os.path import abspath, join, dirname
@@ -30,16 +38,15 @@ from gi.repository import GLib
 from reactivex.disposable import CompositeDisposable
 
 from gwe.conf import APP_PACKAGE_NAME
-from gwe.model.current_fan_profile import CurrentFanProfile
-from gwe.model.current_overclock_profile import CurrentOverclockProfile
-from gwe.model.fan_profile import FanProfile
-from gwe.model.overclock_profile import OverclockProfile
-from gwe.model.setting import Setting
-from gwe.model.speed_step import SpeedStep
+from gwe.model import init_database
 from gwe.util.log import set_log_level
 from gwe.di import INJECTOR
 from gwe.app import Application
+from gwe.repository.fan_command_coalescer import FanCommandCoalescer
+from gwe.repository.fan_controller import FanController
+from gwe.repository.fan_watchdog import FanWatchdog
 from gwe.repository.nvidia_repository import NvidiaRepository
+from gwe.view.di import ViewProviderModule
 
 WHERE_AM_I = abspath(dirname(__file__))
 LOCALE_DIR = join(WHERE_AM_I, 'mo')
@@ -61,8 +68,13 @@ def _cleanup() -> None:
         _LOG.debug("cleanup")
         composite_disposable = INJECTOR.get(CompositeDisposable)
         composite_disposable.dispose()
+        # Stopped first, so that no fan write can follow the switch to auto
+        INJECTOR.get(FanWatchdog).stop()
+        INJECTOR.get(FanController).stop()
+        INJECTOR.get(FanCommandCoalescer).stop()
         nvidia_repository = INJECTOR.get(NvidiaRepository)
         nvidia_repository.set_all_gpus_fan_to_auto()
+        nvidia_repository.close()
         database = INJECTOR.get(SqliteDatabase)
         database.close()
         # futures.thread._threads_queues.clear()
@@ -83,21 +95,10 @@ def handle_exception(type_: Type[BaseException], value: BaseException, traceback
 sys.excepthook = handle_exception
 
 
-def _init_database() -> None:
-    database = INJECTOR.get(SqliteDatabase)
-    database.create_tables([
-        SpeedStep,
-        FanProfile,
-        CurrentFanProfile,
-        OverclockProfile,
-        CurrentOverclockProfile,
-        Setting
-    ])
-
-
 def main() -> int:
     _LOG.debug("main")
-    _init_database()
+    init_database()
+    INJECTOR.binder.install(ViewProviderModule())
     application: Application = INJECTOR.get(Application)
     GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGINT, application.quit)
     exit_status = application.run(sys.argv)
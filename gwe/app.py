@@ -23,12 +23,15 @@ from gettext import gettext as _
 from typing import Any, Optional, List
 from injector import inject, singleton
 from gwe.conf import APP_NAME, APP_ID, APP_VERSION, APP_ICON_NAME
-from gwe.di import MainBuilder
+from gwe.view.di import MainBuilder
 from gwe.model import load_fan_db_default_data, load_overclock_db_default_data
 from gwe.model.fan_profile import FanProfile
 from gwe.model.overclock_profile import OverclockProfile
 from gwe.presenter.main_presenter import MainPresenter
+from gwe.repository.fan_command_coalescer import FanCommandCoalescer
+from gwe.repository.fan_watchdog import FanWatchdog
 from gwe.repository.nvidia_repository import NvidiaRepository
+from gwe.repository.telemetry_backend import TelemetryBackendType
 from gwe.util.deployment import is_flatpak
 from gwe.util.desktop_entry import set_autostart_entry, add_application_entry
 from gwe.util.log import LOG_DEBUG_FORMAT
@@ -49,6 +52,8 @@ class Application(Gtk.Application):
                  presenter: MainPresenter,
                  builder: MainBuilder,
                  nvidia_repository: NvidiaRepository,
+                 fan_command_coalescer: FanCommandCoalescer,
+                 fan_watchdog: FanWatchdog,
                  *args: Any,
                  **kwargs: Any) -> None:
         _LOG.debug("init Application")
@@ -65,6 +70,8 @@ class Application(Gtk.Application):
         self._view = view
         self._presenter = presenter
         self._nvidia_repository = nvidia_repository
+        self._fan_command_coalescer = fan_command_coalescer
+        self._fan_watchdog = fan_watchdog
         self._window: Optional[Gtk.ApplicationWindow] = None
         self._builder: Gtk.Builder = builder
         self._start_hidden: bool = False
@@ -124,6 +131,41 @@ class Application(Gtk.Application):
             _LOG.debug(f"Option {_Options.CTRL_DISPLAY.value} selected: {param}")
             self._nvidia_repository.set_ctrl_display(param)
 
+        if _Options.BACKEND.value in options:
+            param = options[_Options.BACKEND.value]
+            _LOG.debug(f"Option {_Options.BACKEND.value} selected: {param}")
+            try:
+                self._nvidia_repository.set_backend_type(TelemetryBackendType(param))
+            except ValueError:
+                _LOG.error(f"Unknown telemetry backend {param}, valid values are: "
+                           f"{', '.join(backend.value for backend in TelemetryBackendType)}")
+                exit_value = 1
+                start_app = False
+
+        simulated_gpus = options.get(_Options.SIMULATED_GPUS.value)
+        simulated_fans = options.get(_Options.SIMULATED_FANS.value)
+        simulated_latency = options.get(_Options.SIMULATED_LATENCY.value)
+        if simulated_gpus is not None or simulated_fans is not None or simulated_latency is not None:
+            _LOG.debug(f"Simulation options selected: gpus={simulated_gpus}, fans={simulated_fans}, "
+                       f"latency={simulated_latency}")
+            self._nvidia_repository.set_simulation(simulated_gpus, simulated_fans, simulated_latency)
+
+        if _Options.PRIVILEGED_HELPER.value in options:
+            _LOG.debug(f"Option {_Options.PRIVILEGED_HELPER.value} selected")
+            self._nvidia_repository.set_privileged_helper_enabled(True)
+
+        if _Options.PARALLEL_SAMPLING.value in options:
+            _LOG.debug(f"Option {_Options.PARALLEL_SAMPLING.value} selected")
+            self._nvidia_repository.set_parallel_sampling(True)
+
+        if _Options.DUMP_METRICS.value in options:
+            _LOG.debug(f"Option {_Options.DUMP_METRICS.value} selected")
+            # When GWE is already running, this is executed by the running instance and printed by the caller
+            self._print(command_line, self._nvidia_repository.get_call_metrics().format_table())
+            self._print(command_line, self._fan_command_coalescer.format_write_rate())
+            self._print(command_line, self._fan_watchdog.format_sample_ages())
+            start_app = False
+
         if _Options.DELAY.value in options:
             sleep(3)
 
@@ -131,6 +173,11 @@ class Application(Gtk.Application):
             self.activate()
         return exit_value
 
+    @staticmethod
+    def _print(command_line: Gio.ApplicationCommandLine, text: str) -> None:
+        # g_application_command_line_print() is variadic and reaches Python as print_literal()
+        command_line.print_literal(text + '\n')
+
     @staticmethod
     def _get_main_option_entries() -> List[GLib.OptionEntry]:
         options = [
@@ -147,6 +194,30 @@ class Application(Gtk.Application):
                               arg=GLib.OptionArg.STRING,
                               description="Specify the NV-CONTROL display (if you use Bumblebee, set this to \":8\" "
                                           "and start GWE with optirun)"),
+            build_glib_option(_Options.BACKEND.value,
+                              arg=GLib.OptionArg.STRING,
+                              description="Specify the telemetry backend: \"nv-control\" (default), \"nvml\" "
+                                          "(no X server required, overclock not available) or \"simulated\" "
+                                          "(synthetic data, no NVIDIA GPU required)"),
+            build_glib_option(_Options.SIMULATED_GPUS.value,
+                              arg=GLib.OptionArg.INT,
+                              description="Number of GPUs of the simulated backend"),
+            build_glib_option(_Options.SIMULATED_FANS.value,
+                              arg=GLib.OptionArg.INT,
+                              description="Number of fans per GPU of the simulated backend"),
+            build_glib_option(_Options.SIMULATED_LATENCY.value,
+                              arg=GLib.OptionArg.DOUBLE,
+                              description="Latency in milliseconds added to every call of the simulated backend"),
+            build_glib_option(_Options.PRIVILEGED_HELPER.value,
+                              description="Apply the power limit through a privileged helper, started once with "
+                                          "pkexec, instead of running nvidia-smi as root for every change"),
+            build_glib_option(_Options.PARALLEL_SAMPLING.value,
+                              description="Read all the GPUs concurrently, each one with its own NV-CONTROL "
+                                          "connection"),
+            build_glib_option(_Options.DUMP_METRICS.value,
+                              description="Print the call count, error count and latency histogram of every "
+                                          "driver function called by the running instance, its fan writes per hour "
+                                          "and the age of the last reading of every GPU"),
         ]
         if not is_flatpak():
             options.append(build_glib_option(_Options.AUTOSTART_ON.value,
@@ -161,6 +232,13 @@ class _Options(Enum):
     VERSION = 'version'
     HIDE_WINDOW = 'hide-window'
     CTRL_DISPLAY = 'ctrl-display'
+    BACKEND = 'backend'
+    SIMULATED_GPUS = 'simulated-gpus'
+    SIMULATED_FANS = 'simulated-fans'
+    SIMULATED_LATENCY = 'simulated-latency'
+    PARALLEL_SAMPLING = 'parallel-sampling'
+    PRIVILEGED_HELPER = 'privileged-helper'
+    DUMP_METRICS = 'dump-metrics'
     AUTOSTART_ON = 'autostart-on'
     AUTOSTART_OFF = 'autostart-off'
     DELAY = 'delay'
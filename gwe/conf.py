@@ -23,12 +23,14 @@ APP_VERSION = "0.15.9"
 APP_ICON_NAME = APP_ID
 APP_ICON_NAME_SYMBOLIC = APP_ID + "-symbolic"
 APP_DB_NAME = APP_PACKAGE_NAME + ".db"
-APP_DB_VERSION = 1
+APP_DB_VERSION = 2
 APP_MAIN_UI_NAME = "main.glade"
 APP_EDIT_FAN_PROFILE_UI_NAME = "edit_fan_profile.glade"
 APP_EDIT_OC_PROFILE_UI_NAME = "edit_oc_profile.glade"
 APP_HISTORICAL_DATA_UI_NAME = "historical_data.glade"
 APP_PREFERENCES_UI_NAME = "preferences.glade"
+APP_CALL_METRICS_UI_NAME = "call_metrics.glade"
+APP_GPU_PROCESSES_UI_NAME = "gpu_processes.glade"
 APP_DESKTOP_ENTRY_NAME = APP_PACKAGE_NAME + ".desktop"
 APP_DESCRIPTION = 'GUI to control cooling and overclock of nVidia cards'
 APP_SOURCE_URL = 'https://gitlab.com/leinardi/gwe'
@@ -48,7 +50,15 @@ SETTINGS_DEFAULTS: Dict[str, Any] = {
     'settings_load_last_profile': True,
     'settings_minimize_to_tray': True,
     'settings_refresh_interval': 3,
+    'settings_adaptive_refresh': False,
+    'settings_refresh_interval_min': 1,
+    'settings_refresh_interval_max': 10,
     'settings_hysteresis': 2,
+    'settings_fan_smoothing_samples': 1,
+    'settings_fan_smoothing_median': False,
+    'settings_fan_max_slew': 0,
+    'settings_fan_min_dwell': 0,
+    'settings_fan_watchdog_deadline': 30,
     'settings_show_app_indicator': True,
     'settings_app_indicator_show_gpu_temp': True,
 }
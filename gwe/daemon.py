@@ -0,0 +1,214 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import argparse
+import logging
+import signal
+import sys
+import threading
+import time
+from typing import Any, List, Optional
+
+from injector import singleton, inject
+from peewee import SqliteDatabase
+
+from gwe.conf import APP_VERSION
+from gwe.di import INJECTOR
+from gwe.interactor.get_status_interactor import GetStatusInteractor
+from gwe.interactor.settings_interactor import SettingsInteractor
+from gwe.model import init_database
+from gwe.model.current_fan_profile import CurrentFanProfile
+from gwe.model.current_overclock_profile import CurrentOverclockProfile
+from gwe.model.fan_profile import FanProfile
+from gwe.model.fan_profile_type import FanProfileType
+from gwe.model.gpu_fan_profile import GpuFanProfile
+from gwe.model.status import Status
+from gwe.repository.fan_command_coalescer import FanCommandCoalescer
+from gwe.repository.fan_controller import FanController
+from gwe.repository.fan_curve_repository import FanCurveRepository
+from gwe.repository.fan_watchdog import FanWatchdog
+from gwe.repository.nvidia_repository import NvidiaRepository
+from gwe.repository.telemetry_backend import TelemetryBackendType
+from gwe.util.log import set_log_level
+
+_LOG = logging.getLogger(__name__)
+
+
+@singleton
+class Daemon:
+    """Headless fan and overclock control, started with `gwe --daemon`. Only the models, the repositories and the fan
+    control loop are imported: no Gtk, matplotlib or views.
+
+    Applies the persisted fan and overclock profiles and runs the fan control loop until stopped. Like the GUI, the
+    profiles are applied only if "Load last fan and overclock profile" is enabled in the preferences: the fan profile
+    of every GPU, the last fan profile applied for GPU 0 (the GPU the GUI shows on start) if it has none of its own,
+    and the last overclock profile. Having no GPU shown, the overclock profile goes to every GPU that allows it.
+    Changes to the profiles and settings take effect with the next start."""
+
+    @inject
+    def __init__(self,
+                 nvidia_repository: NvidiaRepository,
+                 get_status_interactor: GetStatusInteractor,
+                 settings_interactor: SettingsInteractor,
+                 fan_curve_repository: FanCurveRepository,
+                 fan_controller: FanController,
+                 fan_watchdog: FanWatchdog,
+                 ) -> None:
+        self._nvidia_repository = nvidia_repository
+        self._get_status_interactor = get_status_interactor
+        self._settings_interactor = settings_interactor
+        self._fan_curve_repository = fan_curve_repository
+        self._fan_controller = fan_controller
+        self._fan_watchdog = fan_watchdog
+        self._stop_event = threading.Event()
+
+    def run(self) -> int:
+        self._configure_fan_controller()
+        load_last_profile = self._settings_interactor.get_bool('settings_load_last_profile')
+        if load_last_profile:
+            self._load_gpu_fan_profiles()
+        else:
+            _LOG.info("Loading the last profiles is disabled in the preferences, the fans stay in automatic mode")
+        refresh_interval = self._settings_interactor.get_int('settings_refresh_interval')
+        _LOG.info(f"Fan control started, refresh interval {refresh_interval} s")
+        first_status = load_last_profile
+        next_refresh_time = time.monotonic()
+        while not self._stop_event.is_set():
+            status = self._get_status()
+            if status is not None and first_status:
+                first_status = False
+                self._apply_last_profiles(status)
+            # Scheduled from the previous deadline, so that slow reads don't make the interval drift
+            next_refresh_time = max(next_refresh_time + refresh_interval, time.monotonic())
+            self._stop_event.wait(next_refresh_time - time.monotonic())
+        return 0
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _configure_fan_controller(self) -> None:
+        self._fan_controller.set_hysteresis(self._settings_interactor.get_int('settings_hysteresis'))
+        self._fan_controller.set_temperature_smoothing(
+            self._settings_interactor.get_int('settings_fan_smoothing_samples'),
+            self._settings_interactor.get_bool('settings_fan_smoothing_median'))
+        self._fan_controller.set_duty_limits(self._settings_interactor.get_int('settings_fan_max_slew'),
+                                             self._settings_interactor.get_int('settings_fan_min_dwell'))
+        self._fan_watchdog.set_deadline(self._settings_interactor.get_int('settings_fan_watchdog_deadline'))
+
+    def _get_status(self) -> Optional[Status]:
+        try:
+            return self._get_status_interactor.execute().run()
+        except Exception:  # pylint: disable=broad-except
+            # The watchdog switches the fans to automatic if the readings don't come back
+            _LOG.exception("Error while reading the GPU status")
+            return None
+
+    def _load_gpu_fan_profiles(self) -> None:
+        for gpu_fan_profile in GpuFanProfile.select():
+            self._set_fan_profile(gpu_fan_profile.gpu_uuid, gpu_fan_profile.profile)
+
+    def _apply_last_profiles(self, status: Status) -> None:
+        if not status.gpu_status_list:
+            _LOG.warning("No GPU found")
+            return
+        first_gpu_uuid = status.gpu_status_list[0].info.uuid
+        current_fan_profile = CurrentFanProfile.get_or_none()
+        if current_fan_profile is not None and first_gpu_uuid is not None \
+                and GpuFanProfile.get_or_none(gpu_uuid=first_gpu_uuid) is None:
+            self._set_fan_profile(first_gpu_uuid, current_fan_profile.profile)
+        current_overclock_profile = CurrentOverclockProfile.get_or_none()
+        if current_overclock_profile is None:
+            return
+        profile = current_overclock_profile.profile
+        for gpu_status in status.gpu_status_list:
+            if not gpu_status.overclock.available:
+                continue
+            if self._nvidia_repository.set_overclock(gpu_status.index, gpu_status.overclock.perf_level_max,
+                                                     profile.gpu, profile.memory):
+                _LOG.info(f"{profile.name} overclock profile applied to GPU {gpu_status.index}")
+            else:
+                _LOG.error(f"Unable to apply the {profile.name} overclock profile to GPU {gpu_status.index}")
+
+    def _set_fan_profile(self, gpu_uuid: str, profile: FanProfile) -> None:
+        if profile.type == FanProfileType.AUTO.value:
+            self._fan_controller.set_fan_curve(gpu_uuid, None)
+        else:
+            self._fan_controller.set_fan_curve(gpu_uuid, self._fan_curve_repository.get(profile))
+        _LOG.info(f"{profile.name} fan profile applied to GPU {gpu_uuid}")
+
+
+def _parse_args(args: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='gwe --daemon',
+                                     description="Apply the saved fan and overclock profiles without the GUI")
+    parser.add_argument('--daemon', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--version', '-v', action='version', version=APP_VERSION)
+    parser.add_argument('--debug', action='store_true', help="Show debug messages")
+    parser.add_argument('--ctrl-display', help="Specify the NV-CONTROL display")
+    parser.add_argument('--backend', choices=[backend.value for backend in TelemetryBackendType],
+                        help="Specify the telemetry backend (default: nv-control, use nvml without an X server)")
+    parser.add_argument('--simulated-gpus', type=int, help="Number of GPUs of the simulated backend")
+    parser.add_argument('--simulated-fans', type=int, help="Number of fans per GPU of the simulated backend")
+    parser.add_argument('--simulated-latency', type=float,
+                        help="Latency in milliseconds added to every call of the simulated backend")
+    parser.add_argument('--parallel-sampling', action='store_true',
+                        help="Read all the GPUs concurrently, each one with its own NV-CONTROL connection")
+    return parser.parse_args(args)
+
+
+def _cleanup() -> None:
+    try:
+        # Stopped first, so that no fan write can follow the switch to auto
+        INJECTOR.get(FanWatchdog).stop()
+        INJECTOR.get(FanController).stop()
+        INJECTOR.get(FanCommandCoalescer).stop()
+        nvidia_repository = INJECTOR.get(NvidiaRepository)
+        nvidia_repository.set_all_gpus_fan_to_auto()
+        nvidia_repository.close()
+        INJECTOR.get(SqliteDatabase).close()
+    except:
+        _LOG.exception("Error during cleanup!")
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    options = _parse_args(sys.argv[1:] if args is None else args)
+    set_log_level(logging.DEBUG if options.debug else logging.INFO)
+    nvidia_repository = INJECTOR.get(NvidiaRepository)
+    if options.ctrl_display is not None:
+        nvidia_repository.set_ctrl_display(options.ctrl_display)
+    if options.backend is not None:
+        nvidia_repository.set_backend_type(TelemetryBackendType(options.backend))
+    if options.simulated_gpus is not None or options.simulated_fans is not None \
+            or options.simulated_latency is not None:
+        nvidia_repository.set_simulation(options.simulated_gpus, options.simulated_fans, options.simulated_latency)
+    if options.parallel_sampling:
+        nvidia_repository.set_parallel_sampling(True)
+    init_database()
+    daemon = INJECTOR.get(Daemon)
+
+    def stop(*_: Any) -> None:
+        daemon.stop()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        exit_status = daemon.run()
+    finally:
+        _cleanup()
+    return exit_status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
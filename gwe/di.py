@@ -20,15 +20,13 @@ import logging
 import shutil
 from typing import NewType
 
-from gi.repository import Gtk
 from injector import Module, provider, singleton, Injector
-from peewee import SqliteDatabase, BooleanField
+from peewee import SqliteDatabase, BooleanField, IntegerField
 from playhouse.migrate import SqliteMigrator, migrate
 from reactivex.disposable import CompositeDisposable
 from reactivex.subject import Subject
 
-from gwe.conf import APP_PACKAGE_NAME, APP_MAIN_UI_NAME, APP_DB_NAME, APP_EDIT_FAN_PROFILE_UI_NAME, \
-    APP_PREFERENCES_UI_NAME, APP_HISTORICAL_DATA_UI_NAME, APP_EDIT_OC_PROFILE_UI_NAME, APP_DB_VERSION
+from gwe.conf import APP_DB_NAME, APP_DB_VERSION
 from gwe.util.path import get_config_path
 
 _LOG = logging.getLogger(__name__)
@@ -37,62 +35,11 @@ SpeedStepChangedSubject = NewType('SpeedStepChangedSubject', Subject)
 FanProfileChangedSubject = NewType('FanProfileChangedSubject', Subject)
 OverclockProfileChangedSubject = NewType('OverclockProfileChangedSubject', Subject)
 SettingChangedSubject = NewType('SettingChangedSubject', Subject)
-MainBuilder = NewType('MainBuilder', Gtk.Builder)
-EditFanProfileBuilder = NewType('EditFanProfileBuilder', Gtk.Builder)
-EditOverclockProfileBuilder = NewType('EditOverclockProfileBuilder', Gtk.Builder)
-HistoricalDataBuilder = NewType('HistoricalDataBuilder', Gtk.Builder)
-PreferencesBuilder = NewType('PreferencesBuilder', Gtk.Builder)
-
-_UI_RESOURCE_PATH = "/com/leinardi/gwe/ui/{}"
+GpuEventSubject = NewType('GpuEventSubject', Subject)
 
 
 # pylint: disable=no-self-use
 class ProviderModule(Module):
-    @singleton
-    @provider
-    def provide_main_builder(self) -> MainBuilder:
-        _LOG.debug("provide Gtk.Builder")
-        builder = MainBuilder(Gtk.Builder())
-        builder.set_translation_domain(APP_PACKAGE_NAME)
-        builder.add_from_resource(_UI_RESOURCE_PATH.format(APP_MAIN_UI_NAME))
-        return builder
-
-    @singleton
-    @provider
-    def provide_edit_fan_profile_builder(self) -> EditFanProfileBuilder:
-        _LOG.debug("provide Gtk.Builder")
-        builder = EditFanProfileBuilder(Gtk.Builder())
-        builder.set_translation_domain(APP_PACKAGE_NAME)
-        builder.add_from_resource(_UI_RESOURCE_PATH.format(APP_EDIT_FAN_PROFILE_UI_NAME))
-        return builder
-
-    @singleton
-    @provider
-    def provide_edit_overclock_profile_builder(self) -> EditOverclockProfileBuilder:
-        _LOG.debug("provide Gtk.Builder")
-        builder = EditOverclockProfileBuilder(Gtk.Builder())
-        builder.set_translation_domain(APP_PACKAGE_NAME)
-        builder.add_from_resource(_UI_RESOURCE_PATH.format(APP_EDIT_OC_PROFILE_UI_NAME))
-        return builder
-
-    @singleton
-    @provider
-    def provide_historical_data_builder(self) -> HistoricalDataBuilder:
-        _LOG.debug("provide Gtk.Builder")
-        builder = HistoricalDataBuilder(Gtk.Builder())
-        builder.set_translation_domain(APP_PACKAGE_NAME)
-        builder.add_from_resource(_UI_RESOURCE_PATH.format(APP_HISTORICAL_DATA_UI_NAME))
-        return builder
-
-    @singleton
-    @provider
-    def provide_preferences_builder(self) -> PreferencesBuilder:
-        _LOG.debug("provide Gtk.Builder")
-        builder = PreferencesBuilder(Gtk.Builder())
-        builder.set_translation_domain(APP_PACKAGE_NAME)
-        builder.add_from_resource(_UI_RESOURCE_PATH.format(APP_PREFERENCES_UI_NAME))
-        return builder
-
     @singleton
     @provider
     def provide_thread_pool_scheduler(self) -> CompositeDisposable:
@@ -104,19 +51,29 @@ class ProviderModule(Module):
         database = SqliteDatabase(path_to_db)
 
         if os.path.exists(path_to_db):
-            if database.pragma('user_version') == 0:
-                _LOG.debug("upgrading database to version 1")
+            user_version = database.pragma('user_version')
+            if user_version < APP_DB_VERSION:
                 shutil.copyfile(path_to_db, path_to_db + '.bak')
+            migrator = SqliteMigrator(database)
+            if user_version == 0:
+                _LOG.debug("upgrading database to version 1")
 
                 database.pragma('user_version', 1, permanent=True)
 
-                migrator = SqliteMigrator(database)
                 vbios_silent_mode = BooleanField(default=False)
                 migrate(
                     migrator.add_column('fan_profile', 'vbios_silent_mode', vbios_silent_mode),
                     migrator.add_column('current_fan_profile', 'vbios_silent_mode', vbios_silent_mode)
                 )
 
+                database.commit()
+            if user_version <= 1:
+                _LOG.debug("upgrading database to version 2")
+
+                database.pragma('user_version', 2, permanent=True)
+
+                migrate(migrator.add_column('speed_step', 'cooler', IntegerField(null=True)))
+
                 database.commit()
         else:
             database.pragma('user_version', APP_DB_VERSION, permanent=True)
@@ -149,5 +106,10 @@ class ProviderModule(Module):
     def provide_setting_changed_subject(self) -> SettingChangedSubject:
         return SettingChangedSubject(Subject())
 
+    @singleton
+    @provider
+    def provide_gpu_event_subject(self) -> GpuEventSubject:
+        return GpuEventSubject(Subject())
+
 
 INJECTOR = Injector(ProviderModule)
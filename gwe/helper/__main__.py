@@ -0,0 +1,65 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+# Entry point of the privileged helper, started as root through the installed gwe-helper launcher, by pkexec
+# (gwe-helper --uid UID --exit-with-parent) or by the com.leinardi.gwe.helper@UID systemd service.
+# It must not import GTK or anything that needs a display.
+import argparse
+import logging
+import os
+import sys
+import threading
+
+from gwe.helper.protocol import get_socket_path
+from gwe.helper.server import PrivilegedHelperServer
+from gwe.util.log import set_log_level
+
+_LOG = logging.getLogger(__name__)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog='gwe.helper', description="GWE privileged helper")
+    parser.add_argument('--uid', type=int, default=int(os.environ.get('PKEXEC_UID', '0')),
+                        help="uid of the user allowed to send requests (default: the pkexec caller)")
+    parser.add_argument('--exit-with-parent', action='store_true',
+                        help="exit when the standard input is closed by the process that started the helper")
+    parser.add_argument('--debug', action='store_true', help="show debug messages")
+    args = parser.parse_args()
+    set_log_level(logging.DEBUG if args.debug else logging.INFO)
+
+    if os.geteuid() != 0:
+        _LOG.error("The privileged helper must run as root")
+        return 1
+
+    server = PrivilegedHelperServer(get_socket_path(args.uid), args.uid)
+    if args.exit_with_parent:
+        def wait_for_parent() -> None:
+            sys.stdin.read()
+            _LOG.info("Parent process gone, exiting")
+            server.shutdown()
+
+        threading.Thread(target=wait_for_parent, name='gwe-helper-parent', daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
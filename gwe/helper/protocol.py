@@ -0,0 +1,45 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+# Newline delimited JSON messages exchanged over the helper Unix socket:
+#   request:  {"requests": [{"op": "set_power_limit", "gpu_index": 0, "limit": 250}, ...]}
+#   response: {"results": [{"ok": true}, {"ok": false, "error": "..."}, ...]}
+# The requests of a message are applied in order and get one result each.
+import json
+from typing import Dict, Any
+
+# Owned by root, so that no other user can replace the socket or a path leading to it
+HELPER_RUN_DIR = '/run/gwe'
+
+OP_SET_POWER_LIMIT = 'set_power_limit'
+OP_LOCK_GPU_CLOCKS = 'lock_gpu_clocks'
+OP_RESET_GPU_CLOCKS = 'reset_gpu_clocks'
+OP_SET_PERSISTENCE_MODE = 'set_persistence_mode'
+
+
+def get_socket_path(uid: int) -> str:
+    return f'{HELPER_RUN_DIR}/helper-{uid}.sock'
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message) + '\n').encode('utf-8')
+
+
+def decode_message(line: bytes) -> Dict[str, Any]:
+    message = json.loads(line.decode('utf-8'))
+    if not isinstance(message, dict):
+        raise ValueError("Message must be a JSON object")
+    return message
@@ -0,0 +1,141 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import os
+import socket
+import socketserver
+import stat
+import struct
+import threading
+from typing import Dict, Any, List, Callable
+
+from py3nvml import py3nvml
+from py3nvml.py3nvml import NVMLError, NVML_FEATURE_ENABLED, NVML_FEATURE_DISABLED
+
+from gwe.helper.protocol import OP_SET_POWER_LIMIT, OP_LOCK_GPU_CLOCKS, OP_RESET_GPU_CLOCKS, \
+    OP_SET_PERSISTENCE_MODE, encode_message, decode_message
+from gwe.repository.nvml_extensions import nvmlDeviceSetGpuLockedClocks, nvmlDeviceResetGpuLockedClocks
+
+_LOG = logging.getLogger(__name__)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: 'PrivilegedHelperServer'
+
+    def handle(self) -> None:
+        if not self.server.is_peer_allowed(self.request):
+            return
+        for line in self.rfile:
+            try:
+                response: Dict[str, Any] = {'results': self.server.execute(decode_message(line).get('requests', []))}
+            except ValueError as err:
+                response = {'error': str(err)}
+            self.wfile.write(encode_message(response))
+
+
+class PrivilegedHelperServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Keeps NVML initialized as root and applies the write requests received from a single user"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, allowed_uid: int) -> None:
+        self._allowed_uid = allowed_uid
+        self._nvml_lock = threading.Lock()
+        self._handles: Dict[int, Any] = {}
+        self._operations: Dict[str, Callable[[Any, Dict[str, Any]], None]] = {
+            OP_SET_POWER_LIMIT: self._set_power_limit,
+            OP_LOCK_GPU_CLOCKS: self._lock_gpu_clocks,
+            OP_RESET_GPU_CLOCKS: self._reset_gpu_clocks,
+            OP_SET_PERSISTENCE_MODE: self._set_persistence_mode,
+        }
+        self._check_run_dir(os.path.dirname(socket_path))
+        if os.path.lexists(socket_path):
+            os.unlink(socket_path)
+        py3nvml.nvmlInit()
+        # The socket is created connectable by everyone and never changed by path afterwards: only the user the
+        # helper has been started for gets past is_peer_allowed
+        umask = os.umask(0o111)
+        try:
+            super().__init__(socket_path, _RequestHandler)
+        finally:
+            os.umask(umask)
+        _LOG.info(f"Privileged helper listening on {socket_path} for uid {allowed_uid}")
+
+    @staticmethod
+    def _check_run_dir(run_dir: str) -> None:
+        try:
+            os.mkdir(run_dir, 0o755)
+        except FileExistsError:
+            pass
+        run_dir_stat = os.lstat(run_dir)
+        if not stat.S_ISDIR(run_dir_stat.st_mode) or run_dir_stat.st_uid != 0 \
+                or run_dir_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise PermissionError(f"{run_dir} must be a directory owned and writable only by root")
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.lexists(self.server_address):  # type: ignore
+            os.unlink(self.server_address)  # type: ignore
+        py3nvml.nvmlShutdown()
+
+    def is_peer_allowed(self, connection: socket.socket) -> bool:
+        credentials = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+        _, uid, _ = struct.unpack('3i', credentials)
+        if uid not in (self._allowed_uid, 0):
+            _LOG.warning(f"Rejected connection from uid {uid}")
+            return False
+        return True
+
+    def execute(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        results = []
+        with self._nvml_lock:
+            for request in requests:
+                operation = self._operations.get(request.get('op'))  # type: ignore
+                if operation is None:
+                    results.append({'ok': False, 'error': f"Unknown operation {request.get('op')}"})
+                    continue
+                try:
+                    operation(self._get_handle(int(request['gpu_index'])), request)
+                    results.append({'ok': True})
+                except (NVMLError, KeyError, TypeError, ValueError) as err:
+                    _LOG.error(f"Request {request} failed: {err}")
+                    results.append({'ok': False, 'error': str(err)})
+        return results
+
+    def _get_handle(self, gpu_index: int) -> Any:
+        handle = self._handles.get(gpu_index)
+        if handle is None:
+            handle = py3nvml.nvmlDeviceGetHandleByIndex(gpu_index)
+            self._handles[gpu_index] = handle
+        return handle
+
+    @staticmethod
+    def _set_power_limit(handle: Any, request: Dict[str, Any]) -> None:
+        py3nvml.nvmlDeviceSetPowerManagementLimit(handle, int(float(request['limit']) * 1000))
+
+    @staticmethod
+    def _lock_gpu_clocks(handle: Any, request: Dict[str, Any]) -> None:
+        nvmlDeviceSetGpuLockedClocks(handle, int(request['min_clock']), int(request['max_clock']))
+
+    @staticmethod
+    def _reset_gpu_clocks(handle: Any, _: Dict[str, Any]) -> None:
+        nvmlDeviceResetGpuLockedClocks(handle)
+
+    @staticmethod
+    def _set_persistence_mode(handle: Any, request: Dict[str, Any]) -> None:
+        mode = NVML_FEATURE_ENABLED if request['enabled'] else NVML_FEATURE_DISABLED
+        py3nvml.nvmlDeviceSetPersistenceMode(handle, mode)
@@ -0,0 +1,31 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import reactivex
+from injector import singleton, inject
+from reactivex import Observable
+
+from gwe.repository.nvidia_repository import NvidiaRepository
+
+
+@singleton
+class GetCallMetricsInteractor:
+    @inject
+    def __init__(self, nvidia_repository: NvidiaRepository, ) -> None:
+        self._nvidia_repository = nvidia_repository
+
+    def execute(self) -> Observable:
+        return reactivex.defer(lambda _: reactivex.just(self._nvidia_repository.get_call_metrics().get_snapshot()))
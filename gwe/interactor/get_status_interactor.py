@@ -14,19 +14,42 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with gst.  If not, see <http://www.gnu.org/licenses/>.
+from typing import Optional
+
 import reactivex
 from injector import singleton, inject
 from reactivex import Observable
 
+from gwe.model.status import Status
+from gwe.repository.fan_command_coalescer import FanCommandCoalescer
+from gwe.repository.fan_controller import FanController
+from gwe.repository.fan_watchdog import FanWatchdog
 from gwe.repository.nvidia_repository import NvidiaRepository
 
 
 @singleton
 class GetStatusInteractor:
     @inject
-    def __init__(self, nvidia_repository: NvidiaRepository, ) -> None:
+    def __init__(self,
+                 nvidia_repository: NvidiaRepository,
+                 fan_command_coalescer: FanCommandCoalescer,
+                 fan_controller: FanController,
+                 fan_watchdog: FanWatchdog,
+                 ) -> None:
         self._nvidia_repository = nvidia_repository
+        self._fan_command_coalescer = fan_command_coalescer
+        self._fan_controller = fan_controller
+        self._fan_watchdog = fan_watchdog
 
     def execute(self) -> Observable:
         # _LOG.debug("GetStatusInteractor.execute()")
-        return reactivex.defer(lambda _: reactivex.just(self._nvidia_repository.get_status()))
+        return reactivex.defer(lambda _: reactivex.just(self._get_status()))
+
+    def _get_status(self) -> Optional[Status]:
+        status = self._nvidia_repository.get_status()
+        if status is not None:
+            self._fan_command_coalescer.reconcile(status)
+            self._fan_watchdog.on_sample(status)
+        # Handed to the fan control thread here, on the poller thread, without going through the GTK main loop
+        self._fan_controller.submit(status)
+        return status
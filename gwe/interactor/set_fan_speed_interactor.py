@@ -20,7 +20,7 @@ import reactivex
 from injector import singleton, inject
 from reactivex import Observable
 
-from gwe.repository.nvidia_repository import NvidiaRepository
+from gwe.repository.fan_command_coalescer import FanCommandCoalescer
 
 _LOG = logging.getLogger(__name__)
 
@@ -28,10 +28,10 @@ _LOG = logging.getLogger(__name__)
 @singleton
 class SetFanSpeedInteractor:
     @inject
-    def __init__(self, nvidia_repository: NvidiaRepository, ) -> None:
-        self._nvidia_repository = nvidia_repository
+    def __init__(self, fan_command_coalescer: FanCommandCoalescer, ) -> None:
+        self._fan_command_coalescer = fan_command_coalescer
 
     def execute(self, gpu_index: int, speed: int = 100, manual_control: bool = True) -> Observable:
         _LOG.debug("SetSpeedProfileInteractor.execute()")
         return reactivex.defer(
-            lambda _: reactivex.just(self._nvidia_repository.set_fan_speed(gpu_index, speed, manual_control)))
+            lambda _: reactivex.just(self._fan_command_coalescer.submit(gpu_index, speed, manual_control)))
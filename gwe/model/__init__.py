@@ -14,13 +14,33 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with gst.  If not, see <http://www.gnu.org/licenses/>.
+from peewee import SqliteDatabase
+
+from gwe.di import INJECTOR
+from gwe.model.current_fan_profile import CurrentFanProfile
+from gwe.model.current_overclock_profile import CurrentOverclockProfile
 from gwe.model.fan_profile import FanProfile
 from gwe.model.fan_profile_type import FanProfileType
+from gwe.model.gpu_fan_profile import GpuFanProfile
 from gwe.model.overclock_profile import OverclockProfile
 from gwe.model.overclock_profile_type import OverclockProfileType
+from gwe.model.setting import Setting
 from gwe.model.speed_step import SpeedStep
 
 
+def init_database() -> None:
+    database = INJECTOR.get(SqliteDatabase)
+    database.create_tables([
+        SpeedStep,
+        FanProfile,
+        CurrentFanProfile,
+        GpuFanProfile,
+        OverclockProfile,
+        CurrentOverclockProfile,
+        Setting
+    ])
+
+
 def load_fan_db_default_data() -> None:
     FanProfile.create(
         name="Auto (VBIOS controlled)",
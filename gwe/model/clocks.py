@@ -18,6 +18,9 @@ from typing import Optional
 
 
 class Clocks:
+    __slots__ = ('graphic_current', 'graphic_max', 'sm_current', 'sm_max', 'memory_current', 'memory_max',
+                 'video_current', 'video_max')
+
     def __init__(self,
                  graphic_current: Optional[int] = None,
                  graphic_max: Optional[int] = None,
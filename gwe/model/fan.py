@@ -14,12 +14,14 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with gst.  If not, see <http://www.gnu.org/licenses/>.
-from typing import List, Tuple
+from typing import List, Tuple, Optional
 
 
 class Fan:
+    __slots__ = ('fan_list', 'control_allowed', 'manual_control')
+
     def __init__(self,
-                 fan_list: List[Tuple[int, int]] = None,
+                 fan_list: List[Tuple[int, Optional[int]]] = None,
                  control_allowed: bool = False,
                  manual_control: bool = False
                  ) -> None:
@@ -0,0 +1,80 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2020 Roberto Leinardi
+#
+# gst is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gst is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gst.  If not, see <http://www.gnu.org/licenses/>.
+from bisect import bisect_right
+from typing import Dict, Iterable, Optional, Tuple, List
+
+from gwe.conf import MIN_TEMP, MAX_TEMP, FAN_MAX_DUTY
+from gwe.model.fan_profile import FanProfile
+
+
+class FanCurve:
+    """The speed steps of a fan profile sorted by temperature, read from the database once and then interpolated
+    without any query. The fans with steps of their own have their curve in coolers, by position in Fan.fan_list."""
+    __slots__ = ('profile_id', 'temperatures', 'duties', 'vbios_silent_mode', 'coolers')
+
+    def __init__(self,
+                 profile_id: Optional[int],
+                 steps: Iterable[Tuple[int, int]],
+                 vbios_silent_mode: bool = False
+                 ) -> None:
+        sorted_steps = sorted(steps)
+        self.profile_id: Optional[int] = profile_id
+        self.temperatures: Tuple[int, ...] = tuple(step[0] for step in sorted_steps)
+        self.duties: Tuple[int, ...] = tuple(step[1] for step in sorted_steps)
+        self.vbios_silent_mode: bool = vbios_silent_mode
+        self.coolers: Dict[int, FanCurve] = {}
+
+    @classmethod
+    def from_profile(cls, profile: FanProfile) -> 'FanCurve':
+        steps: List[Tuple[int, int]] = []
+        cooler_steps: Dict[int, List[Tuple[int, int]]] = {}
+        for step in profile.steps:
+            if step.cooler is None:
+                steps.append((step.temperature, step.duty))
+            else:
+                cooler_steps.setdefault(step.cooler, []).append((step.temperature, step.duty))
+        curve = cls(profile.id, steps, profile.vbios_silent_mode)
+        curve.coolers = {cooler: cls(profile.id, steps_of_cooler, profile.vbios_silent_mode)
+                         for cooler, steps_of_cooler in sorted(cooler_steps.items())}
+        return curve
+
+    def __len__(self) -> int:
+        return len(self.temperatures)
+
+    def get_cooler_curve(self, cooler: int) -> 'FanCurve':
+        return self.coolers.get(cooler, self)
+
+    def get_duty(self, gpu_temperature: float) -> float:
+        # Linear interpolation between the last step at or below the temperature and the first one above it
+        index = bisect_right(self.temperatures, gpu_temperature)
+        if 0 < index < len(self.temperatures):
+            t_1, t_2 = self.temperatures[index - 1], self.temperatures[index]
+            d_1, d_2 = self.duties[index - 1], self.duties[index]
+            return ((d_2 - d_1) / (t_2 - t_1)) * (gpu_temperature - t_1) + d_1
+        if index > 0:
+            return float(self.duties[-1])
+        if self.duties:
+            return float(self.duties[0])
+        return 0.0
+
+    def get_chart_data(self) -> Dict[int, int]:
+        data = dict(zip(self.temperatures, self.duties))
+        if data:
+            if MIN_TEMP not in data:
+                data[MIN_TEMP] = self.duties[0]
+            data.update({MAX_TEMP: FAN_MAX_DUTY})
+        return data
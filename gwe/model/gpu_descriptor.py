@@ -0,0 +1,76 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2020 Roberto Leinardi
+#
+# gst is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gst is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gst.  If not, see <http://www.gnu.org/licenses/>.
+from typing import Optional, Tuple, List
+
+
+class GpuDescriptor:
+    """Properties of a GPU that don't change while the driver is loaded"""
+
+    __slots__ = ('uuid', 'name', 'vbios', 'driver', 'cuda_cores', 'memory_total', 'memory_interface',
+                 'pcie_max_generation', 'pcie_max_link', 'temp_maximum', 'temp_slowdown', 'temp_shutdown',
+                 'power_default', 'power_minimum', 'power_maximum', 'perf_level_max', 'graphic_clock_max',
+                 'sm_clock_max', 'memory_clock_max', 'video_clock_max', 'gpu_offset_range', 'memory_offset_range',
+                 'cooler_indexes')
+
+    def __init__(self,
+                 uuid: str,
+                 name: Optional[str] = None,
+                 vbios: Optional[str] = None,
+                 driver: Optional[str] = None,
+                 cuda_cores: Optional[int] = None,
+                 memory_total: Optional[int] = None,
+                 memory_interface: Optional[int] = None,
+                 pcie_max_generation: Optional[int] = None,
+                 pcie_max_link: Optional[int] = None,
+                 temp_maximum: Optional[int] = None,
+                 temp_slowdown: Optional[int] = None,
+                 temp_shutdown: Optional[int] = None,
+                 power_default: Optional[float] = None,
+                 power_minimum: Optional[float] = None,
+                 power_maximum: Optional[float] = None,
+                 perf_level_max: Optional[int] = None,
+                 graphic_clock_max: Optional[int] = None,
+                 sm_clock_max: Optional[int] = None,
+                 memory_clock_max: Optional[int] = None,
+                 video_clock_max: Optional[int] = None,
+                 gpu_offset_range: Optional[Tuple[int, int]] = None,
+                 memory_offset_range: Optional[Tuple[int, int]] = None,
+                 cooler_indexes: Optional[List[int]] = None
+                 ) -> None:
+        self.uuid: str = uuid
+        self.name: Optional[str] = name
+        self.vbios: Optional[str] = vbios
+        self.driver: Optional[str] = driver
+        self.cuda_cores: Optional[int] = cuda_cores
+        self.memory_total: Optional[int] = memory_total
+        self.memory_interface: Optional[int] = memory_interface
+        self.pcie_max_generation: Optional[int] = pcie_max_generation
+        self.pcie_max_link: Optional[int] = pcie_max_link
+        self.temp_maximum: Optional[int] = temp_maximum
+        self.temp_slowdown: Optional[int] = temp_slowdown
+        self.temp_shutdown: Optional[int] = temp_shutdown
+        self.power_default: Optional[float] = power_default
+        self.power_minimum: Optional[float] = power_minimum
+        self.power_maximum: Optional[float] = power_maximum
+        self.perf_level_max: Optional[int] = perf_level_max
+        self.graphic_clock_max: Optional[int] = graphic_clock_max
+        self.sm_clock_max: Optional[int] = sm_clock_max
+        self.memory_clock_max: Optional[int] = memory_clock_max
+        self.video_clock_max: Optional[int] = video_clock_max
+        self.gpu_offset_range: Optional[Tuple[int, int]] = gpu_offset_range
+        self.memory_offset_range: Optional[Tuple[int, int]] = memory_offset_range
+        self.cooler_indexes: Optional[List[int]] = cooler_indexes
@@ -0,0 +1,39 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+from enum import Enum
+from typing import Optional
+
+
+class GpuEventType(Enum):
+    CLOCK_CHANGE = 'clock_change'
+    PSTATE_CHANGE = 'pstate_change'
+    XID_CRITICAL_ERROR = 'xid_critical_error'
+
+
+class GpuEvent:
+    """The GPU is identified by its UUID, because NVML and NV-CONTROL don't number the GPUs in the same order"""
+
+    def __init__(self,
+                 gpu_uuid: str,
+                 event_type: GpuEventType,
+                 data: Optional[int] = None,
+                 timestamp: Optional[float] = None
+                 ) -> None:
+        self.gpu_uuid: str = gpu_uuid
+        self.event_type: GpuEventType = event_type
+        self.data: Optional[int] = data
+        self.timestamp: Optional[float] = timestamp
@@ -0,0 +1,45 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+from enum import Enum
+from typing import Optional
+
+
+class GpuProcessType(Enum):
+    COMPUTE = 'C'
+    GRAPHICS = 'G'
+    COMPUTE_GRAPHICS = 'C+G'
+
+
+class GpuProcess:
+    def __init__(self,
+                 pid: int,
+                 name: Optional[str] = None,
+                 process_type: Optional[GpuProcessType] = None,
+                 memory_used: Optional[int] = None,
+                 gpu_usage: Optional[int] = None,
+                 memory_usage: Optional[int] = None,
+                 encoder_usage: Optional[int] = None,
+                 decoder_usage: Optional[int] = None
+                 ) -> None:
+        self.pid: int = pid
+        self.name: Optional[str] = name
+        self.process_type: Optional[GpuProcessType] = process_type
+        self.memory_used: Optional[int] = memory_used
+        self.gpu_usage: Optional[int] = gpu_usage
+        self.memory_usage: Optional[int] = memory_usage
+        self.encoder_usage: Optional[int] = encoder_usage
+        self.decoder_usage: Optional[int] = decoder_usage
@@ -14,8 +14,11 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with gst.  If not, see <http://www.gnu.org/licenses/>.
+from typing import Optional
+
 from gwe.model.clocks import Clocks
 from gwe.model.fan import Fan
+from gwe.model.gpu_descriptor import GpuDescriptor
 from gwe.model.info import Info
 from gwe.model.overclock import Overclock
 from gwe.model.power import Power
@@ -23,6 +26,8 @@ from gwe.model.temp import Temp
 
 
 class GpuStatus:
+    __slots__ = ('index', 'info', 'power', 'temp', 'fan', 'clocks', 'overclock', 'descriptor', 'timestamp')
+
     def __init__(self,
                  index: int,
                  info: Info,
@@ -30,7 +35,9 @@ class GpuStatus:
                  temp: Temp,
                  fan: Fan,
                  clocks: Clocks,
-                 overclock: Overclock
+                 overclock: Overclock,
+                 descriptor: Optional[GpuDescriptor] = None,
+                 timestamp: Optional[float] = None
                  ) -> None:
         self.index = index
         self.info = info
@@ -39,3 +46,5 @@ class GpuStatus:
         self.fan = fan
         self.clocks = clocks
         self.overclock = overclock
+        self.descriptor = descriptor
+        self.timestamp = timestamp
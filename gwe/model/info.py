@@ -18,6 +18,10 @@ from typing import Optional
 
 
 class Info:
+    __slots__ = ('name', 'vbios', 'driver', 'pcie_current_generation', 'pcie_max_generation', 'pcie_current_link',
+                 'pcie_max_link', 'cuda_cores', 'uuid', 'memory_total', 'memory_used', 'memory_interface',
+                 'memory_usage', 'gpu_usage', 'encoder_usage', 'decoder_usage')
+
     def __init__(self,
                  name: Optional[str] = None,
                  vbios: Optional[str] = None,
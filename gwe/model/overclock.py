@@ -18,6 +18,8 @@ from typing import Optional, Tuple
 
 
 class Overclock:
+    __slots__ = ('perf_level_max', 'available', 'gpu_range', 'gpu_offset', 'memory_range', 'memory_offset')
+
     def __init__(self,
                  perf_level_max: Optional[int] = None,
                  available: bool = False,
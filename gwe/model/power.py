@@ -18,6 +18,8 @@ from typing import Optional
 
 
 class Power:
+    __slots__ = ('draw', 'limit', 'default', 'minimum', 'enforced', 'maximum')
+
     def __init__(self,
                  draw: Optional[float] = None,
                  limit: Optional[float] = None,
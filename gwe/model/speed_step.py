@@ -15,9 +15,9 @@
 # You should have received a copy of the GNU General Public License
 # along with gst.  If not, see <http://www.gnu.org/licenses/>.
 import logging
-from typing import Any
+from typing import Any, Optional
 
-from peewee import ForeignKeyField, IntegerField, DateTimeField, SQL, SqliteDatabase
+from peewee import ForeignKeyField, IntegerField, DateTimeField, SQL, SqliteDatabase, ModelSelect
 from playhouse.signals import Model, post_save, post_delete
 
 from gwe.di import INJECTOR, SpeedStepChangedSubject
@@ -31,12 +31,19 @@ class SpeedStep(Model):
     profile = ForeignKeyField(FanProfile, backref='steps')
     temperature = IntegerField()
     duty = IntegerField()
+    # The position of the fan in Fan.fan_list, None for the steps followed by all the fans without steps of their own
+    cooler = IntegerField(null=True)
     timestamp = DateTimeField(constraints=[SQL('DEFAULT CURRENT_TIMESTAMP')])
 
     class Meta:
         legacy_table_names = False
         database = INJECTOR.get(SqliteDatabase)
 
+    @classmethod
+    def select_by_cooler(cls, profile: FanProfile, cooler: Optional[int]) -> ModelSelect:
+        return cls.select().where(cls.profile == profile,
+                                  cls.cooler.is_null() if cooler is None else cls.cooler == cooler)
+
 
 @post_save(sender=SpeedStep)
 def on_speed_step_added(_: Any, step: SpeedStep, created: bool) -> None:
@@ -14,13 +14,17 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with gst.  If not, see <http://www.gnu.org/licenses/>.
-from typing import List
+from typing import List, Optional
 
 from gwe.model.gpu_status import GpuStatus
 
 
 class Status:
+    __slots__ = ('gpu_status_list', 'timestamp')
+
     def __init__(self,
-                 gpu_status_list: List[GpuStatus]
+                 gpu_status_list: List[GpuStatus],
+                 timestamp: Optional[float] = None
                  ) -> None:
         self.gpu_status_list = gpu_status_list
+        self.timestamp = timestamp
@@ -18,6 +18,8 @@ from typing import Optional
 
 
 class Temp:
+    __slots__ = ('gpu', 'maximum', 'slowdown', 'shutdown')
+
     def __init__(self,
                  gpu: Optional[int] = None,
                  maximum: Optional[int] = None,
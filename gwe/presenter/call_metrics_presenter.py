@@ -0,0 +1,84 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import multiprocessing
+from typing import Any, List, Tuple
+
+from gi.repository import Gtk, GLib
+from injector import singleton, inject
+from reactivex import operators
+from reactivex.disposable import CompositeDisposable
+from reactivex.scheduler import ThreadPoolScheduler
+from reactivex.scheduler.mainloop import GtkScheduler
+
+from gwe.interactor.get_call_metrics_interactor import GetCallMetricsInteractor
+from gwe.util.call_metrics import CallStats
+from gwe.util.view import hide_on_delete
+
+_LOG = logging.getLogger(__name__)
+
+
+class CallMetricsViewInterface:
+    def show(self) -> None:
+        raise NotImplementedError()
+
+    def hide(self) -> None:
+        raise NotImplementedError()
+
+    def refresh_metrics(self, data: List[Tuple[str, str, int, int, str, str, str]]) -> None:
+        raise NotImplementedError()
+
+
+@singleton
+class CallMetricsPresenter:
+    @inject
+    def __init__(self,
+                 get_call_metrics_interactor: GetCallMetricsInteractor,
+                 composite_disposable: CompositeDisposable,
+                 ) -> None:
+        _LOG.debug("init CallMetricsPresenter ")
+        self.view: CallMetricsViewInterface = CallMetricsViewInterface()
+        self._get_call_metrics_interactor = get_call_metrics_interactor
+        self._composite_disposable = composite_disposable
+        self._scheduler = ThreadPoolScheduler(multiprocessing.cpu_count())
+
+    def show(self) -> None:
+        self._refresh_metrics()
+        self.view.show()
+
+    @staticmethod
+    def on_dialog_delete_event(widget: Gtk.Widget, *_: Any) -> Any:
+        return hide_on_delete(widget)
+
+    def on_refresh_clicked(self, *_: Any) -> None:
+        self._refresh_metrics()
+
+    def _refresh_metrics(self) -> None:
+        self._composite_disposable.add(self._get_call_metrics_interactor.execute().pipe(
+            operators.subscribe_on(self._scheduler),
+            operators.observe_on(GtkScheduler(GLib)),
+        ).subscribe(on_next=self._on_metrics_loaded,
+                    on_error=lambda e: _LOG.exception(f"Get call metrics error: {str(e)}")))
+
+    def _on_metrics_loaded(self, snapshot: List[CallStats]) -> None:
+        self.view.refresh_metrics([(stats.device,
+                                    stats.function,
+                                    stats.count,
+                                    stats.error_count,
+                                    f"{stats.mean_s * 1000:.3f}",
+                                    f"{stats.max_s * 1000:.3f}",
+                                    stats.format_histogram()) for stats in snapshot])
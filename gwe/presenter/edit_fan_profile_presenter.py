@@ -31,7 +31,7 @@ _LOG = logging.getLogger(__name__)
 
 
 class EditFanProfileViewInterface:
-    def show(self, profile: FanProfile) -> None:
+    def show(self, profile: FanProfile, cooler_count: int) -> None:
         raise NotImplementedError()
 
     def hide(self) -> None:
@@ -55,7 +55,7 @@ class EditFanProfileViewInterface:
                          profile: Optional[FanProfile] = None) -> None:
         raise NotImplementedError()
 
-    def refresh_liststore(self, profile: FanProfile) -> None:
+    def refresh_liststore(self, profile: FanProfile, cooler: Optional[int] = None) -> None:
         raise NotImplementedError()
 
 
@@ -70,17 +70,20 @@ class EditFanProfilePresenter:
         self._setting_changed_subject = setting_changed_subject
         self._profile = FanProfile()
         self._selected_step: Optional[SpeedStep] = None
+        # The fan whose steps are edited, None for the steps of all the fans
+        self._cooler: Optional[int] = None
         self._register_db_listeners()
 
-    def show_add(self) -> None:
+    def show_add(self, cooler_count: int = 1) -> None:
         profile = FanProfile()
         profile.name = 'New profile'
         profile.save()
-        self.show_edit(profile)
+        self.show_edit(profile, cooler_count)
 
-    def show_edit(self, profile: FanProfile) -> None:
+    def show_edit(self, profile: FanProfile, cooler_count: int = 1) -> None:
         self._profile = profile
-        self.view.show(profile)
+        self._cooler = None
+        self.view.show(profile, cooler_count)
 
     def on_dialog_delete_event(self, widget: Gtk.Widget, *_: Any) -> Any:
         if self._profile is not None:
@@ -94,6 +97,13 @@ class EditFanProfilePresenter:
         self._selected_step = step
         self.view.refresh_controls(step, deselect_list, self._profile)
 
+    def on_cooler_selected(self, widget: Gtk.ComboBox) -> None:
+        active = widget.get_active()
+        if active >= 0:
+            self._cooler = None if active == 0 else active - 1
+            self.view.refresh_liststore(self._profile, self._cooler)
+            self.refresh_controls(deselect_list=True)
+
     def vbios_silent_mode_toggled(self, widget: Gtk.ToggleButton) -> None:
         self._profile.vbios_silent_mode = widget.get_active()
         self._profile.save()
@@ -107,9 +117,9 @@ class EditFanProfilePresenter:
     def on_add_step_clicked(self, *_: Any) -> None:
         step = SpeedStep()
         step.profile = self._profile
+        step.cooler = self._cooler
         last_steps = (SpeedStep
-                      .select()
-                      .where(SpeedStep.profile == step.profile)
+                      .select_by_cooler(step.profile, step.cooler)
                       .order_by(SpeedStep.temperature.desc())
                       .limit(1))
         if not last_steps:
@@ -128,14 +138,14 @@ class EditFanProfilePresenter:
     def on_delete_step_clicked(self, *_: Any) -> None:
         assert self._selected_step is not None
         self._selected_step.delete_instance()
-        self.view.refresh_liststore(self._profile)
+        self.view.refresh_liststore(self._profile, self._cooler)
 
     def on_save_step_clicked(self, *_: Any) -> None:
         assert self._selected_step is not None
         self._selected_step.temperature = self.view.get_temperature()
         self._selected_step.duty = self.view.get_duty()
         self._selected_step.save()
-        self.view.refresh_liststore(self._profile)
+        self.view.refresh_liststore(self._profile, self._cooler)
         if not self.view.has_a_step_selected():
             self.refresh_controls()
 
@@ -145,4 +155,4 @@ class EditFanProfilePresenter:
 
     def _on_setting_list_changed(self, db_change: DbChange) -> None:
         if db_change.entry.key == 'settings_hysteresis':
-            self.view.refresh_liststore(self._profile)
+            self.view.refresh_liststore(self._profile, self._cooler)
@@ -0,0 +1,92 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import multiprocessing
+from typing import Any, List, Optional, Tuple
+
+import reactivex
+from gi.repository import Gtk, GLib
+from injector import singleton, inject
+from reactivex import operators
+from reactivex.disposable import CompositeDisposable, SerialDisposable
+from reactivex.scheduler import ThreadPoolScheduler
+from reactivex.scheduler.mainloop import GtkScheduler
+
+from gwe.interactor.get_gpu_processes_interactor import GetGpuProcessesInteractor
+from gwe.interactor.settings_interactor import SettingsInteractor
+from gwe.model.gpu_process import GpuProcess
+from gwe.util.view import hide_on_delete
+
+_LOG = logging.getLogger(__name__)
+
+
+class GpuProcessesViewInterface:
+    def show(self) -> None:
+        raise NotImplementedError()
+
+    def hide(self) -> None:
+        raise NotImplementedError()
+
+    def refresh_processes(self, data: List[Tuple[int, str, str, str, str, str, str, str]]) -> None:
+        raise NotImplementedError()
+
+
+@singleton
+class GpuProcessesPresenter:
+    @inject
+    def __init__(self,
+                 get_gpu_processes_interactor: GetGpuProcessesInteractor,
+                 settings_interactor: SettingsInteractor,
+                 composite_disposable: CompositeDisposable,
+                 ) -> None:
+        _LOG.debug("init GpuProcessesPresenter ")
+        self.view: GpuProcessesViewInterface = GpuProcessesViewInterface()
+        self._get_gpu_processes_interactor = get_gpu_processes_interactor
+        self._settings_interactor = settings_interactor
+        self._scheduler = ThreadPoolScheduler(multiprocessing.cpu_count())
+        # The processes are only sampled while the dialog is visible
+        self._refresh_disposable = SerialDisposable()
+        composite_disposable.add(self._refresh_disposable)
+
+    def show(self, gpu_index: int) -> None:
+        refresh_interval = self._settings_interactor.get_int('settings_refresh_interval')
+        self._refresh_disposable.disposable = reactivex.interval(refresh_interval, scheduler=self._scheduler).pipe(
+            operators.start_with(0),
+            operators.subscribe_on(self._scheduler),
+            operators.flat_map(lambda _: self._get_gpu_processes_interactor.execute(gpu_index)),
+            operators.observe_on(GtkScheduler(GLib)),
+        ).subscribe(on_next=self._on_processes_loaded,
+                    on_error=lambda e: _LOG.exception(f"Get GPU processes error: {str(e)}"))
+        self.view.show()
+
+    def on_dialog_delete_event(self, widget: Gtk.Widget, *_: Any) -> Any:
+        self._refresh_disposable.disposable = None
+        return hide_on_delete(widget)
+
+    def _on_processes_loaded(self, processes: List[GpuProcess]) -> None:
+        self.view.refresh_processes([(process.pid,
+                                      process.name or '',
+                                      process.process_type.value if process.process_type else '',
+                                      _format(process.memory_used),
+                                      _format(process.gpu_usage),
+                                      _format(process.memory_usage),
+                                      _format(process.encoder_usage),
+                                      _format(process.decoder_usage)) for process in processes])
+
+
+def _format(value: Optional[int]) -> str:
+    return '-' if value is None else str(value)
@@ -18,23 +18,26 @@
 
 import logging
 import multiprocessing
-from typing import Optional, Any, List, Tuple
+import time
+from typing import Optional, Any, List, Tuple, Set, Dict
 
 import reactivex
 from gi.repository import GLib
 from injector import inject, singleton
 from packaging.version import Version
 from reactivex import Observable, operators
-from reactivex.disposable import CompositeDisposable
+from reactivex.disposable import CompositeDisposable, SerialDisposable
 from reactivex.scheduler import ThreadPoolScheduler
 from reactivex.scheduler.mainloop import GtkScheduler
+from reactivex.subject import Subject
 
 from gwe.conf import APP_NAME, APP_SOURCE_URL, APP_VERSION, APP_ID
 from gwe.di import FanProfileChangedSubject, SpeedStepChangedSubject, OverclockProfileChangedSubject, \
-    SettingChangedSubject
+    SettingChangedSubject, GpuEventSubject
 from gwe.interactor.check_new_version_interactor import CheckNewVersionInteractor
 from gwe.interactor.get_status_interactor import GetStatusInteractor
 from gwe.interactor.has_nvidia_driver_interactor import HasNvidiaDriverInteractor, HasNvidiaDriverResult
+from gwe.interactor.listen_gpu_events_interactor import ListenGpuEventsInteractor
 from gwe.interactor.set_fan_speed_interactor import SetFanSpeedInteractor
 from gwe.interactor.set_overclock_interactor import SetOverclockInteractor
 from gwe.interactor.set_power_limit_iInteractor import SetPowerLimitInteractor
@@ -43,36 +46,55 @@ from gwe.model import SpeedStep
 from gwe.model.cb_change import DbChange
 from gwe.model.current_fan_profile import CurrentFanProfile
 from gwe.model.current_overclock_profile import CurrentOverclockProfile
+from gwe.model.fan_curve import FanCurve
+from gwe.model.gpu_event import GpuEvent, GpuEventType
 from gwe.model.setting import Setting
 from gwe.model.status import Status
 from gwe.model.overclock_profile import OverclockProfile
 from gwe.model.fan_profile import FanProfile
 from gwe.model.fan_profile_type import FanProfileType
+from gwe.model.gpu_fan_profile import GpuFanProfile
+from gwe.presenter.call_metrics_presenter import CallMetricsPresenter
 from gwe.presenter.edit_fan_profile_presenter import EditFanProfilePresenter
 from gwe.presenter.edit_overclock_profile_presenter import EditOverclockProfilePresenter
+from gwe.presenter.gpu_processes_presenter import GpuProcessesPresenter
 from gwe.presenter.historical_data_presenter import HistoricalDataPresenter
 from gwe.presenter.preferences_presenter import PreferencesPresenter
+from gwe.repository.fan_controller import FanController
+from gwe.repository.fan_watchdog import FanWatchdog
+from gwe.repository.fan_curve_repository import FanCurveRepository
+from gwe.util.adaptive_refresh import AdaptiveRefreshInterval
 from gwe.util.deployment import is_flatpak
+from gwe.util.status_diff import StatusDiffer
 from gwe.util.view import show_notification, open_uri, get_default_application
 
 _LOG = logging.getLogger(__name__)
 _ADD_NEW_PROFILE_INDEX = -10
+# Clock and P-state events can come in bursts, refresh at most once per interval because of them
+_EVENT_REFRESH_MIN_INTERVAL_S = 0.5
+_SAMPLE_AGE_CHECK_INTERVAL_S = 1.0
 
 
 class MainViewInterface:
     def toggle_window_visibility(self) -> None:
         raise NotImplementedError()
 
-    def refresh_status(self, status: Optional[Status], gpu_index: int) -> None:
+    def is_window_visible(self) -> bool:
+        raise NotImplementedError()
+
+    def refresh_status(self, status: Optional[Status], gpu_index: int, changed: Optional[Set[str]] = None) -> None:
         raise NotImplementedError()
 
     def refresh_fan_profile_combobox(self, data: List[Tuple[int, str]], active: Optional[int]) -> None:
         raise NotImplementedError()
 
+    def refresh_gpu_combobox(self, names: List[str], active: int) -> None:
+        raise NotImplementedError()
+
     def refresh_overclock_profile_combobox(self, data: List[Tuple[int, str]], active: Optional[int]) -> None:
         raise NotImplementedError()
 
-    def refresh_chart(self, profile: Optional[FanProfile] = None, reset: bool = False) -> None:
+    def refresh_chart(self, curve: Optional[FanCurve] = None, reset: bool = False) -> None:
         raise NotImplementedError()
 
     def set_apply_fan_profile_button_enabled(self, enabled: bool) -> None:
@@ -111,6 +133,8 @@ class MainPresenter:
                  edit_overclock_profile_presenter: EditOverclockProfilePresenter,
                  historical_data_presenter: HistoricalDataPresenter,
                  preferences_presenter: PreferencesPresenter,
+                 call_metrics_presenter: CallMetricsPresenter,
+                 gpu_processes_presenter: GpuProcessesPresenter,
                  has_nvidia_driver_interactor: HasNvidiaDriverInteractor,
                  get_status_interactor: GetStatusInteractor,
                  set_power_limit_interactor: SetPowerLimitInteractor,
@@ -122,6 +146,11 @@ class MainPresenter:
                  fan_profile_changed_subject: FanProfileChangedSubject,
                  overclock_profile_changed_subject: OverclockProfileChangedSubject,
                  setting_changed_subject: SettingChangedSubject,
+                 gpu_event_subject: GpuEventSubject,
+                 listen_gpu_events_interactor: ListenGpuEventsInteractor,
+                 fan_controller: FanController,
+                 fan_watchdog: FanWatchdog,
+                 fan_curve_repository: FanCurveRepository,
                  composite_disposable: CompositeDisposable,
                  ) -> None:
         _LOG.debug("init MainPresenter ")
@@ -130,6 +159,8 @@ class MainPresenter:
         self._edit_overclock_profile_presenter = edit_overclock_profile_presenter
         self._historical_data_presenter = historical_data_presenter
         self._preferences_presenter = preferences_presenter
+        self._call_metrics_presenter = call_metrics_presenter
+        self._gpu_processes_presenter = gpu_processes_presenter
         self._scheduler = ThreadPoolScheduler(multiprocessing.cpu_count())
         self._has_nvidia_driver_interactor = has_nvidia_driver_interactor
         self._get_status_interactor: GetStatusInteractor = get_status_interactor
@@ -142,16 +173,31 @@ class MainPresenter:
         self._fan_profile_changed_subject = fan_profile_changed_subject
         self._overclock_profile_changed_subject = overclock_profile_changed_subject
         self._setting_changed_subject = setting_changed_subject
+        self._gpu_event_subject = gpu_event_subject
+        self._listen_gpu_events_interactor = listen_gpu_events_interactor
+        self._fan_controller = fan_controller
+        self._fan_watchdog = fan_watchdog
+        self._fan_curve_repository = fan_curve_repository
         self._composite_disposable: CompositeDisposable = composite_disposable
         self._fan_profile_selected: Optional[FanProfile] = None
-        self._fan_profile_applied: Optional[FanProfile] = None
+        # The fan profile applied to each GPU, by UUID. The one picked before the first status is kept aside until
+        # the UUID of the displayed GPU is known.
+        self._fan_profiles_applied: Dict[str, FanProfile] = {}
+        self._fan_profile_pending: Optional[FanProfile] = None
         self._overclock_profile_selected: Optional[OverclockProfile] = None
         self._overclock_profile_applied: Optional[OverclockProfile] = None
         self._latest_status: Optional[Status] = None
-        self._latest_update_temp: Optional[int] = None
+        self._status_differ = StatusDiffer()
         self._gpu_index: int = 0
+        self._adaptive_refresh_interval: Optional[AdaptiveRefreshInterval] = None
+        self._refresh_tick_subject: Subject = Subject()
+        self._refresh_timer = SerialDisposable()
+        self._window_visible = True
+        self._fan_step_temps: List[int] = []
+        self._stale_sample_reported = False
 
     def on_start(self) -> None:
+        self._configure_fan_controller()
         self._refresh_fan_profile_ui(True)
         self._register_db_listeners()
         self._check_nvidia_driver()
@@ -177,17 +223,18 @@ class MainPresenter:
     def on_fan_edit_button_clicked(self, *_: Any) -> None:
         profile = self._fan_profile_selected
         if profile:
-            self._edit_fan_profile_presenter.show_edit(profile)
+            self._edit_fan_profile_presenter.show_edit(profile, self._get_cooler_count())
         else:
             _LOG.error('Profile is None!')
 
     def on_fan_apply_button_clicked(self, *_: Any) -> None:
         if self._fan_profile_selected:
-            self._fan_profile_applied = self._fan_profile_selected
+            gpu_uuid = self._get_gpu_uuid()
+            self._set_fan_profile_applied(self._fan_profile_selected, gpu_uuid)
             if self._fan_profile_selected.type == FanProfileType.AUTO.value:
                 self._set_fan_speed(self._gpu_index, manual_control=False)
             self._refresh_fan_profile_ui(profile_id=self._fan_profile_selected.id)
-            self._update_current_fan_profile(self._fan_profile_selected)
+            self._update_current_fan_profile(self._fan_profile_selected, gpu_uuid)
 
     def on_overclock_edit_button_clicked(self, *_: Any) -> None:
         profile = self._overclock_profile_selected
@@ -216,6 +263,12 @@ class MainPresenter:
     def on_menu_settings_clicked(self, *_: Any) -> None:
         self._preferences_presenter.show()
 
+    def on_menu_gpu_processes_clicked(self, *_: Any) -> None:
+        self._gpu_processes_presenter.show(self._gpu_index)
+
+    def on_menu_call_metrics_clicked(self, *_: Any) -> None:
+        self._call_metrics_presenter.show()
+
     def on_menu_changelog_clicked(self, *_: Any) -> None:
         open_uri(self._get_changelog_uri())
 
@@ -228,6 +281,18 @@ class MainPresenter:
             profile_id = widget.get_model()[active][0]
             self._select_fan_profile(profile_id)
 
+    def on_gpu_selected(self, widget: Any, *_: Any) -> None:
+        gpu_index = widget.get_active()
+        if gpu_index >= 0 and gpu_index != self._gpu_index and self._latest_status is not None:
+            self._gpu_index = gpu_index
+            self._fan_profile_selected = None
+            profile = self._get_fan_profile_applied()
+            self._refresh_fan_profile_ui(profile_id=profile.id if profile is not None else None)
+            if profile is None:
+                self.main_view.refresh_chart(reset=True)
+            self._refresh_overclock_profile_ui()
+            self.main_view.refresh_status(self._latest_status, self._gpu_index)
+
     def on_overclock_profile_selected(self, widget: Any, *_: Any) -> None:
         active = widget.get_active()
         if active >= 0:
@@ -284,15 +349,23 @@ class MainPresenter:
     def _on_speed_step_list_changed(self, db_change: DbChange) -> None:
         profile: SpeedStep = db_change.entry.profile
         if self._fan_profile_selected and self._fan_profile_selected.id == profile.id:
-            self.main_view.refresh_chart(profile)
+            self.main_view.refresh_chart(self._fan_curve_repository.get(profile))
+        for gpu_uuid, applied in list(self._fan_profiles_applied.items()):
+            if applied.id == profile.id:
+                self._set_fan_profile_applied(applied, gpu_uuid)
 
     def _on_fan_profile_list_changed(self, db_change: DbChange) -> None:
         profile: FanProfile = db_change.entry
         if db_change.type == DbChange.DELETE:
+            for gpu_uuid, applied in list(self._fan_profiles_applied.items()):
+                if applied.id == profile.id:
+                    self._set_fan_profile_applied(None, gpu_uuid)
             self._refresh_fan_profile_ui()
             self._fan_profile_selected = None
-            self._fan_profile_applied = None
         elif db_change.type == DbChange.INSERT or db_change.type == DbChange.UPDATE:
+            for gpu_uuid, applied in list(self._fan_profiles_applied.items()):
+                if applied.id == profile.id:
+                    self._set_fan_profile_applied(profile, gpu_uuid)
             self._refresh_fan_profile_ui(profile_id=profile.id)
 
     def _on_overclock_profile_list_changed(self, db_change: DbChange) -> None:
@@ -305,19 +378,110 @@ class MainPresenter:
             self._refresh_overclock_profile_ui(profile_id=profile.id)
 
     def _on_setting_list_changed(self, db_change: DbChange) -> None:
-        if db_change.entry.key == 'settings_hysteresis' and self._fan_profile_applied:
-            self.main_view.refresh_chart(self._fan_profile_applied)
+        if db_change.entry.key == 'settings_hysteresis' or db_change.entry.key.startswith('settings_fan_'):
+            self._configure_fan_controller()
+        profile = self._get_fan_profile_applied()
+        if db_change.entry.key == 'settings_hysteresis' and profile:
+            self.main_view.refresh_chart(self._fan_curve_repository.get(profile))
+
+    def _configure_fan_controller(self) -> None:
+        self._fan_controller.set_hysteresis(self._settings_interactor.get_int('settings_hysteresis'))
+        self._fan_controller.set_temperature_smoothing(
+            self._settings_interactor.get_int('settings_fan_smoothing_samples'),
+            self._settings_interactor.get_bool('settings_fan_smoothing_median'))
+        self._fan_controller.set_duty_limits(self._settings_interactor.get_int('settings_fan_max_slew'),
+                                             self._settings_interactor.get_int('settings_fan_min_dwell'))
+        self._fan_watchdog.set_deadline(self._settings_interactor.get_int('settings_fan_watchdog_deadline'))
 
     def _start_refresh(self) -> None:
         _LOG.debug("start refresh")
         refresh_interval = self._settings_interactor.get_int('settings_refresh_interval')
-        self._composite_disposable.add(reactivex.interval(refresh_interval, scheduler=self._scheduler).pipe(
-            operators.start_with(0),
+        if self._settings_interactor.get_bool('settings_adaptive_refresh'):
+            self._adaptive_refresh_interval = AdaptiveRefreshInterval(
+                refresh_interval,
+                self._settings_interactor.get_int('settings_refresh_interval_min'),
+                self._settings_interactor.get_int('settings_refresh_interval_max'))
+            self._composite_disposable.add(self._refresh_timer)
+            # Every timed refresh schedules the next one, with the interval computed from its own reading
+            timed_refresh = self._refresh_tick_subject.pipe(
+                operators.start_with(0),
+                operators.flat_map(lambda _: self._get_status().pipe(
+                    operators.do_action(on_next=self._update_refresh_interval),
+                    operators.finally_action(self._schedule_next_refresh))),
+            )
+        else:
+            timed_refresh = reactivex.interval(refresh_interval, scheduler=self._scheduler).pipe(
+                operators.start_with(0),
+                operators.flat_map(lambda _: self._get_status()),
+            )
+        self._composite_disposable.add(reactivex.merge(
+            timed_refresh,
+            self._gpu_event_subject.pipe(
+                operators.filter(lambda event: event.gpu_uuid == self._get_gpu_uuid()),
+                operators.throttle_first(_EVENT_REFRESH_MIN_INTERVAL_S, scheduler=self._scheduler),
+                operators.observe_on(self._scheduler),
+                operators.flat_map(lambda _: self._get_status())),
+        ).pipe(
             operators.subscribe_on(self._scheduler),
-            operators.flat_map(lambda _: self._get_status()),
             operators.observe_on(GtkScheduler(GLib)),
         ).subscribe(on_next=self._on_status_updated,
                     on_error=lambda e: _LOG.exception(f"Refresh error: {str(e)}")))
+        self._listen_gpu_events()
+        self._check_sample_age()
+
+    def _update_refresh_interval(self, status: Optional[Status]) -> None:
+        adaptive_refresh_interval = self._adaptive_refresh_interval
+        if adaptive_refresh_interval is None:
+            return
+        temp = None
+        if status is not None and self._gpu_index < len(status.gpu_status_list):
+            temp = status.gpu_status_list[self._gpu_index].temp.gpu
+        adaptive_refresh_interval.update(temp, time.monotonic(), self._window_visible, self._fan_step_temps)
+
+    def _schedule_next_refresh(self) -> None:
+        adaptive_refresh_interval = self._adaptive_refresh_interval
+        if adaptive_refresh_interval is None:
+            return
+        self._refresh_timer.disposable = self._scheduler.schedule_relative(
+            adaptive_refresh_interval.interval_s, lambda *_: self._refresh_tick_subject.on_next(0))
+
+    def _listen_gpu_events(self) -> None:
+        self._composite_disposable.add(self._gpu_event_subject.pipe(
+            operators.filter(lambda event: event.event_type == GpuEventType.XID_CRITICAL_ERROR),
+            operators.observe_on(GtkScheduler(GLib)),
+        ).subscribe(on_next=self._on_xid_critical_error,
+                    on_error=lambda e: _LOG.exception(f"GPU event error: {str(e)}")))
+        self._composite_disposable.add(self._listen_gpu_events_interactor.execute().pipe(
+            operators.subscribe_on(self._scheduler),
+        ).subscribe(on_error=lambda e: _LOG.exception(f"GPU event listener error: {str(e)}")))
+
+    def _check_sample_age(self) -> None:
+        # Checked on a timer of its own, because a stalled poller doesn't deliver anything to _on_status_updated
+        self._composite_disposable.add(reactivex.interval(_SAMPLE_AGE_CHECK_INTERVAL_S, scheduler=self._scheduler).pipe(
+            operators.map(lambda _: (self._gpu_index,
+                                     self._fan_watchdog.get_sample_age(self._gpu_index),
+                                     self._fan_watchdog.is_reverted(self._gpu_index))),
+            operators.observe_on(GtkScheduler(GLib)),
+        ).subscribe(on_next=lambda result: self._on_sample_age_checked(*result),
+                    on_error=lambda e: _LOG.exception(f"Sample age error: {str(e)}")))
+
+    def _on_sample_age_checked(self, gpu_index: int, age: Optional[float], reverted: bool) -> None:
+        if self._settings_interactor.get_bool('settings_adaptive_refresh'):
+            refresh_interval = self._settings_interactor.get_int('settings_refresh_interval_max')
+        else:
+            refresh_interval = self._settings_interactor.get_int('settings_refresh_interval')
+        if age is not None and age > 2 * refresh_interval + 1:
+            self._stale_sample_reported = True
+            text = f'No reading from GPU {gpu_index} for {age:.0f} s'
+            self.main_view.set_statusbar_text(f'{text}, fans switched to automatic' if reverted else text)
+        elif self._stale_sample_reported:
+            self._stale_sample_reported = False
+            self.main_view.set_statusbar_text(f'Readings from GPU {gpu_index} resumed')
+
+    def _on_xid_critical_error(self, event: GpuEvent) -> None:
+        gpu_index = self._get_gpu_index(event.gpu_uuid)
+        gpu = event.gpu_uuid if gpu_index is None else gpu_index
+        self.main_view.set_statusbar_text(f'GPU {gpu} reported the Xid critical error {event.data}')
 
     def _on_status_updated(self, status: Optional[Status]) -> None:
         if status is not None:
@@ -325,74 +489,96 @@ class MainPresenter:
             self._latest_status = status
             if was_latest_status_none:
                 self._refresh_overclock_profile_ui(True)
+                self.main_view.refresh_gpu_combobox(
+                    [f"{gpu.index}: {gpu.info.name}" for gpu in status.gpu_status_list], self._gpu_index)
+                self._apply_fan_profile_pending()
             self._update_fan()
-            self.main_view.refresh_status(status, self._gpu_index)
+            if self._adaptive_refresh_interval is not None:
+                self._update_adaptive_refresh_inputs()
+            changed_fields = self._status_differ.diff(status).get(self._gpu_index)
+            self.main_view.refresh_status(status, self._gpu_index, changed_fields)
             self._historical_data_presenter.add_status(status, self._gpu_index)
+
+    def _update_adaptive_refresh_inputs(self) -> None:
+        # Read on the GTK thread and used by the refresh thread to compute the next interval
+        self._window_visible = self.main_view.is_window_visible()
+        profile = self._get_fan_profile_applied()
+        if profile and profile.type != FanProfileType.AUTO.value:
+            self._fan_step_temps = list(self._fan_curve_repository.get(profile).temperatures)
         else:
-            self._set_fan_speed(self._gpu_index, manual_control=False)
+            self._fan_step_temps = []
 
     def _update_fan(self) -> None:
+        # The fan duty itself is written by the FanController, the UI only reflects the profile in use
         fan = self._latest_status.gpu_status_list[self._gpu_index].fan
-        if fan.control_allowed:
-            if self._fan_profile_selected is None and not fan.manual_control:
-                fan_profile = FanProfile.get(FanProfile.type == FanProfileType.AUTO.value)
-                self._fan_profile_applied = fan_profile
-                self._refresh_fan_profile_ui(profile_id=fan_profile.id)
-            elif self._fan_profile_applied and self._fan_profile_applied.type != FanProfileType.AUTO.value:
-                gpu_status = self._latest_status.gpu_status_list[self._gpu_index]
-                if not self._fan_profile_applied.steps:
-                    self._set_fan_speed(gpu_status.index, manual_control=False)
-                elif gpu_status.temp.gpu:
-                    try:
-                        speed = round(self._get_fan_duty(self._fan_profile_applied, gpu_status.temp.gpu))
-                        if self._fan_profile_applied.vbios_silent_mode and \
-                                gpu_status.temp.gpu < self._fan_profile_applied.steps[0].temperature:
-                            self._set_fan_speed(gpu_status.index, manual_control=False)
-                        elif self._should_update_fan_duty(speed):
-                            self._set_fan_speed(gpu_status.index, round(speed))
-                    except ValueError:
-                        _LOG.exception(f'Unable to parse temperature {gpu_status.temp.gpu}')
-
-    def _should_update_fan_duty(self, speed: int) -> bool:
-        fan = self._latest_status.gpu_status_list[self._gpu_index].fan
-        if not fan.fan_list or fan.fan_list[0][0] == speed:
-            return False
-        # The hysteresis value is used to avoid fan fluctuations. In a few words, when the temperature rises, the new
-        # fan duty value is applied immediately. When it lowers, the last applied fan duty value is kept until the
-        # current temperature is hysteresis degrees lower than the temperature that caused the current fan duty to be
-        # applied.
-        hysteresis = self._settings_interactor.get_int('settings_hysteresis')
-        current_temp = self._latest_status.gpu_status_list[self._gpu_index].temp.gpu
-        if self._latest_update_temp is not None and hysteresis != 0:
-            temp_delta = current_temp - self._latest_update_temp
-            if -hysteresis <= temp_delta <= 0:
-                return False
-            
-        self._latest_update_temp = current_temp
-        return True
-
-    @staticmethod
-    def _get_fan_duty(profile: FanProfile, gpu_temperature: float) -> float:
-        p_1 = ([(i.temperature, i.duty) for i in profile.steps if i.temperature <= gpu_temperature] or [None])[-1]
-        p_2 = next(((i.temperature, i.duty) for i in profile.steps if i.temperature > gpu_temperature), None)
-        duty = 0.0
-        if p_1 and p_2:
-            duty = ((p_2[1] - p_1[1]) / (p_2[0] - p_1[0])) * (gpu_temperature - p_1[0]) + p_1[1]
-        elif p_1:
-            duty = float(p_1[1])
-        elif p_2:
-            duty = float(p_2[1])
-        return duty
+        if fan.control_allowed and self._fan_profile_selected is None and not fan.manual_control:
+            fan_profile = FanProfile.get(FanProfile.type == FanProfileType.AUTO.value)
+            self._set_fan_profile_applied(fan_profile, self._get_gpu_uuid())
+            self._refresh_fan_profile_ui(profile_id=fan_profile.id)
+
+    def _get_gpu_uuid(self) -> Optional[str]:
+        if self._latest_status is None or self._gpu_index >= len(self._latest_status.gpu_status_list):
+            return None
+        return self._latest_status.gpu_status_list[self._gpu_index].info.uuid
+
+    def _get_gpu_index(self, gpu_uuid: str) -> Optional[int]:
+        if self._latest_status is None:
+            return None
+        return next((gpu.index for gpu in self._latest_status.gpu_status_list if gpu.info.uuid == gpu_uuid), None)
+
+    def _get_cooler_count(self) -> int:
+        if self._latest_status is None or self._gpu_index >= len(self._latest_status.gpu_status_list):
+            return 1
+        return len(self._latest_status.gpu_status_list[self._gpu_index].fan.fan_list or []) or 1
+
+    def _get_fan_profile_applied(self) -> Optional[FanProfile]:
+        gpu_uuid = self._get_gpu_uuid()
+        if gpu_uuid is None:
+            return self._fan_profile_pending
+        return self._fan_profiles_applied.get(gpu_uuid)
+
+    def _set_fan_profile_applied(self, profile: Optional[FanProfile], gpu_uuid: Optional[str]) -> None:
+        if gpu_uuid is None:
+            self._fan_profile_pending = profile
+            return
+        if profile is None:
+            self._fan_profiles_applied.pop(gpu_uuid, None)
+        else:
+            self._fan_profiles_applied[gpu_uuid] = profile
+        if profile is None or profile.type == FanProfileType.AUTO.value:
+            self._fan_controller.set_fan_curve(gpu_uuid, None)
+        else:
+            # Compiled on the GTK thread, the control thread never touches the database
+            self._fan_controller.set_fan_curve(gpu_uuid, self._fan_curve_repository.get(profile))
+
+    def _apply_fan_profile_pending(self) -> None:
+        gpu_uuid = self._get_gpu_uuid()
+        profile = self._fan_profile_pending
+        self._fan_profile_pending = None
+        if gpu_uuid is not None and profile is not None and gpu_uuid not in self._fan_profiles_applied:
+            self._set_fan_profile_applied(profile, gpu_uuid)
+        applied = self._get_fan_profile_applied()
+        if applied is not None and (profile is None or applied.id != profile.id):
+            self._refresh_fan_profile_ui(profile_id=applied.id)
+
+    def _load_last_fan_profiles(self) -> Optional[FanProfile]:
+        """Applies the last fan profile of every GPU. CurrentFanProfile, the last one applied to any GPU, is kept
+        for the displayed GPU until its UUID is known, and used only if that GPU has none of its own."""
+        for gpu_fan_profile in GpuFanProfile.select():
+            self._set_fan_profile_applied(gpu_fan_profile.profile, gpu_fan_profile.gpu_uuid)
+        current = CurrentFanProfile.get_or_none()
+        if current is not None:
+            self._set_fan_profile_applied(current.profile, None)
+        return current.profile if current is not None else None
 
     def _refresh_fan_profile_ui(self, init: bool = False, profile_id: Optional[int] = None) -> None:
-        current: Optional[CurrentFanProfile] = None
+        current: Optional[FanProfile] = None
         if init and self._settings_interactor.get_bool('settings_load_last_profile'):
-            current = CurrentFanProfile.get_or_none()
-            if current is not None:
-                self._fan_profile_applied = current.profile
+            current = self._load_last_fan_profiles()
+        applied = self._get_fan_profile_applied()
         data: List[Tuple[int, str]] = []
         for fan_profile in FanProfile.select():
-            if self._fan_profile_applied is not None and self._fan_profile_applied.id == fan_profile.id:
+            if applied is not None and applied.id == fan_profile.id:
                 name = f"<b>{fan_profile.name}</b>"
             else:
                 name = fan_profile.name
@@ -401,7 +587,7 @@ class MainPresenter:
         if profile_id is not None:
             active = next(i for i, item in enumerate(data) if item[0] == profile_id)
         elif current is not None:
-            active = next(i for i, item in enumerate(data) if item[0] == current.profile.id)
+            active = next(i for i, item in enumerate(data) if item[0] == current.id)
         data.append((_ADD_NEW_PROFILE_INDEX, "<span style='italic' alpha='50%'>Add new profile...</span>"))
         self.main_view.refresh_fan_profile_combobox(data, active)
 
@@ -410,7 +596,7 @@ class MainPresenter:
             self.main_view.set_apply_fan_profile_button_enabled(False)
             self.main_view.set_edit_fan_profile_button_enabled(False)
             self.main_view.refresh_chart(reset=True)
-            self._edit_fan_profile_presenter.show_add()
+            self._edit_fan_profile_presenter.show_add(self._get_cooler_count())
         else:
             profile: FanProfile = FanProfile.get(id=profile_id)
             self._fan_profile_selected = profile
@@ -419,7 +605,7 @@ class MainPresenter:
             else:
                 self.main_view.set_edit_fan_profile_button_enabled(True)
             self.main_view.set_apply_fan_profile_button_enabled(True)
-            self.main_view.refresh_chart(profile)
+            self.main_view.refresh_chart(self._fan_curve_repository.get(profile))
 
     def _set_fan_speed(self, gpu_index: int, speed: int = 100, manual_control: bool = True) -> None:
         _LOG.debug(f"Setting fan speed to {speed}")
@@ -429,13 +615,15 @@ class MainPresenter:
         ).subscribe(on_error=lambda e: (_LOG.exception(f"Set cooling error: {str(e)}"),
                                         self.main_view.set_statusbar_text('Error applying fan profile!'))))
 
-    def _update_current_fan_profile(self, profile: FanProfile) -> None:
+    def _update_current_fan_profile(self, profile: FanProfile, gpu_uuid: Optional[str]) -> None:
         current: CurrentFanProfile = CurrentFanProfile.get_or_none()
         if current is None:
             CurrentFanProfile.create(profile=profile)
         else:
             current.profile = profile
             current.save()
+        if gpu_uuid is not None:
+            GpuFanProfile.replace(gpu_uuid=gpu_uuid, profile=profile).execute()
         self.main_view.set_statusbar_text(f'{profile.name} fan profile selected')
 
     def _refresh_overclock_profile_ui(self, init: bool = False, profile_id: Optional[int] = None) -> None:
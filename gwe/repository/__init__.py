@@ -14,12 +14,16 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with gst.  If not, see <http://www.gnu.org/licenses/>.
+import logging
 import subprocess
 from typing import List, Tuple
 
 from gwe.util.deployment import is_flatpak
 
+_LOG = logging.getLogger(__name__)
 _FLATPAK_COMMAND_PREFIX = ['flatpak-spawn', '--host']
+NVIDIA_SMI_BINARY_NAME = 'nvidia-smi'
+NVIDIA_SETTINGS_BINARY_NAME = 'nvidia-settings'
 
 
 def run_and_get_stdout(command: List[str], pipe_command: List[str] = None) -> Tuple[int, str, str]:
@@ -37,3 +41,15 @@ def run_and_get_stdout(command: List[str], pipe_command: List[str] = None) -> Tu
     process1.stdout.close()
     output, error = process1.communicate()
     return process2.returncode, output.decode(encoding='UTF-8').strip(), error.decode(encoding='UTF-8').strip()
+
+
+def set_power_limit_with_nvidia_smi(gpu_index: int, limit: int) -> bool:
+    cmd = ['pkexec',
+           NVIDIA_SMI_BINARY_NAME,
+           '-i',
+           str(gpu_index),
+           '-pl',
+           str(limit)]
+    result = run_and_get_stdout(cmd)
+    _LOG.info(f"Exit code: {result[0]}. {result[1]}\n{result[2]}")
+    return result[0] == 0
@@ -0,0 +1,204 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple, Iterable
+
+from injector import singleton, inject
+
+from gwe.model.status import Status
+from gwe.repository.nvidia_repository import NvidiaRepository
+from gwe.repository.telemetry_backend import FanTarget
+from gwe.util.concurrency import synchronized_with_attr
+from gwe.util.fan_smoothing import WriteRate
+
+_LOG = logging.getLogger(__name__)
+_COALESCING_WINDOW_S = 0.05
+
+# (manual_control, speed), the speed is meaningless when the VBIOS is in control
+_FanCommand = Tuple[bool, Optional[int]]
+
+
+def _normalize(speed: int, manual_control: bool) -> _FanCommand:
+    return (True, speed) if manual_control else (False, None)
+
+
+@singleton
+class FanCommandCoalescer:
+    """Sits in front of NvidiaRepository.set_fan_speeds: drops the commands equal to the last one applied to a fan
+    and collapses the commands received within a short window into the latest one per fan, then writes them all in a
+    single batch. The last applied command is tracked per FanTarget: a command for all the fans of a GPU applies to
+    each of them, until one gets a command of its own."""
+
+    @inject
+    def __init__(self, nvidia_repository: NvidiaRepository) -> None:
+        self._nvidia_repository = nvidia_repository
+        self._lock = threading.RLock()
+        # Batches are written one at a time, even when a write outlasts the window
+        self._flush_lock = threading.Lock()
+        # None while a write is in flight, the state of the fans is unknown until it completes
+        self._applied: Dict[FanTarget, Optional[_FanCommand]] = {}
+        self._pending: Dict[FanTarget, _FanCommand] = {}
+        # Whether the latest command of each target has been applied, until taken by the FanController
+        self._results: Dict[FanTarget, bool] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._stopped = False
+        self.issued_count = 0
+        self.suppressed_count = 0
+        self.coalesced_count = 0
+        self.batch_count = 0
+        self.write_rate = WriteRate(time.monotonic())
+
+    def submit(self, gpu_index: int, speed: int = 100, manual_control: bool = True) -> None:
+        self.submit_batch({(gpu_index, None): (speed, manual_control)})
+
+    @synchronized_with_attr("_lock")
+    def submit_batch(self, commands: Dict[FanTarget, Tuple[int, bool]]) -> None:
+        """commands maps a FanTarget to (speed, manual_control)"""
+        for target, (speed, manual_control) in commands.items():
+            command = _normalize(speed, manual_control)
+            if target[1] is None:
+                # A command for all the fans supersedes the ones for a single fan still waiting
+                for pending_target in [t for t in self._pending if t[0] == target[0] and t[1] is not None]:
+                    del self._pending[pending_target]
+                    self.coalesced_count += 1
+            if target in self._pending:
+                # A newer command supersedes the one still waiting for the window to expire
+                self._pending[target] = command
+                self.coalesced_count += 1
+            elif self._get_applied(target) == command:
+                self.suppressed_count += 1
+                self._results[target] = True
+            else:
+                self._pending[target] = command
+        if self._stopped:
+            self._pending.clear()
+            return
+        if self._pending and self._timer is None:
+            self._timer = threading.Timer(_COALESCING_WINDOW_S, self._flush)
+            self._timer.daemon = True
+            self._timer.name = 'gwe-fan-command'
+            self._timer.start()
+
+    def stop(self) -> None:
+        """Drops the commands still waiting and ignores the next ones, so that none can be written after the fans
+        are switched back to auto on exit. Waits for a write in flight."""
+        with self._flush_lock:
+            with self._lock:
+                self._stopped = True
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                self._pending.clear()
+
+    @synchronized_with_attr("_lock")
+    def reconcile(self, status: Status) -> None:
+        """Forgets the applied commands contradicted by the hardware, e.g. after nvidia-settings took over a fan"""
+        for gpu_status in status.gpu_status_list:
+            if not gpu_status.fan.control_allowed:
+                continue
+            applied_commands = [(target, applied) for target, applied in self._applied.items()
+                                if target[0] == gpu_status.index and applied is not None]
+            targets = [target for target, _ in applied_commands]
+            if any(applied[0] != gpu_status.fan.manual_control for _, applied in applied_commands):
+                _LOG.debug(f"Fan control state of GPU {gpu_status.index} changed externally")
+                for target in targets:
+                    del self._applied[target]
+
+    @synchronized_with_attr("_lock")
+    def invalidate(self, gpu_indexes: Optional[Iterable[int]] = None) -> None:
+        if gpu_indexes is None:
+            self._applied.clear()
+            return
+        gpu_index_set = set(gpu_indexes)
+        for target in [t for t in self._applied if t[0] in gpu_index_set]:
+            del self._applied[target]
+
+    @synchronized_with_attr("_lock")
+    def take_results(self) -> Dict[FanTarget, bool]:
+        """The outcome of the latest command of each target written or suppressed since the previous call"""
+        results = self._results
+        self._results = {}
+        return results
+
+    def get_counters(self) -> Dict[str, int]:
+        return {
+            'issued': self.issued_count,
+            'suppressed': self.suppressed_count,
+            'coalesced': self.coalesced_count,
+            'batches': self.batch_count,
+        }
+
+    def format_write_rate(self) -> str:
+        timestamp = time.monotonic()
+        return (f"Fan writes: {self.write_rate.count} issued in {self.batch_count} batches, "
+                f"{self.write_rate.get_last_hour_count(timestamp)} in the last hour, "
+                f"{self.write_rate.get_per_hour(timestamp):.1f}/h on average, "
+                f"{self.suppressed_count} suppressed, {self.coalesced_count} coalesced")
+
+    def _get_applied(self, target: FanTarget) -> Optional[_FanCommand]:
+        gpu_index, cooler = target
+        if target in self._applied:
+            return self._applied[target]
+        if cooler is None:
+            # Unknown as soon as a fan got a command of its own
+            return None
+        return self._applied.get((gpu_index, None))
+
+    def _set_applied(self, target: FanTarget, command: Optional[_FanCommand]) -> None:
+        if target[1] is None:
+            for cooler_target in [t for t in self._applied if t[0] == target[0] and t[1] is not None]:
+                del self._applied[cooler_target]
+        self._applied[target] = command
+
+    def _flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                self._timer = None
+                if self._stopped:
+                    return
+                batch: Dict[FanTarget, _FanCommand] = {}
+                for target, command in self._pending.items():
+                    if self._get_applied(target) == command:
+                        self.suppressed_count += 1
+                        self._results[target] = True
+                    else:
+                        batch[target] = command
+                        self._set_applied(target, None)
+                self._pending.clear()
+            if not batch:
+                return
+            try:
+                errors = self._nvidia_repository.set_fan_speeds(
+                    {target: (speed if speed is not None else 100, manual_control)
+                     for target, (manual_control, speed) in batch.items()})
+            except:
+                _LOG.exception(f"Error while setting the fan speed of GPUs {sorted({t[0] for t in batch})}")
+                errors = {target: True for target in batch}
+            with self._lock:
+                self.batch_count += 1
+                timestamp = time.monotonic()
+                for target, command in batch.items():
+                    self.issued_count += 1
+                    self.write_rate.record(timestamp)
+                    applied = not errors.get(target, True)
+                    self._results[target] = applied
+                    if applied and target in self._applied:
+                        self._applied[target] = command
+            _LOG.debug(f"Fan writes: issued={self.issued_count}, suppressed={self.suppressed_count}, "
+                       f"coalesced={self.coalesced_count}, batches={self.batch_count}")
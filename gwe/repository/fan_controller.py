@@ -0,0 +1,373 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import threading
+import time
+from typing import Optional, Dict, Tuple, List, Set, Iterable
+
+from injector import singleton, inject
+
+from gwe.model.fan_curve import FanCurve
+from gwe.model.gpu_status import GpuStatus
+from gwe.model.status import Status
+from gwe.repository.fan_command_coalescer import FanCommandCoalescer
+from gwe.repository.telemetry_backend import FanTarget
+from gwe.util.concurrency import synchronized_with_attr
+from gwe.util.fan_smoothing import TemperatureFilter, FanDutyLimiter, create_temperature_filter
+from gwe.util.latency import LatencyStats
+
+_LOG = logging.getLogger(__name__)
+# A fan reading taken this long after a write is taken as the response of the fan to it, once the fan had time to
+# reach the new duty. A later reading that moves away from it by more than the tolerance means that something else
+# took over the fan, e.g. nvidia-settings or a resume from suspend. The reading isn't compared with the duty written,
+# because some fans clamp it, e.g. to a minimum duty.
+_FAN_SETTLE_TIME_S = 5.0
+_FAN_DUTY_TOLERANCE = 2
+
+# FanTarget -> (speed, manual_control), like FanCommandCoalescer.submit_batch()
+_FanCommands = Dict[FanTarget, Tuple[int, bool]]
+
+
+class _CoolerState:
+    """The control state of a fan, or of all the fans of a GPU driven by the same curve"""
+    __slots__ = ('duty_limiter', 'latest_update_temp', 'target_speed', 'submitted', 'written_time', 'settled_duties')
+
+    def __init__(self) -> None:
+        self.duty_limiter = FanDutyLimiter()
+        self.latest_update_temp: Optional[float] = None
+        self.target_speed: Optional[int] = None
+        # (duty, monotonic timestamp) of the write submitted, until the FanCommandCoalescer reports its outcome
+        self.submitted: Optional[Tuple[int, float]] = None
+        # Wall clock time at which the last write was known to be applied, like GpuStatus.timestamp
+        self.written_time: Optional[float] = None
+        # The fan readings once settled after the last write
+        self.settled_duties: Optional[Tuple[int, ...]] = None
+
+    def on_write_result(self, applied: bool) -> None:
+        if self.submitted is None:
+            return
+        if applied:
+            self.duty_limiter.on_written(*self.submitted)
+            self.written_time = time.time()
+            self.settled_duties = None
+            self.submitted = None
+        else:
+            # The limiter keeps the last duty applied, the target is written again with the next sample
+            self.forget()
+
+    def forget(self) -> None:
+        """Drops what is known about the fan, so that the next sample writes the target duty again"""
+        self.target_speed = None
+        self.latest_update_temp = None
+        self.submitted = None
+        self.written_time = None
+        self.settled_duties = None
+
+
+class _GpuFanState:
+    """The control state of a GPU, only used by the control thread"""
+    __slots__ = ('curve', 'smoothing', 'temperature_filter', 'coolers')
+
+    def __init__(self, smoothing: Tuple[int, bool]) -> None:
+        self.curve: Optional[FanCurve] = None
+        self.smoothing = smoothing
+        self.temperature_filter: TemperatureFilter = create_temperature_filter(*smoothing)
+        # By position in Fan.fan_list, None when all the fans follow the same curve
+        self.coolers: Dict[Optional[int], _CoolerState] = {}
+
+    def set_auto(self, timestamp: float) -> Tuple[int, bool]:
+        for cooler_state in self.coolers.values():
+            cooler_state.forget()
+            cooler_state.duty_limiter.on_written(None, timestamp)
+        return 100, False
+
+
+@singleton
+class FanController:
+    """Evaluates the fan curve applied to each GPU on its own thread, fed with the samples straight from the poller,
+    so that a stalled GTK main loop can't delay the cooling. Between the curve and the fan writes, the temperature
+    can be smoothed and the duty changes limited in speed and frequency, see gwe.util.fan_smoothing.
+
+    The curves are keyed by GPU UUID. Every sample is evaluated for all the GPUs in one pass and the resulting writes
+    are submitted to the FanCommandCoalescer as a single batch. When the profile has steps for single fans, each fan
+    follows its own curve and is written on its own, only when its duty changes.
+
+    Only the latest sample is kept: if the thread falls behind, the older ones are dropped. The sample→write latency
+    is the time from the poller handing over a sample to the write being submitted to the FanCommandCoalescer, which
+    adds its coalescing window (50 ms) before the driver call. It doesn't depend on the GTK main loop at all, see
+    scripts/benchmark_fan_control_latency.py."""
+
+    @inject
+    def __init__(self, fan_command_coalescer: FanCommandCoalescer) -> None:
+        self._fan_command_coalescer = fan_command_coalescer
+        self._lock = threading.RLock()
+        self._condition = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._has_sample = False
+        self._sample: Optional[Status] = None
+        self._sample_time = 0.0
+        self._curves: Dict[str, FanCurve] = {}
+        self._hysteresis = 0
+        self._smoothing: Tuple[int, bool] = (1, False)
+        self._duty_limits: Tuple[float, float] = (0, 0)
+        self._reset_gpu_indexes: Set[int] = set()
+        # Only used by the control thread
+        self._states: Dict[str, _GpuFanState] = {}
+        self._gpu_indexes: Dict[str, int] = {}
+        self._latency = LatencyStats('Fan control sample to write')
+
+    @synchronized_with_attr("_lock")
+    def set_fan_curve(self, gpu_uuid: str, curve: Optional[FanCurve]) -> None:
+        """Applies a fan curve to a GPU. None leaves the fans alone, e.g. when the VBIOS is in control."""
+        if curve is None:
+            self._curves.pop(gpu_uuid, None)
+        else:
+            self._curves[gpu_uuid] = curve
+
+    @synchronized_with_attr("_lock")
+    def set_hysteresis(self, hysteresis: int) -> None:
+        self._hysteresis = hysteresis
+
+    @synchronized_with_attr("_lock")
+    def set_temperature_smoothing(self, samples: int, median: bool = False) -> None:
+        self._smoothing = (samples, median)
+
+    @synchronized_with_attr("_lock")
+    def set_duty_limits(self, max_slew_per_s: float, min_dwell_s: float) -> None:
+        self._duty_limits = (max_slew_per_s, min_dwell_s)
+
+    @synchronized_with_attr("_lock")
+    def reset(self, gpu_indexes: Iterable[int]) -> None:
+        """Forgets the control state of the GPUs, e.g. after the FanWatchdog gave their fans back to the VBIOS, so
+        that the next sample writes their duty again"""
+        self._reset_gpu_indexes.update(gpu_indexes)
+
+    def get_latency(self) -> LatencyStats:
+        return self._latency
+
+    def submit(self, status: Optional[Status]) -> None:
+        """Called by the poller with every sample, returns without waiting for the control thread"""
+        with self._condition:
+            if self._stopped:
+                return
+            self._sample = status
+            self._sample_time = time.perf_counter()
+            self._has_sample = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='gwe-fan-control', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            thread = self._thread
+            self._thread = None
+            self._condition.notify()
+        if thread is not None:
+            thread.join(timeout=1)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._has_sample and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                status, sample_time = self._sample, self._sample_time
+                self._has_sample = False
+                self._sample = None
+                # The settings are copied, so that the poller is never blocked by a write
+                curves = dict(self._curves)
+                hysteresis, smoothing, duty_limits = self._hysteresis, self._smoothing, self._duty_limits
+            try:
+                commands = self._control(status, curves, hysteresis, smoothing, duty_limits)
+                if commands:
+                    self._fan_command_coalescer.submit_batch(commands)
+                    self._latency.record(time.perf_counter() - sample_time)
+            except:
+                _LOG.exception("Error while controlling the fans")
+
+    def _control(self,
+                 status: Optional[Status],
+                 curves: Dict[str, FanCurve],
+                 hysteresis: int,
+                 smoothing: Tuple[int, bool],
+                 duty_limits: Tuple[float, float]) -> _FanCommands:
+        timestamp = time.monotonic()
+        commands: _FanCommands = {}
+        if status is None:
+            # The sensors are gone, the VBIOS takes over the GPUs that were controlled
+            for gpu_uuid, gpu_index in self._gpu_indexes.items():
+                state = self._states.get(gpu_uuid)
+                if gpu_uuid in curves and state is not None:
+                    state.temperature_filter.reset()
+                    commands[(gpu_index, None)] = state.set_auto(timestamp)
+            return commands
+        self._gpu_indexes = {gpu_status.info.uuid: gpu_status.index
+                             for gpu_status in status.gpu_status_list if gpu_status.info.uuid}
+        with self._lock:
+            reset_gpu_indexes = self._reset_gpu_indexes
+            self._reset_gpu_indexes = set()
+        write_results = self._fan_command_coalescer.take_results()
+        for gpu_status in status.gpu_status_list:
+            gpu_uuid = gpu_status.info.uuid
+            if gpu_uuid and gpu_status.index in reset_gpu_indexes:
+                self._states.pop(gpu_uuid, None)
+            curve = curves.get(gpu_uuid) if gpu_uuid else None
+            if curve is None:
+                continue
+            state = self._get_state(gpu_uuid, curve, smoothing)
+            for (gpu_index, cooler), applied in write_results.items():
+                cooler_state = state.coolers.get(cooler)
+                if gpu_index == gpu_status.index and cooler_state is not None:
+                    cooler_state.on_write_result(applied)
+            if self._check_fans(gpu_status, state, timestamp):
+                # The applied commands the coalescer knows of are stale as well
+                self._fan_command_coalescer.invalidate([gpu_status.index])
+            for cooler, command in self._control_gpu(gpu_status, curve, state, hysteresis, duty_limits, timestamp):
+                commands[(gpu_status.index, cooler)] = command
+        return commands
+
+    def _get_state(self, gpu_uuid: str, curve: FanCurve, smoothing: Tuple[int, bool]) -> _GpuFanState:
+        state = self._states.get(gpu_uuid)
+        if state is None:
+            state = _GpuFanState(smoothing)
+            self._states[gpu_uuid] = state
+        if state.smoothing != smoothing:
+            state.smoothing = smoothing
+            state.temperature_filter = create_temperature_filter(*smoothing)
+        if curve is not state.curve:
+            # A new profile is applied right away, without hysteresis or dwell time
+            state.curve = curve
+            state.coolers.clear()
+        return state
+
+    @staticmethod
+    def _check_fans(gpu_status: GpuStatus, state: _GpuFanState, timestamp: float) -> bool:
+        """Forgets the fans changed by something else since they were written, returns True if any was"""
+        changed = False
+        for cooler, cooler_state in state.coolers.items():
+            # Only the samples taken after the write was applied tell something about it
+            if cooler_state.written_time is None or gpu_status.timestamp is None \
+                    or gpu_status.timestamp < cooler_state.written_time:
+                continue
+            if not gpu_status.fan.manual_control:
+                _LOG.info(f"Fans of GPU {gpu_status.index} no longer in manual control, writing them again")
+            else:
+                duties = tuple(duty for i, (duty, _) in enumerate(gpu_status.fan.fan_list or [])
+                               if cooler is None or i == cooler)
+                if not duties or gpu_status.timestamp < cooler_state.written_time + _FAN_SETTLE_TIME_S:
+                    continue
+                if cooler_state.settled_duties is None or len(duties) != len(cooler_state.settled_duties):
+                    cooler_state.settled_duties = duties
+                    continue
+                if all(abs(duty - settled) <= _FAN_DUTY_TOLERANCE
+                       for duty, settled in zip(duties, cooler_state.settled_duties)):
+                    continue
+                _LOG.info(f"Duty of the fans of GPU {gpu_status.index} changed from {cooler_state.settled_duties} "
+                          f"to {duties}, writing them again")
+            cooler_state.forget()
+            # Whatever the limiter knew of the duty is stale too, the target is applied right away
+            cooler_state.duty_limiter.on_written(None, timestamp)
+            changed = True
+        return changed
+
+    def _control_gpu(self,
+                     gpu_status: GpuStatus,
+                     curve: FanCurve,
+                     state: _GpuFanState,
+                     hysteresis: int,
+                     duty_limits: Tuple[float, float],
+                     timestamp: float) -> List[Tuple[Optional[int], Tuple[int, bool]]]:
+        """Returns the commands for the fans of the GPU, as (cooler, command)"""
+        if not gpu_status.fan.control_allowed:
+            return []
+        if not curve and not curve.coolers:
+            return [(None, state.set_auto(timestamp))]
+        if not gpu_status.temp.gpu:
+            return []
+        cooler_curves: List[Tuple[Optional[int], FanCurve]]
+        if curve.coolers:
+            cooler_curves = [(cooler, curve.get_cooler_curve(cooler))
+                             for cooler in range(len(gpu_status.fan.fan_list or []))]
+        else:
+            cooler_curves = [(None, curve)]
+        try:
+            temp = state.temperature_filter.update(gpu_status.temp.gpu)
+        except (ValueError, TypeError):
+            _LOG.exception(f'Unable to parse temperature {gpu_status.temp.gpu}')
+            return []
+        if curve.vbios_silent_mode \
+                and all(temp < cooler_curve.temperatures[0] for _, cooler_curve in cooler_curves if cooler_curve):
+            return [(None, state.set_auto(timestamp))]
+        commands: List[Tuple[Optional[int], Tuple[int, bool]]] = []
+        for cooler, cooler_curve in cooler_curves:
+            if not cooler_curve:
+                continue
+            cooler_state = state.coolers.get(cooler)
+            if cooler_state is None:
+                cooler_state = _CoolerState()
+                state.coolers[cooler] = cooler_state
+            duty = self._control_cooler(gpu_status, cooler_curve, cooler_state, temp, hysteresis, duty_limits,
+                                        timestamp)
+            if duty is not None:
+                commands.append((cooler, (duty, True)))
+        return commands
+
+    def _control_cooler(self,
+                        gpu_status: GpuStatus,
+                        curve: FanCurve,
+                        state: _CoolerState,
+                        temp: float,
+                        hysteresis: int,
+                        duty_limits: Tuple[float, float],
+                        timestamp: float) -> Optional[int]:
+        speed = round(curve.get_duty(temp))
+        if self._should_update_fan_duty(gpu_status, state, temp, speed, hysteresis):
+            state.target_speed = speed
+        if state.target_speed is None:
+            return None
+        # While the limiter holds the duty back, the following samples keep moving it towards the target
+        state.duty_limiter.max_slew_per_s, state.duty_limiter.min_dwell_s = duty_limits
+        duty = state.duty_limiter.limit(state.target_speed, timestamp)
+        if duty is None:
+            return None
+        # Recorded by the limiter only once the FanCommandCoalescer reports the write as applied
+        state.submitted = (duty, timestamp)
+        return duty
+
+    @staticmethod
+    def _should_update_fan_duty(gpu_status: GpuStatus,
+                                state: _CoolerState,
+                                current_temp: float,
+                                speed: int,
+                                hysteresis: int) -> bool:
+        if not gpu_status.fan.fan_list or speed == state.target_speed:
+            return False
+        # The hysteresis value is used to avoid fan fluctuations. In a few words, when the temperature rises, the new
+        # fan duty value is applied immediately. When it lowers, the last applied fan duty value is kept until the
+        # current temperature is hysteresis degrees lower than the temperature that caused the current fan duty to be
+        # applied.
+        if state.latest_update_temp is not None and hysteresis != 0:
+            temp_delta = current_temp - state.latest_update_temp
+            if -hysteresis <= temp_delta <= 0:
+                return False
+
+        state.latest_update_temp = current_temp
+        return True
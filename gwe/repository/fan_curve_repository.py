@@ -0,0 +1,68 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import threading
+from typing import Dict
+
+from injector import singleton, inject
+
+from gwe.di import SpeedStepChangedSubject, FanProfileChangedSubject
+from gwe.model.cb_change import DbChange
+from gwe.model.fan_curve import FanCurve
+from gwe.model.fan_profile import FanProfile
+from gwe.util.concurrency import synchronized_with_attr
+
+_LOG = logging.getLogger(__name__)
+
+
+@singleton
+class FanCurveRepository:
+    """Compiles the FanCurve of a fan profile on first use and keeps it until the profile or its steps change"""
+
+    @inject
+    def __init__(self,
+                 speed_step_changed_subject: SpeedStepChangedSubject,
+                 fan_profile_changed_subject: FanProfileChangedSubject,
+                 ) -> None:
+        self._lock = threading.RLock()
+        self._curves: Dict[int, FanCurve] = {}
+        # Subscribed before the presenters, so that their listeners already get the rebuilt curve
+        speed_step_changed_subject.subscribe(
+            on_next=self._on_speed_step_changed,
+            on_error=lambda e: _LOG.exception(f"Db signal error: {str(e)}"))
+        fan_profile_changed_subject.subscribe(
+            on_next=self._on_fan_profile_changed,
+            on_error=lambda e: _LOG.exception(f"Db signal error: {str(e)}"))
+
+    @synchronized_with_attr("_lock")
+    def get(self, profile: FanProfile) -> FanCurve:
+        curve = self._curves.get(profile.id)
+        if curve is None:
+            curve = FanCurve.from_profile(profile)
+            self._curves[profile.id] = curve
+            _LOG.debug(f"Fan curve of profile {profile.id} compiled")
+        return curve
+
+    @synchronized_with_attr("_lock")
+    def invalidate(self, profile_id: int) -> None:
+        self._curves.pop(profile_id, None)
+
+    def _on_speed_step_changed(self, db_change: DbChange) -> None:
+        self.invalidate(db_change.entry.profile_id)
+
+    def _on_fan_profile_changed(self, db_change: DbChange) -> None:
+        self.invalidate(db_change.entry.id)
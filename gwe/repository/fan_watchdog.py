@@ -0,0 +1,170 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import threading
+import time
+from typing import Optional, Dict, Set, List
+
+from injector import singleton, inject
+
+from gwe.model.status import Status
+from gwe.repository.fan_command_coalescer import FanCommandCoalescer
+from gwe.repository.fan_controller import FanController
+from gwe.repository.nvidia_repository import NvidiaRepository
+from gwe.util.concurrency import synchronized_with_attr
+
+_LOG = logging.getLogger(__name__)
+_CHECK_INTERVAL_MAX_S = 1.0
+
+
+class _IntervalStats:
+    """Minimum, mean and maximum of the intervals between two events, the lock of the owner is expected to be held"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_s = 0.0
+        self.min_s = 0.0
+        self.max_s = 0.0
+
+    @property
+    def mean_s(self) -> float:
+        return self.total_s / self.count if self.count else 0.0
+
+    def record(self, interval_s: float) -> None:
+        self.min_s = interval_s if not self.count else min(self.min_s, interval_s)
+        self.max_s = max(self.max_s, interval_s)
+        self.count += 1
+        self.total_s += interval_s
+
+
+@singleton
+class FanWatchdog:
+    """Measures the age of the last good sample (one with the GPU temperature) of every GPU, on a thread of its own.
+    When a GPU whose fans can be controlled goes without one for longer than the deadline, e.g. because the poller
+    hangs inside an X call, its fans are given back to the VBIOS with NvidiaRepository.reset_fans_to_auto(), which
+    doesn't go through the stalled reads. The FanController takes them over again with the next good sample."""
+
+    @inject
+    def __init__(self,
+                 nvidia_repository: NvidiaRepository,
+                 fan_command_coalescer: FanCommandCoalescer,
+                 fan_controller: FanController,
+                 ) -> None:
+        self._nvidia_repository = nvidia_repository
+        self._fan_command_coalescer = fan_command_coalescer
+        self._fan_controller = fan_controller
+        self._lock = threading.RLock()
+        self._condition = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._deadline_s = 0.0
+        self._sample_times: Dict[int, float] = {}
+        self._controllable: Set[int] = set()
+        self._reverted: Set[int] = set()
+        self.fallback_count = 0
+        self._sample_interval = _IntervalStats()
+
+    @synchronized_with_attr("_lock")
+    def set_deadline(self, deadline_s: float) -> None:
+        """0 disables the watchdog"""
+        self._deadline_s = deadline_s
+        if deadline_s > 0 and self._thread is None and not self._stopped:
+            self._thread = threading.Thread(target=self._run, name='gwe-fan-watchdog', daemon=True)
+            self._thread.start()
+        self._condition.notify()
+
+    def on_sample(self, status: Optional[Status]) -> None:
+        """Called by the poller with every sample"""
+        if status is None:
+            return
+        timestamp = time.monotonic()
+        with self._lock:
+            for gpu_status in status.gpu_status_list:
+                if gpu_status.temp.gpu is None:
+                    continue
+                last_sample_time = self._sample_times.get(gpu_status.index)
+                if last_sample_time is not None:
+                    self._sample_interval.record(timestamp - last_sample_time)
+                self._sample_times[gpu_status.index] = timestamp
+                if gpu_status.fan.control_allowed:
+                    self._controllable.add(gpu_status.index)
+                else:
+                    self._controllable.discard(gpu_status.index)
+                if gpu_status.index in self._reverted:
+                    self._reverted.discard(gpu_status.index)
+                    _LOG.info(f"GPU {gpu_status.index} readings resumed after "
+                              f"{timestamp - last_sample_time:.1f} s")  # type: ignore
+
+    @synchronized_with_attr("_lock")
+    def get_sample_age(self, gpu_index: int) -> Optional[float]:
+        """Seconds since the last good sample of the GPU, None before the first one"""
+        sample_time = self._sample_times.get(gpu_index)
+        return None if sample_time is None else time.monotonic() - sample_time
+
+    @synchronized_with_attr("_lock")
+    def is_reverted(self, gpu_index: int) -> bool:
+        return gpu_index in self._reverted
+
+    def format_sample_ages(self) -> str:
+        timestamp = time.monotonic()
+        with self._lock:
+            ages = ', '.join(f"GPU {gpu_index} {timestamp - sample_time:.1f} s"
+                             for gpu_index, sample_time in sorted(self._sample_times.items()))
+            interval = self._sample_interval
+            return (f"Sample age: {ages or 'no sample yet'}; interval between good samples: "
+                    f"min={interval.min_s:.2f} s, mean={interval.mean_s:.2f} s, max={interval.max_s:.2f} s; "
+                    f"{self.fallback_count} fallbacks to automatic")
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            thread = self._thread
+            self._thread = None
+            self._condition.notify()
+        if thread is not None:
+            thread.join(timeout=1)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if self._stopped:
+                    return
+                if self._deadline_s <= 0:
+                    self._condition.wait()
+                    continue
+                stale_gpu_indexes = self._get_stale_gpu_indexes(self._deadline_s)
+                if not stale_gpu_indexes:
+                    self._condition.wait(min(_CHECK_INTERVAL_MAX_S, self._deadline_s / 4))
+                    continue
+                self._reverted.update(stale_gpu_indexes)
+                self.fallback_count += len(stale_gpu_indexes)
+                deadline_s = self._deadline_s
+            _LOG.warning(f"No reading from GPUs {stale_gpu_indexes} for more than {deadline_s} s, "
+                         f"switching their fans to automatic")
+            try:
+                if self._nvidia_repository.reset_fans_to_auto(stale_gpu_indexes):
+                    _LOG.error(f"Unable to switch the fans of GPUs {stale_gpu_indexes} to automatic")
+            except:
+                _LOG.exception(f"Error while switching the fans of GPUs {stale_gpu_indexes} to automatic")
+            self._fan_command_coalescer.invalidate(stale_gpu_indexes)
+            self._fan_controller.reset(stale_gpu_indexes)
+
+    def _get_stale_gpu_indexes(self, deadline_s: float) -> List[int]:
+        timestamp = time.monotonic()
+        return sorted(gpu_index for gpu_index, sample_time in self._sample_times.items()
+                      if gpu_index in self._controllable and gpu_index not in self._reverted
+                      and timestamp - sample_time > deadline_s)
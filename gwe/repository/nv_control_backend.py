@@ -0,0 +1,540 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2020 Roberto Leinardi
+#
+# gst is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gst is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gst.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Dict, Optional, Tuple, Any
+
+from Xlib import display
+from Xlib.ext.nvcontrol import Gpu, Cooler, NV_CTRL_STRING_GPU_UTILIZATION, NV_CTRL_GPU_PCIE_GENERATION, \
+    NV_CTRL_GPU_PCIE_CURRENT_LINK_WIDTH, NV_CTRL_VIDEO_ENCODER_UTILIZATION, NV_CTRL_VIDEO_DECODER_UTILIZATION, \
+    NV_CTRL_STRING_GPU_CURRENT_CLOCK_FREQS, NV_CTRL_GPU_MEM_TRANSFER_RATE_OFFSET, NV_CTRL_GPU_NVCLOCK_OFFSET, \
+    NV_CTRL_GPU_COOLER_MANUAL_CONTROL, NV_CTRL_THERMAL_COOLER_CURRENT_LEVEL, NV_CTRL_THERMAL_COOLER_SPEED
+from py3nvml import py3nvml
+from py3nvml.py3nvml import NVML_CLOCK_SM, NVMLError, NVML_TEMPERATURE_THRESHOLD_SLOWDOWN, \
+    NVML_TEMPERATURE_THRESHOLD_SHUTDOWN
+
+from gwe.model.clocks import Clocks
+from gwe.model.fan import Fan
+from gwe.model.gpu_descriptor import GpuDescriptor
+from gwe.model.gpu_process import GpuProcess
+from gwe.model.gpu_status import GpuStatus
+from gwe.model.info import Info
+from gwe.model.overclock import Overclock
+from gwe.model.status import Status
+from gwe.repository import set_power_limit_with_nvidia_smi
+from gwe.repository.nv_control_batch import NvControlQueryBatch, UNSUPPORTED_AFTER_FAILURES
+from gwe.repository.nv_control_connection import NvControlConnection, NvControlConnectionError
+from gwe.repository.nvml_session import NvmlSession, convert_milliwatt_to_watt
+from gwe.repository.telemetry_backend import TelemetryBackend, FAN_WRITE_LATENCY_BUDGET_S, FanTarget
+from gwe.util.call_metrics import CallMetrics
+from gwe.util.concurrency import synchronized_with_attr
+from gwe.util.latency import LatencyStats
+
+_LOG = logging.getLogger(__name__)
+
+
+class NvControlBackend(TelemetryBackend):
+    """Reads and writes through the NV-CONTROL X extension, using NVML for the values NV-CONTROL doesn't expose"""
+
+    def __init__(self,
+                 ctrl_display: Optional[str] = None,
+                 parallel_sampling: bool = False,
+                 call_metrics: Optional[CallMetrics] = None) -> None:
+        self._lock = threading.RLock()
+        self._gpu_count = 0
+        self._descriptors: Dict[int, GpuDescriptor] = {}
+        # Consecutive NV-CONTROL replies without a value, per GPU and attribute
+        self._attribute_failures: Dict[int, Dict[str, int]] = {}
+        self._call_metrics = call_metrics if call_metrics is not None else CallMetrics()
+        self._nvml_session = NvmlSession(self._call_metrics)
+        self._ctrl_display = ctrl_display
+        self._nv_control = NvControlConnection(ctrl_display, self._clear_attribute_failures)
+        self._parallel_sampling = parallel_sampling
+        self._sampling_executor: Optional[ThreadPoolExecutor] = None
+        self._sampling_connections: Dict[int, NvControlConnection] = {}
+        # Writes never share a connection (nor its lock) with the polls, so they don't wait for a sampling cycle
+        self._write_connections_lock = threading.Lock()
+        self._write_connections: Dict[int, NvControlConnection] = {}
+        # Writes the fans of different GPUs of a round at the same time, each on the connection of its GPU
+        self._write_executor: Optional[ThreadPoolExecutor] = None
+        # Used only by reset_fans_to_auto(), so that not even a hung fan write can hold it
+        self._reset_connection: Optional[NvControlConnection] = None
+        self._fan_write_latency = LatencyStats('Fan write', FAN_WRITE_LATENCY_BUDGET_S)
+        # Last known state of the manual fan control, from the polls and the writes
+        self._manual_control_state: Dict[int, bool] = {}
+
+    def requires_nv_control(self) -> bool:
+        return True
+
+    @synchronized_with_attr("_lock")
+    def has_nv_control_extension(self) -> bool:
+        try:
+            return self._nv_control.run(lambda xlib_display: bool(xlib_display.has_extension('NV-CONTROL')))
+        except:
+            _LOG.exception("Error while checking NV-CONTROL extension")
+        return False
+
+    @synchronized_with_attr("_lock")
+    def has_nvml_shared_library(self) -> bool:
+        try:
+            self._nvml_session.init()
+            return True
+        except:
+            _LOG.exception("Error while checking NVML Shared Library")
+        return False
+
+    @synchronized_with_attr("_lock")
+    def close(self) -> None:
+        self._shutdown_sampling_workers()
+        self._nv_control.close()
+        with self._write_connections_lock:
+            for connection in self._write_connections.values():
+                connection.close()
+            self._write_connections.clear()
+            if self._write_executor is not None:
+                self._write_executor.shutdown(wait=False)
+                self._write_executor = None
+            if self._reset_connection is not None:
+                self._reset_connection.close()
+                self._reset_connection = None
+        self._nvml_session.shutdown()
+
+    @synchronized_with_attr("_lock")
+    def get_status(self) -> Optional[Status]:
+        try:
+            return self._get_status()
+        except NVMLError as err:
+            if not NvmlSession.is_session_lost(err):
+                _LOG.exception("Error while getting status")
+                return None
+            _LOG.warning(f"NVML session lost (error {err.value}), reinitializing")
+        except:
+            _LOG.exception("Error while getting status")
+            return None
+        try:
+            self._nvml_session.reset()
+            self._invalidate_descriptors()
+            return self._get_status()
+        except:
+            _LOG.exception("Error while getting status")
+        return None
+
+    def _get_status(self) -> Status:
+        self._nvml_session.init()
+        time1 = time.time()
+        gpu_count = self._nv_control.run(
+            lambda xlib_display: self._call_metrics.call('system', xlib_display.nvcontrol_get_gpu_count))
+        if gpu_count != self._gpu_count:
+            _LOG.info(f"GPU count changed from {self._gpu_count} to {gpu_count}")
+            self._invalidate_descriptors()
+            self._shutdown_sampling_workers()
+        self._gpu_count = gpu_count
+        if self._parallel_sampling and gpu_count > 1:
+            gpu_status_list = self._read_gpu_status_list_in_parallel()
+        else:
+            gpu_status_list = [self._nv_control.run(partial(self._read_gpu_status, gpu_index=gpu_index))
+                               for gpu_index in range(gpu_count)]
+        time2 = time.time()
+        skew_list = [f'{((gpu_status.timestamp - time1) * 1000.0):.3f}' for gpu_status in gpu_status_list
+                     if gpu_status.timestamp is not None]
+        _LOG.debug(f'Fetching new data took {((time2 - time1) * 1000.0):.3f} ms '
+                   f'(per GPU skew: {", ".join(skew_list)} ms)')
+        return Status(gpu_status_list, timestamp=time1)
+
+    def _read_gpu_status_list_in_parallel(self) -> List[GpuStatus]:
+        if self._sampling_executor is None:
+            self._sampling_executor = ThreadPoolExecutor(max_workers=self._gpu_count,
+                                                         thread_name_prefix='gwe-sampling')
+        futures = []
+        for gpu_index in range(self._gpu_count):
+            connection = self._sampling_connections.get(gpu_index)
+            if connection is None:
+                connection = NvControlConnection(self._ctrl_display,
+                                                 partial(self._clear_attribute_failures, gpu_index))
+                self._sampling_connections[gpu_index] = connection
+            futures.append(self._sampling_executor.submit(
+                connection.run, partial(self._read_gpu_status, gpu_index=gpu_index)))
+        return [future.result() for future in futures]
+
+    def _shutdown_sampling_workers(self) -> None:
+        if self._sampling_executor is not None:
+            self._sampling_executor.shutdown(wait=True)
+            self._sampling_executor = None
+        for connection in self._sampling_connections.values():
+            connection.close()
+        self._sampling_connections.clear()
+
+    def _read_gpu_status(self, xlib_display: display.Display, gpu_index: int) -> GpuStatus:
+        timestamp = time.time()
+        gpu = Gpu(gpu_index)
+        descriptor = self._descriptors.get(gpu_index)
+        if descriptor is None:
+            descriptor = self._read_descriptor(xlib_display, gpu)
+            self._descriptors[gpu_index] = descriptor
+        handle = self._nvml_session.get_handle_by_uuid(descriptor.uuid)
+        memory_used = None
+        mem_info = self._nvml_session.get_val(py3nvml.nvmlDeviceGetMemoryInfo, handle)
+        if mem_info is not None:
+            memory_used = mem_info.used // 1024 // 1024
+        results = self._query_volatile_attributes(xlib_display, gpu, descriptor)
+        util = results['util']
+        info = Info(
+            name=descriptor.name,
+            vbios=descriptor.vbios,
+            driver=descriptor.driver,
+            pcie_current_generation=results['pcie_generation'],
+            pcie_max_generation=descriptor.pcie_max_generation,
+            pcie_current_link=results['pcie_link'],
+            pcie_max_link=descriptor.pcie_max_link,
+            cuda_cores=descriptor.cuda_cores,
+            uuid=descriptor.uuid,
+            memory_total=descriptor.memory_total,
+            memory_used=memory_used,
+            memory_interface=descriptor.memory_interface,
+            memory_usage=util.get('memory'),
+            gpu_usage=util.get('graphics'),
+            encoder_usage=results['encoder_usage'],
+            decoder_usage=results['decoder_usage']
+        )
+
+        power = self._nvml_session.read_power(handle, descriptor)
+        temp = self._nvml_session.read_temp(handle, descriptor)
+
+        perf_level_max = descriptor.perf_level_max
+        if perf_level_max is not None:
+            clock_info = results['clock_info']
+            clocks = Clocks(
+                graphic_current=clock_info.get('nvclock'),
+                graphic_max=descriptor.graphic_clock_max,
+                sm_current=self._nvml_session.get_val(py3nvml.nvmlDeviceGetClockInfo, handle, NVML_CLOCK_SM),
+                sm_max=descriptor.sm_clock_max,
+                memory_current=clock_info.get('memclock'),
+                memory_max=descriptor.memory_clock_max,
+                video_current=self._nvml_session.get_val(py3nvml.nvmlDeviceGetClockInfo, handle, 3),  # Missing
+                video_max=descriptor.video_clock_max
+            )
+        else:
+            clocks = Clocks()
+
+        if descriptor.memory_offset_range is not None:
+            mem_transfer_rate_offset = results['mem_transfer_rate_offset']
+            mem_clock_offset = None
+            if mem_transfer_rate_offset is not None:
+                mem_clock_offset = mem_transfer_rate_offset // 2
+            overclock = Overclock(
+                available=mem_transfer_rate_offset is not None,
+                gpu_range=descriptor.gpu_offset_range,
+                gpu_offset=results['gpu_nvclock_offset'],
+                memory_range=descriptor.memory_offset_range,
+                memory_offset=mem_clock_offset,
+                perf_level_max=perf_level_max
+            )
+        else:
+            overclock = Overclock(perf_level_max=perf_level_max)
+
+        manual_control = results['manual_control']
+        if manual_control is not None:
+            self._manual_control_state[gpu_index] = bool(manual_control)
+        fan_list: Optional[List[Tuple[int, int]]] = None
+        if descriptor.cooler_indexes:
+            fan_list = []
+            for i in descriptor.cooler_indexes:
+                duty = results[f'fan_duty_{i}']
+                rpm = results[f'fan_rpm_{i}']
+                if duty is not None and rpm is not None:
+                    fan_list.append((duty, rpm))
+        fan = Fan(
+            fan_list=fan_list,
+            control_allowed=manual_control is not None,
+            manual_control=manual_control is not None and manual_control,
+        )
+
+        gpu_status = GpuStatus(
+            index=gpu_index,
+            info=info,
+            power=power,
+            temp=temp,
+            fan=fan,
+            clocks=clocks,
+            overclock=overclock,
+            descriptor=descriptor,
+            timestamp=timestamp
+        )
+
+        # Used to test Empty data
+        # gpu_status = GpuStatus(
+        #     index=gpu_index,
+        #     info=Info(),
+        #     power=Power(),
+        #     temp=Temp(),
+        #     fan=Fan(),
+        #     clocks=Clocks(),
+        #     overclock=Overclock()
+        # )
+        return gpu_status
+
+    def _query_volatile_attributes(self,
+                                   xlib_display: display.Display,
+                                   gpu: Gpu,
+                                   descriptor: GpuDescriptor) -> Dict[str, Any]:
+        failures = self._attribute_failures.setdefault(gpu.id(), {})
+        unsupported = self._get_unsupported_attributes(gpu.id())
+        batch = NvControlQueryBatch(xlib_display, failures, self._call_metrics, descriptor.uuid)
+        batch.query_key_values('util', gpu, NV_CTRL_STRING_GPU_UTILIZATION)
+        batch.query_int('pcie_generation', gpu, NV_CTRL_GPU_PCIE_GENERATION)
+        batch.query_int('pcie_link', gpu, NV_CTRL_GPU_PCIE_CURRENT_LINK_WIDTH)
+        batch.query_int('encoder_usage', gpu, NV_CTRL_VIDEO_ENCODER_UTILIZATION)
+        batch.query_int('decoder_usage', gpu, NV_CTRL_VIDEO_DECODER_UTILIZATION)
+        if descriptor.perf_level_max is not None:
+            batch.query_key_values('clock_info', gpu, NV_CTRL_STRING_GPU_CURRENT_CLOCK_FREQS)
+        if descriptor.memory_offset_range is not None:
+            batch.query_int('mem_transfer_rate_offset', gpu, NV_CTRL_GPU_MEM_TRANSFER_RATE_OFFSET,
+                            descriptor.perf_level_max)
+            batch.query_int('gpu_nvclock_offset', gpu, NV_CTRL_GPU_NVCLOCK_OFFSET, descriptor.perf_level_max)
+        # The fan controller acts on these, so they are queried on every poll even after failing
+        batch.query_int('manual_control', gpu, NV_CTRL_GPU_COOLER_MANUAL_CONTROL, volatile=True)
+        for i in descriptor.cooler_indexes or []:
+            batch.query_int(f'fan_duty_{i}', Cooler(i), NV_CTRL_THERMAL_COOLER_CURRENT_LEVEL, volatile=True)
+            batch.query_int(f'fan_rpm_{i}', Cooler(i), NV_CTRL_THERMAL_COOLER_SPEED, volatile=True)
+        results = batch.execute()
+        skipped = self._get_unsupported_attributes(gpu.id())
+        if skipped != unsupported:
+            _LOG.debug(f"Skipping unsupported NV-CONTROL attributes of GPU {gpu.id()}: {', '.join(skipped)}")
+        return results
+
+    def _get_unsupported_attributes(self, gpu_index: int) -> List[str]:
+        failures = self._attribute_failures.get(gpu_index, {})
+        return sorted(key for key, count in list(failures.items()) if count >= UNSUPPORTED_AFTER_FAILURES)
+
+    def _clear_attribute_failures(self, gpu_index: Optional[int] = None) -> None:
+        if gpu_index is None:
+            self._attribute_failures.clear()
+        else:
+            self._attribute_failures.pop(gpu_index, None)
+
+    def _read_descriptor(self, xlib_display: display.Display, gpu: Gpu) -> GpuDescriptor:
+        _LOG.debug(f"Reading static properties of GPU {gpu.id()}")
+        start = time.perf_counter()
+        uuid = xlib_display.nvcontrol_get_gpu_uuid(gpu)
+        # Counted under the UUID like the NVML calls, so that both backends share the rows of the GPU
+        self._call_metrics.record('nvcontrol_get_gpu_uuid', uuid, time.perf_counter() - start)
+        nv_call = partial(self._call_metrics.call, uuid)
+        handle = self._nvml_session.get_handle_by_uuid(uuid)
+        mem_info = self._nvml_session.get_val(py3nvml.nvmlDeviceGetMemoryInfo, handle)
+        power_con = self._nvml_session.get_val(py3nvml.nvmlDeviceGetPowerManagementLimitConstraints, handle)
+        perf_modes = nv_call(xlib_display.nvcontrol_get_performance_modes, gpu)
+        perf_mode = next((p for p in perf_modes if p['perf'] == len(perf_modes) - 1), None)
+        perf_level_max = perf_mode.get('perf') if perf_mode else None
+        gpu_offset_range = None
+        memory_offset_range = None
+        mem_transfer_rate_offset_range = \
+            nv_call(xlib_display.nvcontrol_get_mem_transfer_rate_offset_range, gpu, perf_level_max)
+        if mem_transfer_rate_offset_range is not None:
+            memory_offset_range = (mem_transfer_rate_offset_range[0] // 2, mem_transfer_rate_offset_range[1] // 2)
+            gpu_offset_range = nv_call(xlib_display.nvcontrol_get_gpu_nvclock_offset_range, gpu, perf_level_max)
+        return GpuDescriptor(
+            uuid=uuid,
+            name=nv_call(xlib_display.nvcontrol_get_name, gpu),
+            vbios=nv_call(xlib_display.nvcontrol_get_vbios_version, gpu),
+            driver=nv_call(xlib_display.nvcontrol_get_driver_version, gpu),
+            cuda_cores=nv_call(xlib_display.nvcontrol_get_cuda_cores, gpu),
+            memory_total=mem_info.total // 1024 // 1024 if mem_info is not None else None,
+            memory_interface=nv_call(xlib_display.nvcontrol_get_memory_bus_width, gpu),
+            pcie_max_generation=self._nvml_session.get_val(py3nvml.nvmlDeviceGetMaxPcieLinkGeneration, handle),
+            pcie_max_link=nv_call(xlib_display.nvcontrol_get_max_pcie_link_width, gpu),
+            temp_maximum=self._nvml_session.get_val(
+                py3nvml.nvmlDeviceGetTemperatureThreshold, handle, 3),  # NVML_TEMPERATURE_THRESHOLD_GPU_MAX is missing
+            temp_slowdown=self._nvml_session.get_val(
+                py3nvml.nvmlDeviceGetTemperatureThreshold, handle, NVML_TEMPERATURE_THRESHOLD_SLOWDOWN),
+            temp_shutdown=self._nvml_session.get_val(
+                py3nvml.nvmlDeviceGetTemperatureThreshold, handle, NVML_TEMPERATURE_THRESHOLD_SHUTDOWN),
+            power_default=convert_milliwatt_to_watt(
+                self._nvml_session.get_val(py3nvml.nvmlDeviceGetPowerManagementDefaultLimit, handle)),
+            power_minimum=None if power_con is None else convert_milliwatt_to_watt(power_con[0]),
+            power_maximum=None if power_con is None else convert_milliwatt_to_watt(power_con[1]),
+            perf_level_max=perf_level_max,
+            graphic_clock_max=perf_mode.get('nvclockmax') if perf_mode else None,
+            sm_clock_max=self._nvml_session.get_val(py3nvml.nvmlDeviceGetMaxClockInfo, handle, NVML_CLOCK_SM),
+            memory_clock_max=perf_mode.get('memclockmax') if perf_mode else None,
+            video_clock_max=self._nvml_session.get_val(py3nvml.nvmlDeviceGetMaxClockInfo, handle, 3),  # Missing
+            gpu_offset_range=gpu_offset_range,
+            memory_offset_range=memory_offset_range,
+            cooler_indexes=nv_call(xlib_display.nvcontrol_get_coolers_used_by_gpu, gpu)
+        )
+
+    @synchronized_with_attr("_lock")
+    def _invalidate_descriptors(self, gpu_index: Optional[int] = None) -> None:
+        if gpu_index is None:
+            self._descriptors.clear()
+        else:
+            self._descriptors.pop(gpu_index, None)
+        self._clear_attribute_failures(gpu_index)
+
+    @synchronized_with_attr("_lock")
+    def get_processes(self, gpu_index: int) -> List[GpuProcess]:
+        descriptor = self._descriptors.get(gpu_index)
+        if descriptor is None:
+            return []
+        try:
+            return self._nvml_session.read_processes(self._nvml_session.get_handle_by_uuid(descriptor.uuid))
+        except NVMLError:
+            _LOG.exception(f"Error while reading the processes of GPU {gpu_index}")
+            return []
+
+    def get_unsupported_probes(self) -> Dict[str, List[str]]:
+        probes = self._nvml_session.get_unsupported_probes()
+        for gpu_index in list(self._attribute_failures):
+            attributes = self._get_unsupported_attributes(gpu_index)
+            descriptor = self._descriptors.get(gpu_index)
+            if attributes and descriptor is not None:
+                probes[f"{descriptor.uuid} (NV-CONTROL)"] = attributes
+        return probes
+
+    def get_fan_write_latency(self) -> Optional[LatencyStats]:
+        return self._fan_write_latency
+
+    def _get_write_connection(self, gpu_index: int) -> NvControlConnection:
+        with self._write_connections_lock:
+            connection = self._write_connections.get(gpu_index)
+            if connection is None:
+                connection = NvControlConnection(self._ctrl_display)
+                self._write_connections[gpu_index] = connection
+            return connection
+
+    def set_overclock(self, gpu_index: int, perf: int, gpu_offset: int, memory_offset: int) -> bool:
+        result = self._get_write_connection(gpu_index).run(
+            lambda xlib_display: self._write_overclock(xlib_display, gpu_index, perf, gpu_offset, memory_offset))
+        # Max clocks and perf modes reported by the driver include the applied offsets
+        self._invalidate_descriptors(gpu_index)
+        return result
+
+    def _get_device_label(self, xlib_display: display.Display, gpu: Gpu) -> str:
+        """The device the calls on the GPU are counted under, its UUID as in the NVML calls"""
+        descriptor = self._descriptors.get(gpu.id())
+        if descriptor is not None:
+            return descriptor.uuid
+        return str(xlib_display.nvcontrol_get_gpu_uuid(gpu))
+
+    def _write_overclock(self,
+                         xlib_display: display.Display,
+                         gpu_index: int,
+                         perf: int,
+                         gpu_offset: int,
+                         memory_offset: int) -> bool:
+        gpu = Gpu(gpu_index)
+        nv_call = partial(self._call_metrics.call, self._get_device_label(xlib_display, gpu))
+        gpu_result = (nv_call(xlib_display.nvcontrol_set_gpu_nvclock_offset, gpu, perf, gpu_offset) or
+                      nv_call(xlib_display.nvcontrol_set_gpu_nvclock_offset_all_levels, gpu, gpu_offset))
+        mem_result = (nv_call(xlib_display.nvcontrol_set_mem_transfer_rate_offset, gpu, perf, memory_offset * 2) or
+                      nv_call(xlib_display.nvcontrol_set_mem_transfer_rate_offset_all_levels, gpu, memory_offset * 2))
+        return gpu_result is True and mem_result is True
+
+    def set_power_limit(self, gpu_index: int, limit: int) -> bool:
+        return set_power_limit_with_nvidia_smi(gpu_index, limit)
+
+    def set_all_gpus_fan_to_auto(self) -> None:
+        for gpu_index in range(self._gpu_count):
+            self.set_fan_speed(gpu_index, manual_control=False)
+
+    def set_fan_speed(self,
+                      gpu_index: int,
+                      speed: int = 100,
+                      manual_control: bool = False,
+                      cooler: Optional[int] = None) -> bool:
+        with self._fan_write_latency.measure():
+            return self._get_write_connection(gpu_index).run(
+                lambda xlib_display: self._write_fan_speed(xlib_display, gpu_index, speed, manual_control, cooler))
+
+    def set_fan_speeds(self, commands: Dict[FanTarget, Tuple[int, bool]]) -> Dict[FanTarget, bool]:
+        if len(commands) <= 1:
+            return super().set_fan_speeds(commands)
+        gpu_commands: Dict[int, Dict[FanTarget, Tuple[int, bool]]] = {}
+        for target, command in commands.items():
+            gpu_commands.setdefault(target[0], {})[target] = command
+        # The writes of a GPU go through its own connection in one round, so a slow GPU doesn't hold the others
+        with self._fan_write_latency.measure():
+            if len(gpu_commands) == 1:
+                [(gpu_index, gpu_round)] = gpu_commands.items()
+                return self._write_fan_round(gpu_index, gpu_round)
+            executor = self._get_write_executor(len(gpu_commands))
+            futures = [executor.submit(self._write_fan_round, gpu_index, gpu_round)
+                       for gpu_index, gpu_round in gpu_commands.items()]
+            errors: Dict[FanTarget, bool] = {}
+            for future in futures:
+                errors.update(future.result())
+            return errors
+
+    def _get_write_executor(self, max_workers: int) -> ThreadPoolExecutor:
+        with self._write_connections_lock:
+            if self._write_executor is None:
+                self._write_executor = ThreadPoolExecutor(max_workers=max(max_workers, self._gpu_count),
+                                                          thread_name_prefix='gwe-fan-write')
+            return self._write_executor
+
+    def _write_fan_round(self, gpu_index: int, commands: Dict[FanTarget, Tuple[int, bool]]) -> Dict[FanTarget, bool]:
+        try:
+            return self._get_write_connection(gpu_index).run(
+                lambda xlib_display: {
+                    target: self._write_fan_speed(xlib_display, gpu_index, speed, manual_control, target[1])
+                    for target, (speed, manual_control) in commands.items()})
+        except NvControlConnectionError:
+            _LOG.exception(f"Error while setting the fan speed of GPU {gpu_index}")
+            return {target: True for target in commands}
+
+    def reset_fans_to_auto(self, gpu_indexes: List[int]) -> bool:
+        with self._write_connections_lock:
+            if self._reset_connection is None:
+                self._reset_connection = NvControlConnection(self._ctrl_display)
+            connection = self._reset_connection
+        for gpu_index in gpu_indexes:
+            # Whatever the regular writes think, manual control is disabled and enabled again by the next one
+            self._manual_control_state.pop(gpu_index, None)
+        return connection.run(lambda xlib_display: any(
+            [self._write_fan_speed(xlib_display, gpu_index, 100, False) for gpu_index in gpu_indexes]))
+
+    def _write_fan_speed(self,
+                         xlib_display: display.Display,
+                         gpu_index: int,
+                         speed: int,
+                         manual_control: bool,
+                         cooler: Optional[int] = None) -> bool:
+        gpu = Gpu(gpu_index)
+        nv_call = partial(self._call_metrics.call, self._get_device_label(xlib_display, gpu))
+        descriptor = self._descriptors.get(gpu_index)
+        if descriptor is not None:
+            fan_indexes = descriptor.cooler_indexes
+        else:
+            fan_indexes = nv_call(xlib_display.nvcontrol_get_coolers_used_by_gpu, gpu)
+        if fan_indexes and cooler is not None:
+            fan_indexes = fan_indexes[cooler:cooler + 1]
+        error = False
+        if fan_indexes:
+            if self._manual_control_state.get(gpu_index) != manual_control:
+                result = nv_call(xlib_display.nvcontrol_set_cooler_manual_control_enabled, gpu, manual_control)
+                if result:
+                    self._manual_control_state[gpu_index] = manual_control
+                else:
+                    self._manual_control_state.pop(gpu_index, None)
+                    error = True
+            for fan_index in fan_indexes:
+                result = nv_call(xlib_display.nvcontrol_set_fan_duty, Cooler(fan_index), speed)
+                if not result:
+                    error = True
+        return error
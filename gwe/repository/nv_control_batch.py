@@ -0,0 +1,142 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2020 Roberto Leinardi
+#
+# gst is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gst is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gst.  If not, see <http://www.gnu.org/licenses/>.
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from Xlib import display
+from Xlib.ext import nvcontrol
+from Xlib.ext.nvcontrol import Target, NVCtrlQueryAttributeReplyRequest, NVCtrlQueryStringAttributeReplyRequest, \
+    NVCtrlQueryValidAttributeValuesReplyRequest
+
+from gwe.util.call_metrics import CallMetrics
+
+# Consecutive replies without a value after which an attribute is considered unsupported by its target
+UNSUPPORTED_AFTER_FAILURES = 3
+
+
+class NvControlQueryBatch:
+    """Queues NV-CONTROL attribute queries and sends them back to back, so that the replies of the whole batch
+    are collected with a single round trip to the X server instead of one per attribute.
+
+    The values are parsed as the corresponding ``nvcontrol_get_*`` methods of python-xlib do. ``failures`` counts,
+    per key, the consecutive replies without a value and is shared by the following batches: a key reaching
+    ``UNSUPPORTED_AFTER_FAILURES`` is not queried again, unless it was queued with ``volatile=True``.
+
+    When ``call_metrics`` is given, the wait for every reply is recorded as ``nvcontrol_query(key)`` and the whole
+    batch as ``nvcontrol_query_batch``, under ``device``.
+    """
+
+    def __init__(self,
+                 xlib_display: display.Display,
+                 failures: Optional[Dict[str, int]] = None,
+                 call_metrics: Optional[CallMetrics] = None,
+                 device: str = 'system') -> None:
+        self._display = xlib_display.display
+        self._failures = failures if failures is not None else {}
+        self._call_metrics = call_metrics
+        self._device = device
+        self._opcode = self._display.get_extension_major(nvcontrol.extname)
+        self._queries: List[Tuple[str, type, Target, int, int, Callable[[Dict[str, Any]], Any], bool]] = []
+
+    def query_int(self, key: str, target: Target, attr: int, display_mask: int = 0, volatile: bool = False) -> None:
+        self._queries.append(
+            (key, NVCtrlQueryAttributeReplyRequest, target, display_mask, attr, _parse_int, volatile))
+
+    def query_string(self, key: str, target: Target, attr: int, display_mask: int = 0, volatile: bool = False) -> None:
+        self._queries.append(
+            (key, NVCtrlQueryStringAttributeReplyRequest, target, display_mask, attr, _parse_string, volatile))
+
+    def query_key_values(self,
+                         key: str,
+                         target: Target,
+                         attr: int,
+                         display_mask: int = 0,
+                         volatile: bool = False) -> None:
+        """Queries a string attribute formatted as "key=value, key=value" (utilization, clock frequencies...)"""
+        self._queries.append(
+            (key, NVCtrlQueryStringAttributeReplyRequest, target, display_mask, attr, _parse_key_values, volatile))
+
+    def query_valid_values(self,
+                           key: str,
+                           target: Target,
+                           attr: int,
+                           display_mask: int = 0,
+                           volatile: bool = False) -> None:
+        self._queries.append(
+            (key, NVCtrlQueryValidAttributeValuesReplyRequest, target, display_mask, attr, _parse_range, volatile))
+
+    def execute(self) -> Dict[str, Any]:
+        requests = []
+        result: Dict[str, Any] = {}
+        for key, request_class, target, display_mask, attr, parser, volatile in self._queries:
+            if not volatile and self._failures.get(key, 0) >= UNSUPPORTED_AFTER_FAILURES:
+                result[key] = parser({})
+                continue
+            request = request_class(display=self._display,
+                                    defer=True,
+                                    opcode=self._opcode,
+                                    target_id=target.id(),
+                                    target_type=target.type(),
+                                    display_mask=display_mask,
+                                    attr=attr)
+            requests.append((key, request, parser))
+        self._queries.clear()
+        batch_start = time.perf_counter()
+        # The first reply() flushes all the queued requests, the following ones are usually already received
+        for key, request, parser in requests:
+            start = time.perf_counter()
+            request.reply()
+            data = request._data  # pylint: disable=protected-access
+            if data.get('flags'):
+                self._failures.pop(key, None)
+            else:
+                self._failures[key] = self._failures.get(key, 0) + 1
+            if self._call_metrics is not None:
+                self._call_metrics.record(f'nvcontrol_query({key})', self._device, time.perf_counter() - start,
+                                          not data.get('flags'))
+            result[key] = parser(data)
+        if self._call_metrics is not None and requests:
+            self._call_metrics.record('nvcontrol_query_batch', self._device, time.perf_counter() - batch_start)
+        return result
+
+
+def _parse_int(data: Dict[str, Any]) -> Optional[int]:
+    if not data.get('flags'):
+        return None
+    return int(data.get('value'))  # type: ignore
+
+
+def _parse_string(data: Dict[str, Any]) -> Optional[str]:
+    if not data.get('flags'):
+        return None
+    return str(data.get('string')).strip('\0')
+
+
+def _parse_key_values(data: Dict[str, Any]) -> Dict[str, Any]:
+    string = _parse_string(data)
+    result: Dict[str, Any] = {}
+    if string:
+        for line in string.split(','):
+            [key, value] = line.split('=')[:2]
+            result[key.strip()] = int(value) if value.isdigit() else value
+    return result
+
+
+def _parse_range(data: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    if not data.get('flags'):
+        return None
+    return int(data.get('min')), int(data.get('max'))  # type: ignore
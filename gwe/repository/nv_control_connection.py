@@ -0,0 +1,109 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2020 Roberto Leinardi
+#
+# gst is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gst is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gst.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import threading
+import time
+from typing import Optional, Callable, TypeVar
+
+from Xlib import display
+from Xlib.error import ConnectionClosedError, DisplayError
+
+from gwe.util.concurrency import synchronized_with_attr
+
+_LOG = logging.getLogger(__name__)
+_BACKOFF_MIN_S = 0.5
+_BACKOFF_MAX_S = 30.0
+
+T = TypeVar('T')
+
+
+class NvControlConnectionError(Exception):
+    pass
+
+
+class NvControlConnection:
+    """A persistent NV-CONTROL X connection that is reopened with exponential backoff when the socket breaks.
+
+    ``on_reconnected`` is called, with the lock held, every time the connection is restored after a failure.
+    """
+
+    def __init__(self,
+                 ctrl_display: Optional[str] = None,
+                 on_reconnected: Optional[Callable[[], None]] = None) -> None:
+        self._lock = threading.RLock()
+        self._ctrl_display = ctrl_display
+        self._on_reconnected = on_reconnected
+        self._display: Optional[display.Display] = None
+        self._failure_count = 0
+        self._next_attempt_time = 0.0
+
+    @synchronized_with_attr("_lock")
+    def set_ctrl_display(self, ctrl_display: Optional[str]) -> None:
+        if ctrl_display != self._ctrl_display:
+            self.close()
+            self._ctrl_display = ctrl_display
+            self._failure_count = 0
+            self._next_attempt_time = 0.0
+
+    @synchronized_with_attr("_lock")
+    def run(self, action: Callable[[display.Display], T]) -> T:
+        try:
+            return action(self._get_display())
+        except (ConnectionClosedError, OSError) as err:
+            _LOG.warning(f"NV-CONTROL connection lost: {err}")
+            self._on_connection_failed()
+        # The connection broke while in use: reconnect (no backoff on the first failure) and retry once
+        try:
+            return action(self._get_display())
+        except (ConnectionClosedError, OSError) as err:
+            self._on_connection_failed()
+            raise NvControlConnectionError("NV-CONTROL connection lost again after reconnecting") from err
+
+    @synchronized_with_attr("_lock")
+    def close(self) -> None:
+        if self._display is not None:
+            try:
+                self._display.close()
+            except:
+                _LOG.exception("Error while closing NV-CONTROL connection")
+            self._display = None
+
+    def _get_display(self) -> display.Display:
+        if self._display is None:
+            now = time.monotonic()
+            if now < self._next_attempt_time:
+                raise NvControlConnectionError(
+                    f"NV-CONTROL reconnection postponed for {self._next_attempt_time - now:.1f} s")
+            try:
+                self._display = display.Display(self._ctrl_display)
+            except (DisplayError, ConnectionClosedError, OSError) as err:
+                self._on_connection_failed()
+                raise NvControlConnectionError(f"Unable to open display {self._ctrl_display}") from err
+            if self._failure_count:
+                _LOG.info(f"NV-CONTROL connection restored after {self._failure_count} failure(s)")
+                if self._on_reconnected is not None:
+                    self._on_reconnected()
+            self._failure_count = 0
+            self._next_attempt_time = 0.0
+        return self._display
+
+    def _on_connection_failed(self) -> None:
+        self.close()
+        if self._failure_count:
+            backoff = min(_BACKOFF_MAX_S, _BACKOFF_MIN_S * 2 ** (self._failure_count - 1))
+            self._next_attempt_time = time.monotonic() + backoff
+        self._failure_count += 1
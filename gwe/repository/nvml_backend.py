@@ -0,0 +1,272 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2020 Roberto Leinardi
+#
+# gst is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gst is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gst.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import threading
+import time
+from typing import Dict, Optional, List, Tuple, Any
+
+from py3nvml import py3nvml
+from py3nvml.py3nvml import NVMLError, NVML_CLOCK_GRAPHICS, NVML_CLOCK_SM, NVML_CLOCK_MEM, \
+    NVML_TEMPERATURE_THRESHOLD_SLOWDOWN, NVML_TEMPERATURE_THRESHOLD_SHUTDOWN
+
+from gwe.model.clocks import Clocks
+from gwe.model.fan import Fan
+from gwe.model.gpu_descriptor import GpuDescriptor
+from gwe.model.gpu_process import GpuProcess
+from gwe.model.gpu_status import GpuStatus
+from gwe.model.info import Info
+from gwe.model.overclock import Overclock
+from gwe.model.status import Status
+from gwe.repository import set_power_limit_with_nvidia_smi
+from gwe.repository.nvml_extensions import nvmlDeviceGetNumFans, nvmlDeviceGetFanSpeed_v2, \
+    nvmlDeviceGetFanControlPolicy_v2, nvmlDeviceSetFanSpeed_v2, nvmlDeviceSetDefaultFanSpeed_v2, \
+    nvmlDeviceGetMemoryBusWidth, nvmlDeviceGetNumGpuCores, NVML_FAN_POLICY_MANUAL
+from gwe.repository.nvml_session import NvmlSession, convert_milliwatt_to_watt
+from gwe.repository.telemetry_backend import TelemetryBackend, FAN_WRITE_LATENCY_BUDGET_S
+from gwe.util.call_metrics import CallMetrics
+from gwe.util.concurrency import synchronized_with_attr
+from gwe.util.latency import LatencyStats
+
+_LOG = logging.getLogger(__name__)
+
+
+class NvmlBackend(TelemetryBackend):
+    """Reads and writes through NVML only, for systems without an X server or without NV-CONTROL"""
+
+    def __init__(self, call_metrics: Optional[CallMetrics] = None) -> None:
+        self._lock = threading.RLock()
+        self._gpu_count = 0
+        self._descriptors: Dict[int, GpuDescriptor] = {}
+        self._call_metrics = call_metrics if call_metrics is not None else CallMetrics()
+        self._nvml_session = NvmlSession(self._call_metrics)
+        # NVML is thread safe: writes only serialize per GPU and never wait for a poll
+        self._write_locks_lock = threading.Lock()
+        self._write_locks: Dict[int, threading.Lock] = {}
+        self._fan_write_latency = LatencyStats('Fan write', FAN_WRITE_LATENCY_BUDGET_S)
+
+    def requires_nv_control(self) -> bool:
+        return False
+
+    def has_nv_control_extension(self) -> bool:
+        return False
+
+    @synchronized_with_attr("_lock")
+    def has_nvml_shared_library(self) -> bool:
+        try:
+            self._nvml_session.init()
+            return True
+        except:
+            _LOG.exception("Error while checking NVML Shared Library")
+        return False
+
+    @synchronized_with_attr("_lock")
+    def close(self) -> None:
+        self._nvml_session.shutdown()
+
+    @synchronized_with_attr("_lock")
+    def get_status(self) -> Optional[Status]:
+        try:
+            return self._get_status()
+        except NVMLError as err:
+            if not NvmlSession.is_session_lost(err):
+                _LOG.exception("Error while getting status")
+                return None
+            _LOG.warning(f"NVML session lost (error {err.value}), reinitializing")
+        except:
+            _LOG.exception("Error while getting status")
+            return None
+        try:
+            self._nvml_session.reset()
+            self._descriptors.clear()
+            return self._get_status()
+        except:
+            _LOG.exception("Error while getting status")
+        return None
+
+    def _get_status(self) -> Status:
+        time1 = time.time()
+        gpu_count = self._nvml_session.get_device_count()
+        if gpu_count != self._gpu_count:
+            _LOG.info(f"GPU count changed from {self._gpu_count} to {gpu_count}")
+            self._descriptors.clear()
+        self._gpu_count = gpu_count
+        gpu_status_list = [self._read_gpu_status(gpu_index) for gpu_index in range(gpu_count)]
+        time2 = time.time()
+        _LOG.debug(f'Fetching new data took {((time2 - time1) * 1000.0):.3f} ms')
+        return Status(gpu_status_list, timestamp=time1)
+
+    def _read_gpu_status(self, gpu_index: int) -> GpuStatus:
+        timestamp = time.time()
+        handle = self._nvml_session.get_handle_by_index(gpu_index)
+        descriptor = self._descriptors.get(gpu_index)
+        if descriptor is None:
+            descriptor = self._read_descriptor(handle)
+            self._descriptors[gpu_index] = descriptor
+        get_val = self._nvml_session.get_val
+        memory_used = None
+        mem_info = get_val(py3nvml.nvmlDeviceGetMemoryInfo, handle)
+        if mem_info is not None:
+            memory_used = mem_info.used // 1024 // 1024
+        util = get_val(py3nvml.nvmlDeviceGetUtilizationRates, handle)
+        encoder_util = get_val(py3nvml.nvmlDeviceGetEncoderUtilization, handle)
+        decoder_util = get_val(py3nvml.nvmlDeviceGetDecoderUtilization, handle)
+        info = Info(
+            name=descriptor.name,
+            vbios=descriptor.vbios,
+            driver=descriptor.driver,
+            pcie_current_generation=get_val(py3nvml.nvmlDeviceGetCurrPcieLinkGeneration, handle),
+            pcie_max_generation=descriptor.pcie_max_generation,
+            pcie_current_link=get_val(py3nvml.nvmlDeviceGetCurrPcieLinkWidth, handle),
+            pcie_max_link=descriptor.pcie_max_link,
+            cuda_cores=descriptor.cuda_cores,
+            uuid=descriptor.uuid,
+            memory_total=descriptor.memory_total,
+            memory_used=memory_used,
+            memory_interface=descriptor.memory_interface,
+            memory_usage=util.memory if util is not None else None,
+            gpu_usage=util.gpu if util is not None else None,
+            encoder_usage=encoder_util[0] if encoder_util is not None else None,
+            decoder_usage=decoder_util[0] if decoder_util is not None else None
+        )
+        clocks = Clocks(
+            graphic_current=get_val(py3nvml.nvmlDeviceGetClockInfo, handle, NVML_CLOCK_GRAPHICS),
+            graphic_max=descriptor.graphic_clock_max,
+            sm_current=get_val(py3nvml.nvmlDeviceGetClockInfo, handle, NVML_CLOCK_SM),
+            sm_max=descriptor.sm_clock_max,
+            memory_current=get_val(py3nvml.nvmlDeviceGetClockInfo, handle, NVML_CLOCK_MEM),
+            memory_max=descriptor.memory_clock_max,
+            video_current=get_val(py3nvml.nvmlDeviceGetClockInfo, handle, 3),  # Missing
+            video_max=descriptor.video_clock_max
+        )
+        return GpuStatus(
+            index=gpu_index,
+            info=info,
+            power=self._nvml_session.read_power(handle, descriptor),
+            temp=self._nvml_session.read_temp(handle, descriptor),
+            fan=self._read_fan(handle, descriptor),
+            clocks=clocks,
+            overclock=Overclock(),
+            descriptor=descriptor,
+            timestamp=timestamp
+        )
+
+    def _read_fan(self, handle: Any, descriptor: GpuDescriptor) -> Fan:
+        if not descriptor.cooler_indexes:
+            return Fan()
+        fan_list: List[Tuple[int, Optional[int]]] = []
+        for fan_index in descriptor.cooler_indexes:
+            duty = self._nvml_session.get_val(nvmlDeviceGetFanSpeed_v2, handle, fan_index)
+            if duty is not None:
+                # NVML doesn't report the fan RPM on most drivers
+                fan_list.append((duty, None))
+        policy = self._nvml_session.get_val(nvmlDeviceGetFanControlPolicy_v2, handle, descriptor.cooler_indexes[0])
+        return Fan(
+            fan_list=fan_list or None,
+            control_allowed=policy is not None,
+            manual_control=policy == NVML_FAN_POLICY_MANUAL
+        )
+
+    def _read_descriptor(self, handle: Any) -> GpuDescriptor:
+        get_val = self._nvml_session.get_val
+        mem_info = get_val(py3nvml.nvmlDeviceGetMemoryInfo, handle)
+        power_con = get_val(py3nvml.nvmlDeviceGetPowerManagementLimitConstraints, handle)
+        num_fans = get_val(nvmlDeviceGetNumFans, handle)
+        return GpuDescriptor(
+            uuid=py3nvml.nvmlDeviceGetUUID(handle),
+            name=get_val(py3nvml.nvmlDeviceGetName, handle),
+            vbios=get_val(py3nvml.nvmlDeviceGetVbiosVersion, handle),
+            driver=get_val(py3nvml.nvmlSystemGetDriverVersion),
+            cuda_cores=get_val(nvmlDeviceGetNumGpuCores, handle),
+            memory_total=mem_info.total // 1024 // 1024 if mem_info is not None else None,
+            memory_interface=get_val(nvmlDeviceGetMemoryBusWidth, handle),
+            pcie_max_generation=get_val(py3nvml.nvmlDeviceGetMaxPcieLinkGeneration, handle),
+            pcie_max_link=get_val(py3nvml.nvmlDeviceGetMaxPcieLinkWidth, handle),
+            temp_maximum=get_val(
+                py3nvml.nvmlDeviceGetTemperatureThreshold, handle, 3),  # NVML_TEMPERATURE_THRESHOLD_GPU_MAX is missing
+            temp_slowdown=get_val(
+                py3nvml.nvmlDeviceGetTemperatureThreshold, handle, NVML_TEMPERATURE_THRESHOLD_SLOWDOWN),
+            temp_shutdown=get_val(
+                py3nvml.nvmlDeviceGetTemperatureThreshold, handle, NVML_TEMPERATURE_THRESHOLD_SHUTDOWN),
+            power_default=convert_milliwatt_to_watt(
+                get_val(py3nvml.nvmlDeviceGetPowerManagementDefaultLimit, handle)),
+            power_minimum=None if power_con is None else convert_milliwatt_to_watt(power_con[0]),
+            power_maximum=None if power_con is None else convert_milliwatt_to_watt(power_con[1]),
+            graphic_clock_max=get_val(py3nvml.nvmlDeviceGetMaxClockInfo, handle, NVML_CLOCK_GRAPHICS),
+            sm_clock_max=get_val(py3nvml.nvmlDeviceGetMaxClockInfo, handle, NVML_CLOCK_SM),
+            memory_clock_max=get_val(py3nvml.nvmlDeviceGetMaxClockInfo, handle, NVML_CLOCK_MEM),
+            video_clock_max=get_val(py3nvml.nvmlDeviceGetMaxClockInfo, handle, 3),  # Missing
+            cooler_indexes=list(range(num_fans)) if num_fans else None
+        )
+
+    @synchronized_with_attr("_lock")
+    def get_processes(self, gpu_index: int) -> List[GpuProcess]:
+        try:
+            return self._nvml_session.read_processes(self._nvml_session.get_handle_by_index(gpu_index))
+        except NVMLError:
+            _LOG.exception(f"Error while reading the processes of GPU {gpu_index}")
+            return []
+
+    def get_unsupported_probes(self) -> Dict[str, List[str]]:
+        return self._nvml_session.get_unsupported_probes()
+
+    def get_fan_write_latency(self) -> Optional[LatencyStats]:
+        return self._fan_write_latency
+
+    def _get_write_lock(self, gpu_index: int) -> threading.Lock:
+        with self._write_locks_lock:
+            return self._write_locks.setdefault(gpu_index, threading.Lock())
+
+    def set_overclock(self, gpu_index: int, perf: int, gpu_offset: int, memory_offset: int) -> bool:
+        _LOG.warning("Overclock is not supported by the NVML backend")
+        return False
+
+    def set_power_limit(self, gpu_index: int, limit: int) -> bool:
+        return set_power_limit_with_nvidia_smi(gpu_index, limit)
+
+    def set_all_gpus_fan_to_auto(self) -> None:
+        for gpu_index in range(self._gpu_count):
+            self.set_fan_speed(gpu_index, manual_control=False)
+
+    def set_fan_speed(self,
+                      gpu_index: int,
+                      speed: int = 100,
+                      manual_control: bool = False,
+                      cooler: Optional[int] = None) -> bool:
+        with self._fan_write_latency.measure(), self._get_write_lock(gpu_index):
+            return self._write_fan_speed(gpu_index, speed, manual_control, cooler)
+
+    def _write_fan_speed(self, gpu_index: int, speed: int, manual_control: bool, cooler: Optional[int]) -> bool:
+        handle = self._nvml_session.get_handle_by_index(gpu_index)
+        device = self._nvml_session.get_device_label(handle)
+        descriptor = self._descriptors.get(gpu_index)
+        if descriptor is not None:
+            fan_indexes = descriptor.cooler_indexes or []
+        else:
+            fan_indexes = list(range(self._call_metrics.call(device, nvmlDeviceGetNumFans, handle)))
+        if cooler is not None:
+            fan_indexes = fan_indexes[cooler:cooler + 1]
+        error = False
+        for fan_index in fan_indexes:
+            try:
+                if manual_control:
+                    self._call_metrics.call(device, nvmlDeviceSetFanSpeed_v2, handle, fan_index, speed)
+                else:
+                    self._call_metrics.call(device, nvmlDeviceSetDefaultFanSpeed_v2, handle, fan_index)
+            except NVMLError as err:
+                _LOG.error(f"Unable to set the speed of fan {fan_index} of GPU {gpu_index}: {err}")
+                error = True
+        return error
@@ -0,0 +1,128 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import threading
+import time
+from ctypes import cast, c_void_p
+from typing import Callable, Optional, Any, Dict
+
+from py3nvml import py3nvml
+from py3nvml.py3nvml import NVMLError, NVML_ERROR_TIMEOUT, NVML_ERROR_NOT_SUPPORTED, nvmlEventTypeClock, \
+    nvmlEventTypePState, nvmlEventTypeXidCriticalError
+
+from gwe.model.gpu_event import GpuEvent, GpuEventType
+
+_LOG = logging.getLogger(__name__)
+_WAIT_TIMEOUT_MS = 500
+_EVENT_TYPES = {
+    nvmlEventTypeClock: GpuEventType.CLOCK_CHANGE,
+    nvmlEventTypePState: GpuEventType.PSTATE_CHANGE,
+    nvmlEventTypeXidCriticalError: GpuEventType.XID_CRITICAL_ERROR,
+}
+
+
+class NvmlEventListener:
+    """Waits for NVML clock, P-state and Xid events on a dedicated thread and forwards them to a callback"""
+
+    def __init__(self, on_event: Callable[[GpuEvent], None]) -> None:
+        self._on_event = on_event
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='gwe-nvml-events', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stopped.set()
+            # The thread notices the flag within one wait timeout
+            self._thread.join(timeout=_WAIT_TIMEOUT_MS / 1000 * 2)
+            self._thread = None
+
+    def _run(self) -> None:
+        try:
+            py3nvml.nvmlInit()
+        except NVMLError:
+            _LOG.exception("Unable to initialize NVML, GPU events disabled")
+            return
+        event_set = None
+        try:
+            event_set = py3nvml.nvmlEventSetCreate()
+            gpu_uuids = self._register_devices(event_set)
+            if not gpu_uuids:
+                _LOG.info("No GPU supports the NVML events, relying on polling only")
+                return
+            while not self._stopped.is_set():
+                try:
+                    event_data = py3nvml.nvmlEventSetWait(event_set, _WAIT_TIMEOUT_MS)
+                except NVMLError as err:
+                    if err.value == NVML_ERROR_TIMEOUT:
+                        continue
+                    raise err
+                self._dispatch(event_data, gpu_uuids)
+        except NVMLError:
+            _LOG.exception("Error while waiting for NVML events, GPU events disabled")
+        finally:
+            if event_set is not None:
+                py3nvml.nvmlEventSetFree(event_set)
+            py3nvml.nvmlShutdown()
+
+    @staticmethod
+    def _register_devices(event_set: Any) -> Dict[int, str]:
+        # Maps the address of the device handles returned by the events to the GPU UUID, the NVML device index
+        # doesn't match the GPU index used by NV-CONTROL
+        gpu_uuids: Dict[int, str] = {}
+        wanted = 0
+        for event_type in _EVENT_TYPES:
+            wanted |= event_type
+        for nvml_index in range(py3nvml.nvmlDeviceGetCount()):
+            handle = py3nvml.nvmlDeviceGetHandleByIndex(nvml_index)
+            try:
+                event_types = py3nvml.nvmlDeviceGetSupportedEventTypes(handle) & wanted
+                if event_types:
+                    py3nvml.nvmlDeviceRegisterEvents(handle, event_types, event_set)
+                    gpu_uuids[_get_handle_address(handle)] = py3nvml.nvmlDeviceGetUUID(handle)
+                _LOG.debug(f"NVML device {nvml_index} events: "
+                           f"{[t.value for m, t in _EVENT_TYPES.items() if event_types & m] or 'none'}")
+            except NVMLError as err:
+                if err.value != NVML_ERROR_NOT_SUPPORTED:
+                    raise err
+                _LOG.debug(f"NVML device {nvml_index} doesn't support NVML events")
+        return gpu_uuids
+
+    def _dispatch(self, event_data: Any, gpu_uuids: Dict[int, str]) -> None:
+        event_type = _EVENT_TYPES.get(event_data.eventType)
+        gpu_uuid = gpu_uuids.get(_get_handle_address(event_data.device))
+        if event_type is None or gpu_uuid is None:
+            return
+        event = GpuEvent(gpu_uuid, event_type, event_data.eventData, time.time())
+        if event_type == GpuEventType.XID_CRITICAL_ERROR:
+            _LOG.error(f"GPU {gpu_uuid} reported Xid critical error {event_data.eventData}")
+        else:
+            _LOG.debug(f"GPU {gpu_uuid} event: {event_type.value}")
+        try:
+            self._on_event(event)
+        except:
+            _LOG.exception("Error while dispatching GPU event")
+
+
+def _get_handle_address(handle: Any) -> int:
+    # Handles are ctypes pointers: the instances differ, the pointed device struct doesn't
+    return cast(handle, c_void_p).value or 0
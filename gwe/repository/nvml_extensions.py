@@ -0,0 +1,175 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2020 Roberto Leinardi
+#
+# gst is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gst is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gst.  If not, see <http://www.gnu.org/licenses/>.
+# pylint: disable=invalid-name
+# Bindings for NVML functions that are missing from py3nvml. They follow the py3nvml naming and error handling, so
+# they can be used with NvmlSession.get_val() like any other py3nvml function.
+from ctypes import c_uint, byref, c_int, c_double, c_ulong, c_ulonglong, c_longlong, Structure, Union, Array
+from typing import Any, Sequence, Optional, List
+
+from py3nvml import py3nvml
+
+NVML_FAN_POLICY_TEMPERATURE_CONTINOUS_SW = 0
+NVML_FAN_POLICY_MANUAL = 1
+
+NVML_FI_DEV_POWER_INSTANT = 186
+NVML_FI_DEV_POWER_CURRENT_LIMIT = 190
+NVML_FI_DEV_POWER_ENFORCED_LIMIT = 191
+NVML_FI_DEV_POWER_REQUESTED_LIMIT = 192
+
+NVML_VALUE_TYPE_DOUBLE = 0
+NVML_VALUE_TYPE_UNSIGNED_INT = 1
+NVML_VALUE_TYPE_UNSIGNED_LONG = 2
+NVML_VALUE_TYPE_UNSIGNED_LONG_LONG = 3
+NVML_VALUE_TYPE_SIGNED_LONG_LONG = 4
+NVML_VALUE_TYPE_SIGNED_INT = 5
+
+_VALUE_TYPE_MEMBERS = {
+    NVML_VALUE_TYPE_DOUBLE: 'dVal',
+    NVML_VALUE_TYPE_UNSIGNED_INT: 'uiVal',
+    NVML_VALUE_TYPE_UNSIGNED_LONG: 'ulVal',
+    NVML_VALUE_TYPE_UNSIGNED_LONG_LONG: 'ullVal',
+    NVML_VALUE_TYPE_SIGNED_LONG_LONG: 'sllVal',
+    NVML_VALUE_TYPE_SIGNED_INT: 'siVal',
+}
+
+
+class c_nvmlValue_t(Union):
+    _fields_ = [
+        ('dVal', c_double),
+        ('uiVal', c_uint),
+        ('ulVal', c_ulong),
+        ('ullVal', c_ulonglong),
+        ('sllVal', c_longlong),
+        ('siVal', c_int),
+    ]
+
+
+class c_nvmlFieldValue_t(Structure):
+    _fields_ = [
+        ('fieldId', c_uint),
+        ('scopeId', c_uint),
+        ('timestamp', c_longlong),
+        ('latencyUsec', c_longlong),
+        ('valueType', c_uint),
+        ('nvmlReturn', c_uint),
+        ('value', c_nvmlValue_t),
+    ]
+
+
+class c_nvmlProcessUtilizationSample_t(Structure):
+    _fields_ = [
+        ('pid', c_uint),
+        ('timeStamp', c_ulonglong),
+        ('smUtil', c_uint),
+        ('memUtil', c_uint),
+        ('encUtil', c_uint),
+        ('decUtil', c_uint),
+    ]
+
+
+def nvmlFieldValueArray(field_ids: Sequence[int]) -> Array:
+    values = (c_nvmlFieldValue_t * len(field_ids))()
+    for i, field_id in enumerate(field_ids):
+        values[i].fieldId = field_id
+    return values
+
+
+def nvmlDeviceGetFieldValues(handle: Any, values: Array) -> None:
+    """Fills a preallocated array returned by nvmlFieldValueArray(), each item has its own nvmlReturn"""
+    fn = py3nvml._nvmlGetFunctionPointer("nvmlDeviceGetFieldValues")
+    py3nvml._nvmlCheckReturn(fn(handle, c_int(len(values)), values))
+
+
+def nvmlFieldValueToPython(field_value: c_nvmlFieldValue_t) -> Optional[Any]:
+    if field_value.nvmlReturn != py3nvml.NVML_SUCCESS:
+        return None
+    member = _VALUE_TYPE_MEMBERS.get(field_value.valueType)
+    return None if member is None else getattr(field_value.value, member)
+
+
+def nvmlDeviceGetNumFans(handle: Any) -> int:
+    c_num_fans = c_uint()
+    fn = py3nvml._nvmlGetFunctionPointer("nvmlDeviceGetNumFans")
+    py3nvml._nvmlCheckReturn(fn(handle, byref(c_num_fans)))
+    return c_num_fans.value
+
+
+def nvmlDeviceGetFanSpeed_v2(handle: Any, fan: int) -> int:
+    c_speed = c_uint()
+    fn = py3nvml._nvmlGetFunctionPointer("nvmlDeviceGetFanSpeed_v2")
+    py3nvml._nvmlCheckReturn(fn(handle, c_uint(fan), byref(c_speed)))
+    return c_speed.value
+
+
+def nvmlDeviceGetFanControlPolicy_v2(handle: Any, fan: int) -> int:
+    c_policy = c_uint()
+    fn = py3nvml._nvmlGetFunctionPointer("nvmlDeviceGetFanControlPolicy_v2")
+    py3nvml._nvmlCheckReturn(fn(handle, c_uint(fan), byref(c_policy)))
+    return c_policy.value
+
+
+def nvmlDeviceSetFanSpeed_v2(handle: Any, fan: int, speed: int) -> None:
+    fn = py3nvml._nvmlGetFunctionPointer("nvmlDeviceSetFanSpeed_v2")
+    py3nvml._nvmlCheckReturn(fn(handle, c_uint(fan), c_uint(speed)))
+
+
+def nvmlDeviceSetDefaultFanSpeed_v2(handle: Any, fan: int) -> None:
+    fn = py3nvml._nvmlGetFunctionPointer("nvmlDeviceSetDefaultFanSpeed_v2")
+    py3nvml._nvmlCheckReturn(fn(handle, c_uint(fan)))
+
+
+def nvmlDeviceGetMemoryBusWidth(handle: Any) -> int:
+    c_bus_width = c_uint()
+    fn = py3nvml._nvmlGetFunctionPointer("nvmlDeviceGetMemoryBusWidth")
+    py3nvml._nvmlCheckReturn(fn(handle, byref(c_bus_width)))
+    return c_bus_width.value
+
+
+def nvmlDeviceGetNumGpuCores(handle: Any) -> int:
+    c_num_cores = c_uint()
+    fn = py3nvml._nvmlGetFunctionPointer("nvmlDeviceGetNumGpuCores")
+    py3nvml._nvmlCheckReturn(fn(handle, byref(c_num_cores)))
+    return c_num_cores.value
+
+
+def nvmlDeviceSetGpuLockedClocks(handle: Any, min_clock: int, max_clock: int) -> None:
+    fn = py3nvml._nvmlGetFunctionPointer("nvmlDeviceSetGpuLockedClocks")
+    py3nvml._nvmlCheckReturn(fn(handle, c_uint(min_clock), c_uint(max_clock)))
+
+
+def nvmlDeviceResetGpuLockedClocks(handle: Any) -> None:
+    fn = py3nvml._nvmlGetFunctionPointer("nvmlDeviceResetGpuLockedClocks")
+    py3nvml._nvmlCheckReturn(fn(handle))
+
+
+def nvmlDeviceGetProcessUtilization(handle: Any,
+                                    last_seen_timestamp: int = 0) -> List[c_nvmlProcessUtilizationSample_t]:
+    """Returns the utilization samples of the processes newer than last_seen_timestamp (CPU time in microseconds).
+    Without a timestamp, returns all the samples still in the driver buffer."""
+    c_count = c_uint(0)
+    fn = py3nvml._nvmlGetFunctionPointer("nvmlDeviceGetProcessUtilization")
+    ret = fn(handle, None, byref(c_count), c_ulonglong(last_seen_timestamp))
+    if ret == py3nvml.NVML_ERROR_NOT_FOUND or (ret == py3nvml.NVML_SUCCESS and c_count.value == 0):
+        return []
+    if ret != py3nvml.NVML_ERROR_INSUFFICIENT_SIZE:
+        py3nvml._nvmlCheckReturn(ret)
+    samples = (c_nvmlProcessUtilizationSample_t * c_count.value)()
+    ret = fn(handle, samples, byref(c_count), c_ulonglong(last_seen_timestamp))
+    if ret == py3nvml.NVML_ERROR_NOT_FOUND:
+        return []
+    py3nvml._nvmlCheckReturn(ret)
+    return list(samples[:c_count.value])
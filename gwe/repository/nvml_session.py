@@ -0,0 +1,268 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2020 Roberto Leinardi
+#
+# gst is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gst is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gst.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import threading
+from ctypes import Array
+from typing import Dict, Any, Callable, Optional, Tuple, Set, List
+
+from py3nvml import py3nvml
+from py3nvml.py3nvml import NVMLError, NVML_ERROR_UNINITIALIZED, NVML_ERROR_GPU_IS_LOST, NVML_ERROR_NOT_SUPPORTED, \
+    NVML_ERROR_UNKNOWN, NVML_ERROR_FUNCTION_NOT_FOUND, NVML_ERROR_INVALID_ARGUMENT, NVML_TEMPERATURE_GPU
+
+from gwe.model.gpu_descriptor import GpuDescriptor
+from gwe.model.gpu_process import GpuProcess, GpuProcessType
+from gwe.model.power import Power
+from gwe.model.temp import Temp
+from gwe.repository.nvml_extensions import nvmlFieldValueArray, nvmlDeviceGetFieldValues, nvmlFieldValueToPython, \
+    NVML_FI_DEV_POWER_INSTANT, NVML_FI_DEV_POWER_REQUESTED_LIMIT, NVML_FI_DEV_POWER_ENFORCED_LIMIT, \
+    nvmlDeviceGetProcessUtilization
+from gwe.repository.process_name_cache import ProcessNameCache
+from gwe.util.call_metrics import CallMetrics
+from gwe.util.concurrency import synchronized_with_attr
+
+_LOG = logging.getLogger(__name__)
+_POWER_FIELD_IDS = (NVML_FI_DEV_POWER_INSTANT, NVML_FI_DEV_POWER_REQUESTED_LIMIT, NVML_FI_DEV_POWER_ENFORCED_LIMIT)
+# A field failing with one of these is never requested again for that GPU
+_UNSUPPORTED_FIELD_RETURNS = (NVML_ERROR_NOT_SUPPORTED, NVML_ERROR_INVALID_ARGUMENT)
+
+
+class NvmlSession:
+    """Keeps NVML initialized across polls and caches the device handles by UUID"""
+
+    def __init__(self, call_metrics: Optional[CallMetrics] = None) -> None:
+        self._lock = threading.RLock()
+        self._call_metrics = call_metrics if call_metrics is not None else CallMetrics()
+        self._initialized = False
+        self._handles: Dict[str, Any] = {}
+        self._handles_by_index: Dict[int, Any] = {}
+        self._field_value_arrays: Dict[Tuple[int, Tuple[int, ...]], Array] = {}
+        self._field_values_supported = True
+        self._device_labels: Dict[int, str] = {}
+        self._unsupported_probes: Dict[str, Set[str]] = {}
+        self._process_name_caches: Dict[int, ProcessNameCache] = {}
+        self._process_utilization_timestamps: Dict[int, int] = {}
+
+    @synchronized_with_attr("_lock")
+    def init(self) -> None:
+        if not self._initialized:
+            _LOG.debug("NVML init")
+            py3nvml.nvmlInit()
+            self._initialized = True
+
+    @synchronized_with_attr("_lock")
+    def shutdown(self) -> None:
+        self._handles.clear()
+        self._handles_by_index.clear()
+        self._field_value_arrays.clear()
+        self._field_values_supported = True
+        self._device_labels.clear()
+        self._unsupported_probes.clear()
+        self._process_name_caches.clear()
+        self._process_utilization_timestamps.clear()
+        if self._initialized:
+            _LOG.debug("NVML shutdown")
+            self._initialized = False
+            try:
+                py3nvml.nvmlShutdown()
+            except NVMLError:
+                _LOG.exception("Error while shutting down NVML")
+
+    @synchronized_with_attr("_lock")
+    def reset(self) -> None:
+        self.shutdown()
+        self.init()
+
+    @synchronized_with_attr("_lock")
+    def get_handle_by_uuid(self, uuid: str) -> Any:
+        self.init()
+        handle = self._handles.get(uuid)
+        if handle is None:
+            handle = py3nvml.nvmlDeviceGetHandleByUUID(uuid.encode('utf-8'))
+            self._handles[uuid] = handle
+            self._device_labels[id(handle)] = uuid
+        return handle
+
+    @synchronized_with_attr("_lock")
+    def get_handle_by_index(self, index: int) -> Any:
+        self.init()
+        handle = self._handles_by_index.get(index)
+        if handle is None:
+            handle = py3nvml.nvmlDeviceGetHandleByIndex(index)
+            self._handles_by_index[index] = handle
+            # Labelled as the handles by UUID, the index of a GPU can differ between NVML and NV-CONTROL
+            self._device_labels[id(handle)] = py3nvml.nvmlDeviceGetUUID(handle)
+        return handle
+
+    @synchronized_with_attr("_lock")
+    def get_device_label(self, handle: Any) -> str:
+        """The device the calls on the handle are counted under, the UUID of the GPU"""
+        return self._device_labels.get(id(handle), 'system')
+
+    @synchronized_with_attr("_lock")
+    def get_device_count(self) -> int:
+        self.init()
+        return int(py3nvml.nvmlDeviceGetCount())
+
+    @staticmethod
+    def is_session_lost(err: NVMLError) -> bool:
+        return err.value in (NVML_ERROR_UNINITIALIZED, NVML_ERROR_GPU_IS_LOST)
+
+    def get_val(self, a_function: Callable, *args: Any) -> Any:
+        device, probe = self._get_probe(a_function, *args)
+        unsupported = self._unsupported_probes.get(device)
+        if unsupported is not None and probe in unsupported:
+            return None
+        try:
+            return self._call_metrics.call(device, a_function, *args)
+        except NVMLError as err:
+            if err.value == NVML_ERROR_NOT_SUPPORTED:
+                _LOG.debug(f"Function {a_function.__name__} not supported")
+                self._add_unsupported_probe(device, probe)
+                return None
+            if err.value == NVML_ERROR_FUNCTION_NOT_FOUND:
+                _LOG.debug(f"Function {a_function.__name__} not found in the NVML Shared Library")
+                self._add_unsupported_probe(device, probe)
+                return None
+            if err.value == NVML_ERROR_UNKNOWN:
+                _LOG.warning(f"Unknown error while executing function {a_function.__name__}")
+                return None
+            _LOG.error(f"Error value = {err.value}")
+            raise err
+
+    @synchronized_with_attr("_lock")
+    def get_unsupported_probes(self) -> Dict[str, List[str]]:
+        return {device: sorted(probes) for device, probes in self._unsupported_probes.items()}
+
+    def _get_probe(self, a_function: Callable, *args: Any) -> Tuple[str, str]:
+        device = self._device_labels.get(id(args[0])) if args else None
+        if device is None:
+            return 'system', f"{a_function.__name__}({', '.join(str(arg) for arg in args)})"
+        return device, f"{a_function.__name__}({', '.join(str(arg) for arg in args[1:])})"
+
+    @synchronized_with_attr("_lock")
+    def _add_unsupported_probe(self, device: str, probe: str) -> None:
+        probes = self._unsupported_probes.setdefault(device, set())
+        probes.add(probe)
+        _LOG.debug(f"Skipping unsupported NVML probes of {device}: {', '.join(sorted(probes))}")
+
+    def get_field_values(self, handle: Any, field_ids: Tuple[int, ...]) -> Dict[int, Any]:
+        """Reads several fields with a single NVML call. Fields that the driver couldn't read are missing from the
+        result and must be read with their own function. The fields a GPU doesn't support are left out of the
+        following calls."""
+        if not self._field_values_supported:
+            return {}
+        device = self.get_device_label(handle)
+        unsupported = self._unsupported_probes.get(device)
+        if unsupported is not None:
+            field_ids = tuple(field_id for field_id in field_ids if self._get_field_probe(field_id) not in unsupported)
+            if not field_ids:
+                return {}
+        # One preallocated array per GPU, so that GPUs sampled in parallel never share it
+        key = (id(handle), field_ids)
+        with self._lock:
+            values = self._field_value_arrays.get(key)
+            if values is None:
+                values = nvmlFieldValueArray(field_ids)
+                self._field_value_arrays[key] = values
+        try:
+            self._call_metrics.call(device, nvmlDeviceGetFieldValues, handle, values)
+        except NVMLError as err:
+            if err.value in (NVML_ERROR_NOT_SUPPORTED, NVML_ERROR_FUNCTION_NOT_FOUND):
+                _LOG.info("nvmlDeviceGetFieldValues not available, reading the fields one by one")
+                self._field_values_supported = False
+                return {}
+            raise err
+        result = {}
+        for field_value in values:
+            if field_value.nvmlReturn in _UNSUPPORTED_FIELD_RETURNS:
+                self._add_unsupported_probe(device, self._get_field_probe(field_value.fieldId))
+                continue
+            value = nvmlFieldValueToPython(field_value)
+            if value is not None:
+                result[field_value.fieldId] = value
+        return result
+
+    @staticmethod
+    def _get_field_probe(field_id: int) -> str:
+        return f"{nvmlDeviceGetFieldValues.__name__}({field_id})"
+
+    def read_power(self, handle: Any, descriptor: GpuDescriptor) -> Power:
+        fields = self.get_field_values(handle, _POWER_FIELD_IDS)
+        draw = fields.get(NVML_FI_DEV_POWER_INSTANT)
+        if draw is None:
+            draw = self.get_val(py3nvml.nvmlDeviceGetPowerUsage, handle)
+        limit = fields.get(NVML_FI_DEV_POWER_REQUESTED_LIMIT)
+        if limit is None:
+            limit = self.get_val(py3nvml.nvmlDeviceGetPowerManagementLimit, handle)
+        enforced = fields.get(NVML_FI_DEV_POWER_ENFORCED_LIMIT)
+        if enforced is None:
+            enforced = self.get_val(py3nvml.nvmlDeviceGetEnforcedPowerLimit, handle)
+        return Power(
+            draw=convert_milliwatt_to_watt(draw),
+            limit=convert_milliwatt_to_watt(limit),
+            default=descriptor.power_default,
+            minimum=descriptor.power_minimum,
+            enforced=convert_milliwatt_to_watt(enforced),
+            maximum=descriptor.power_maximum
+        )
+
+    def read_processes(self, handle: Any) -> List[GpuProcess]:
+        processes: Dict[int, GpuProcess] = {}
+        for process_type, a_function in ((GpuProcessType.COMPUTE, py3nvml.nvmlDeviceGetComputeRunningProcesses),
+                                         (GpuProcessType.GRAPHICS, py3nvml.nvmlDeviceGetGraphicsRunningProcesses)):
+            for info in self.get_val(a_function, handle) or []:
+                memory_used = None if info.usedGpuMemory is None else info.usedGpuMemory // 1024 // 1024
+                process = processes.get(info.pid)
+                if process is None:
+                    processes[info.pid] = GpuProcess(info.pid, process_type=process_type, memory_used=memory_used)
+                else:
+                    process.process_type = GpuProcessType.COMPUTE_GRAPHICS
+                    if memory_used is not None:
+                        process.memory_used = max(process.memory_used or 0, memory_used)
+        key = id(handle)
+        # Only the samples taken since the previous read, the latest one of every process
+        last_seen_timestamp = self._process_utilization_timestamps.get(key, 0)
+        latest_samples: Dict[int, Any] = {}
+        for sample in self.get_val(nvmlDeviceGetProcessUtilization, handle) or []:
+            if sample.timeStamp > last_seen_timestamp and \
+                    (sample.pid not in latest_samples or sample.timeStamp > latest_samples[sample.pid].timeStamp):
+                latest_samples[sample.pid] = sample
+        if latest_samples:
+            self._process_utilization_timestamps[key] = max(s.timeStamp for s in latest_samples.values())
+        name_cache = self._process_name_caches.setdefault(key, ProcessNameCache())
+        for pid, process in processes.items():
+            process.name = name_cache.get_name(pid)
+            sample = latest_samples.get(pid)
+            if sample is not None:
+                process.gpu_usage = sample.smUtil
+                process.memory_usage = sample.memUtil
+                process.encoder_usage = sample.encUtil
+                process.decoder_usage = sample.decUtil
+        name_cache.retain(processes.keys())
+        return sorted(processes.values(), key=lambda p: p.pid)
+
+    def read_temp(self, handle: Any, descriptor: GpuDescriptor) -> Temp:
+        return Temp(
+            gpu=self.get_val(py3nvml.nvmlDeviceGetTemperature, handle, NVML_TEMPERATURE_GPU),
+            maximum=descriptor.temp_maximum,
+            slowdown=descriptor.temp_slowdown,
+            shutdown=descriptor.temp_shutdown,
+        )
+
+
+def convert_milliwatt_to_watt(milliwatt: Optional[int]) -> Optional[float]:
+    return None if milliwatt is None else milliwatt / 1000
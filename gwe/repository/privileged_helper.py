@@ -0,0 +1,157 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import os
+import socket
+import subprocess
+import threading
+import time
+from typing import Optional, List, Dict, Any, BinaryIO
+
+from gwe.helper.protocol import get_socket_path, encode_message, decode_message, OP_SET_POWER_LIMIT, \
+    OP_LOCK_GPU_CLOCKS, OP_RESET_GPU_CLOCKS, OP_SET_PERSISTENCE_MODE
+from gwe.util.concurrency import synchronized_with_attr
+
+_LOG = logging.getLogger(__name__)
+# Leaves the user enough time to answer the polkit authentication dialog
+_START_TIMEOUT_S = 60.0
+_START_POLL_INTERVAL_S = 0.1
+
+
+class PrivilegedHelperError(Exception):
+    pass
+
+
+class PrivilegedHelper:
+    """Client of the root helper (gwe.helper) that applies NVML writes without spawning a process per write.
+
+    The helper is started once with pkexec if it isn't already running (e.g. as a systemd service) and exits
+    together with GWE.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._socket_path = get_socket_path(os.getuid())
+        self._socket: Optional[socket.socket] = None
+        self._reader: Optional[BinaryIO] = None
+        self._process: Optional[subprocess.Popen] = None
+
+    @synchronized_with_attr("_lock")
+    def execute(self, requests: List[Dict[str, Any]]) -> List[bool]:
+        try:
+            results = self._send(requests)
+        except OSError as err:
+            # The helper may have been restarted: reconnect and retry once
+            _LOG.warning(f"Privileged helper connection lost: {err}")
+            self._close_socket()
+            results = self._send(requests)
+        for request, result in zip(requests, results):
+            if not result.get('ok'):
+                _LOG.error(f"Privileged helper request {request} failed: {result.get('error')}")
+        return [bool(result.get('ok')) for result in results]
+
+    def set_power_limit(self, gpu_index: int, limit: int) -> bool:
+        return self.execute([{'op': OP_SET_POWER_LIMIT, 'gpu_index': gpu_index, 'limit': limit}])[0]
+
+    def lock_gpu_clocks(self, gpu_index: int, min_clock: int, max_clock: int) -> bool:
+        return self.execute([{'op': OP_LOCK_GPU_CLOCKS,
+                              'gpu_index': gpu_index,
+                              'min_clock': min_clock,
+                              'max_clock': max_clock}])[0]
+
+    def reset_gpu_clocks(self, gpu_index: int) -> bool:
+        return self.execute([{'op': OP_RESET_GPU_CLOCKS, 'gpu_index': gpu_index}])[0]
+
+    def set_persistence_mode(self, gpu_index: int, enabled: bool) -> bool:
+        return self.execute([{'op': OP_SET_PERSISTENCE_MODE, 'gpu_index': gpu_index, 'enabled': enabled}])[0]
+
+    @synchronized_with_attr("_lock")
+    def close(self) -> None:
+        self._close_socket()
+        if self._process is not None:
+            # The helper has been started with --exit-with-parent and exits when its stdin is closed
+            if self._process.stdin is not None:
+                self._process.stdin.close()
+            try:
+                self._process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                _LOG.warning("Privileged helper didn't exit")
+            self._process = None
+
+    def _send(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self._connect()
+        assert self._socket is not None and self._reader is not None
+        self._socket.sendall(encode_message({'requests': requests}))
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionResetError("Privileged helper closed the connection")
+        response = decode_message(line)
+        if 'error' in response:
+            raise PrivilegedHelperError(response['error'])
+        results = response.get('results', [])
+        if len(results) != len(requests):
+            raise PrivilegedHelperError(f"Expected {len(requests)} results, got {len(results)}")
+        return results
+
+    def _connect(self) -> None:
+        if self._socket is not None:
+            return
+        if not self._try_connect():
+            self._start()
+            deadline = time.monotonic() + _START_TIMEOUT_S
+            while not self._try_connect():
+                if self._process is not None and self._process.poll() is not None:
+                    code = self._process.returncode
+                    self._process = None
+                    raise PrivilegedHelperError(f"Privileged helper exited with code {code}")
+                if time.monotonic() > deadline:
+                    raise PrivilegedHelperError("Timeout while waiting for the privileged helper")
+                time.sleep(_START_POLL_INTERVAL_S)
+
+    def _try_connect(self) -> bool:
+        if not os.path.exists(self._socket_path):
+            return False
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self._socket_path)
+        except OSError:
+            sock.close()
+            return False
+        self._socket = sock
+        self._reader = sock.makefile('rb')
+        return True
+
+    def _start(self) -> None:
+        if self._process is not None and self._process.poll() is None:
+            return
+        try:
+            # Generated at install time: pkexec only ever runs the root owned launcher, never an interpreter or a
+            # module path chosen by the caller
+            from gwe.helper.helper_path import HELPER_PATH
+        except ImportError as err:
+            raise PrivilegedHelperError("The privileged helper is available only when GWE is installed") from err
+        command = ['pkexec', HELPER_PATH, '--uid', str(os.getuid()), '--exit-with-parent']
+        _LOG.info("Starting privileged helper")
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def _close_socket(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
@@ -0,0 +1,85 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple, Iterable
+
+from gwe.util.concurrency import synchronized_with_attr
+
+_LOG = logging.getLogger(__name__)
+_PROC_PATH = '/proc'
+
+
+class ProcessNameCache:
+    """Resolves PIDs to process names from /proc, reading the command line of a process only once.
+
+    A cached name is only reused while the start time of the PID is unchanged, so that a PID recycled by the
+    kernel for another process is resolved again.
+    """
+
+    def __init__(self, proc_path: str = _PROC_PATH) -> None:
+        self._lock = threading.Lock()
+        self._proc_path = proc_path
+        self._names: Dict[int, Tuple[Optional[int], str]] = {}
+
+    @synchronized_with_attr("_lock")
+    def get_name(self, pid: int) -> Optional[str]:
+        start_time = self._read_start_time(pid)
+        if start_time is None:
+            self._names.pop(pid, None)
+            return None
+        cached = self._names.get(pid)
+        if cached is not None and cached[0] == start_time:
+            return cached[1]
+        name = self._read_name(pid)
+        if name is not None:
+            self._names[pid] = (start_time, name)
+        return name
+
+    @synchronized_with_attr("_lock")
+    def retain(self, pids: Iterable[int]) -> None:
+        """Forgets the PIDs that are not in pids, to keep the cache as small as the process list"""
+        alive = set(pids)
+        for pid in [pid for pid in self._names if pid not in alive]:
+            del self._names[pid]
+
+    def _read_start_time(self, pid: int) -> Optional[int]:
+        try:
+            with open(os.path.join(self._proc_path, str(pid), 'stat'), 'rb') as stat_file:
+                stat = stat_file.read()
+        except OSError:
+            return None
+        # The name field is between parentheses and may contain spaces, the start time is the 22nd field
+        fields = stat[stat.rfind(b')') + 2:].split()
+        try:
+            return int(fields[19])
+        except (IndexError, ValueError):
+            return None
+
+    def _read_name(self, pid: int) -> Optional[str]:
+        try:
+            with open(os.path.join(self._proc_path, str(pid), 'cmdline'), 'rb') as cmdline_file:
+                arg0 = cmdline_file.read().split(b'\0', 1)[0]
+            if arg0:
+                return os.path.basename(arg0.decode(errors='replace'))
+            # Kernel threads and zombies have an empty command line
+            with open(os.path.join(self._proc_path, str(pid), 'comm'), 'rb') as comm_file:
+                return comm_file.read().decode(errors='replace').strip()
+        except OSError:
+            _LOG.debug(f"Unable to read the name of process {pid}")
+            return None
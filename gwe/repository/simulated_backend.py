@@ -0,0 +1,270 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2020 Roberto Leinardi
+#
+# gst is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gst is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gst.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import math
+import random
+import threading
+import time
+from typing import Optional, List, Tuple
+
+from gwe.model.clocks import Clocks
+from gwe.model.fan import Fan
+from gwe.model.gpu_descriptor import GpuDescriptor
+from gwe.model.gpu_status import GpuStatus
+from gwe.model.info import Info
+from gwe.model.overclock import Overclock
+from gwe.model.power import Power
+from gwe.model.status import Status
+from gwe.model.temp import Temp
+from gwe.repository.telemetry_backend import TelemetryBackend, FAN_WRITE_LATENCY_BUDGET_S
+from gwe.util.call_metrics import CallMetrics
+from gwe.util.concurrency import synchronized_with_attr
+from gwe.util.latency import LatencyStats
+
+_LOG = logging.getLogger(__name__)
+
+SIMULATED_GPU_COUNT_DEFAULT = 2
+SIMULATED_FAN_COUNT_DEFAULT = 2
+SIMULATED_LATENCY_MS_DEFAULT = 0.0
+_FAN_RPM_MAX = 3000
+_TEMP_IDLE = 35.0
+_TEMP_FULL_LOAD = 80.0
+_LOAD_PERIOD_S = 60.0
+# Simulated time advanced by every status read, so the load does not depend on the wall clock
+_TICK_S = 1.0
+# The queries the NVML backend makes for every GPU read, besides one per fan and the fan policy
+_STATUS_READ_CALLS = (
+    'simulated_get_memory_info',
+    'simulated_get_utilization_rates',
+    'simulated_get_encoder_utilization',
+    'simulated_get_decoder_utilization',
+    'simulated_get_pcie_link_generation',
+    'simulated_get_pcie_link_width',
+    'simulated_get_graphic_clock',
+    'simulated_get_sm_clock',
+    'simulated_get_memory_clock',
+    'simulated_get_video_clock',
+    'simulated_get_power_fields',
+    'simulated_get_temperature',
+)
+
+
+class _SimulatedGpu:
+    def __init__(self, index: int, fan_count: int) -> None:
+        self.random = random.Random(index)
+        self.load_phase = self.random.uniform(0, 2 * math.pi)
+        self.temp = _TEMP_IDLE
+        self.power_limit = 250.0
+        self.perf_level_max = 3
+        self.gpu_offset = 0
+        self.memory_offset = 0
+        self.manual_control = False
+        self.manual_duties = [0] * fan_count
+        self.descriptor = GpuDescriptor(
+            uuid=f"GPU-00000000-0000-0000-0000-{index:012d}",
+            name=f"Simulated GPU {index}",
+            vbios="00.00.00.00.00",
+            driver="000.00",
+            cuda_cores=4352,
+            memory_total=11264,
+            memory_interface=352,
+            pcie_max_generation=3,
+            pcie_max_link=16,
+            temp_maximum=89,
+            temp_slowdown=91,
+            temp_shutdown=94,
+            power_default=250.0,
+            power_minimum=100.0,
+            power_maximum=300.0,
+            perf_level_max=self.perf_level_max,
+            graphic_clock_max=2100,
+            sm_clock_max=2100,
+            memory_clock_max=7000,
+            video_clock_max=1950,
+            gpu_offset_range=(-200, 1000),
+            memory_offset_range=(-2000, 6000),
+            cooler_indexes=list(range(fan_count)) or None
+        )
+
+
+class SimulatedBackend(TelemetryBackend):
+    """Generates plausible readings for any number of GPUs, for benchmarking without NVIDIA hardware"""
+
+    def __init__(self,
+                 gpu_count: int = SIMULATED_GPU_COUNT_DEFAULT,
+                 fan_count: int = SIMULATED_FAN_COUNT_DEFAULT,
+                 latency_ms: float = SIMULATED_LATENCY_MS_DEFAULT,
+                 call_metrics: Optional[CallMetrics] = None) -> None:
+        self._lock = threading.RLock()
+        self._latency_s = max(0.0, latency_ms) / 1000
+        self._call_metrics = call_metrics if call_metrics is not None else CallMetrics()
+        self._gpus: List[_SimulatedGpu] = [_SimulatedGpu(i, max(0, fan_count)) for i in range(max(0, gpu_count))]
+        self._tick = 0
+        self._write_locks = [threading.Lock() for _ in self._gpus]
+        self._fan_write_latency = LatencyStats('Fan write', FAN_WRITE_LATENCY_BUDGET_S)
+        _LOG.info(f"Simulating {len(self._gpus)} GPU(s) with {fan_count} fan(s) each "
+                  f"and {latency_ms} ms of latency per call")
+
+    def requires_nv_control(self) -> bool:
+        return False
+
+    def has_nv_control_extension(self) -> bool:
+        return False
+
+    def has_nvml_shared_library(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+    @synchronized_with_attr("_lock")
+    def get_status(self) -> Optional[Status]:
+        time1 = time.time()
+        self._tick += 1
+        gpu_status_list = [self._read_gpu_status(index, gpu) for index, gpu in enumerate(self._gpus)]
+        time2 = time.time()
+        _LOG.debug(f'Fetching new data took {((time2 - time1) * 1000.0):.3f} ms')
+        return Status(gpu_status_list, timestamp=time1)
+
+    def _simulate_call(self, gpu_index: int, function: str) -> None:
+        start = time.perf_counter()
+        if self._latency_s > 0:
+            time.sleep(self._latency_s)
+        self._call_metrics.record(function, self._gpus[gpu_index].descriptor.uuid, time.perf_counter() - start)
+
+    def _read_gpu_status(self, index: int, gpu: _SimulatedGpu) -> GpuStatus:
+        for function in _STATUS_READ_CALLS:
+            self._simulate_call(index, function)
+        for _ in gpu.manual_duties:
+            self._simulate_call(index, 'simulated_get_fan_speed')
+        if gpu.manual_duties:
+            self._simulate_call(index, 'simulated_get_fan_control_policy')
+        timestamp = time.time()
+        descriptor = gpu.descriptor
+        load = 0.5 + 0.5 * math.sin(2 * math.pi * self._tick * _TICK_S / _LOAD_PERIOD_S + gpu.load_phase)
+        load = min(1.0, max(0.0, load + gpu.random.uniform(-0.05, 0.05)))
+
+        auto_duty = int(min(100.0, max(30.0, (gpu.temp - 30.0) * 1.5)))
+        duties = list(gpu.manual_duties) if gpu.manual_control else [auto_duty] * len(gpu.manual_duties)
+        duty = max(duties, default=auto_duty)
+        # The temperature drifts towards the one dictated by the load, the fan pulls it down
+        target_temp = _TEMP_IDLE + (_TEMP_FULL_LOAD - _TEMP_IDLE) * load - duty * 0.1
+        gpu.temp += (target_temp - gpu.temp) * min(1.0, _TICK_S / 10.0)
+
+        fan_list: Optional[List[Tuple[int, Optional[int]]]] = None
+        if descriptor.cooler_indexes:
+            fan_list = [(fan_duty, int(_FAN_RPM_MAX * fan_duty / 100) + gpu.random.randint(-20, 20))
+                        for fan_duty in duties]
+        power_draw = min(gpu.power_limit, 20.0 + (gpu.power_limit - 20.0) * load)
+        graphic_clock = int(300 + (descriptor.graphic_clock_max - 300) * load) + gpu.gpu_offset
+        memory_used = int(512 + (descriptor.memory_total - 512) * load * 0.5)
+        return GpuStatus(
+            index=index,
+            info=Info(
+                name=descriptor.name,
+                vbios=descriptor.vbios,
+                driver=descriptor.driver,
+                pcie_current_generation=descriptor.pcie_max_generation if load > 0.1 else 1,
+                pcie_max_generation=descriptor.pcie_max_generation,
+                pcie_current_link=descriptor.pcie_max_link,
+                pcie_max_link=descriptor.pcie_max_link,
+                cuda_cores=descriptor.cuda_cores,
+                uuid=descriptor.uuid,
+                memory_total=descriptor.memory_total,
+                memory_used=memory_used,
+                memory_interface=descriptor.memory_interface,
+                memory_usage=int(load * 60),
+                gpu_usage=int(load * 100),
+                encoder_usage=0,
+                decoder_usage=0
+            ),
+            power=Power(
+                draw=round(power_draw, 2),
+                limit=gpu.power_limit,
+                default=descriptor.power_default,
+                minimum=descriptor.power_minimum,
+                enforced=gpu.power_limit,
+                maximum=descriptor.power_maximum
+            ),
+            temp=Temp(
+                gpu=int(round(gpu.temp)),
+                maximum=descriptor.temp_maximum,
+                slowdown=descriptor.temp_slowdown,
+                shutdown=descriptor.temp_shutdown
+            ),
+            fan=Fan(
+                fan_list=fan_list,
+                control_allowed=fan_list is not None,
+                manual_control=gpu.manual_control
+            ),
+            clocks=Clocks(
+                graphic_current=graphic_clock,
+                graphic_max=descriptor.graphic_clock_max,
+                sm_current=graphic_clock,
+                sm_max=descriptor.sm_clock_max,
+                memory_current=descriptor.memory_clock_max + gpu.memory_offset // 2,
+                memory_max=descriptor.memory_clock_max,
+                video_current=int(graphic_clock * 0.9),
+                video_max=descriptor.video_clock_max
+            ),
+            overclock=Overclock(
+                perf_level_max=gpu.perf_level_max,
+                available=True,
+                gpu_range=descriptor.gpu_offset_range,
+                gpu_offset=gpu.gpu_offset,
+                memory_range=descriptor.memory_offset_range,
+                memory_offset=gpu.memory_offset
+            ),
+            descriptor=descriptor,
+            timestamp=timestamp
+        )
+
+    @synchronized_with_attr("_lock")
+    def set_overclock(self, gpu_index: int, perf: int, gpu_offset: int, memory_offset: int) -> bool:
+        self._simulate_call(gpu_index, 'simulated_set_overclock')
+        gpu = self._gpus[gpu_index]
+        gpu.gpu_offset = gpu_offset
+        gpu.memory_offset = memory_offset
+        return True
+
+    @synchronized_with_attr("_lock")
+    def set_power_limit(self, gpu_index: int, limit: int) -> bool:
+        self._simulate_call(gpu_index, 'simulated_set_power_limit')
+        self._gpus[gpu_index].power_limit = float(limit)
+        return True
+
+    def set_all_gpus_fan_to_auto(self) -> None:
+        for gpu_index in range(len(self._gpus)):
+            self.set_fan_speed(gpu_index, manual_control=False)
+
+    def get_fan_write_latency(self) -> Optional[LatencyStats]:
+        return self._fan_write_latency
+
+    def set_fan_speed(self,
+                      gpu_index: int,
+                      speed: int = 100,
+                      manual_control: bool = False,
+                      cooler: Optional[int] = None) -> bool:
+        # Like the real backends, fan writes don't wait for a poll to complete
+        with self._fan_write_latency.measure(), self._write_locks[gpu_index]:
+            self._simulate_call(gpu_index, 'simulated_set_fan_speed')
+            gpu = self._gpus[gpu_index]
+            gpu.manual_control = manual_control
+            for fan_index in range(len(gpu.manual_duties)):
+                if cooler is None or cooler == fan_index:
+                    gpu.manual_duties[fan_index] = speed
+        return False
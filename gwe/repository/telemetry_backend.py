@@ -0,0 +1,92 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2020 Roberto Leinardi
+#
+# gst is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gst is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gst.  If not, see <http://www.gnu.org/licenses/>.
+from enum import Enum
+from typing import Optional, Dict, List, Tuple
+
+from gwe.model.gpu_process import GpuProcess
+from gwe.model.status import Status
+from gwe.util.latency import LatencyStats
+
+FAN_WRITE_LATENCY_BUDGET_S = 0.1
+
+# (gpu_index, cooler) of a fan write, cooler being the position of the fan in Fan.fan_list or None for all the fans
+# of the GPU. The manual control is enabled or disabled for all the fans of the GPU in any case.
+FanTarget = Tuple[int, Optional[int]]
+
+
+class TelemetryBackendType(Enum):
+    NV_CONTROL = 'nv-control'
+    NVML = 'nvml'
+    SIMULATED = 'simulated'
+
+
+class TelemetryBackend:
+    def requires_nv_control(self) -> bool:
+        raise NotImplementedError()
+
+    def has_nv_control_extension(self) -> bool:
+        raise NotImplementedError()
+
+    def has_nvml_shared_library(self) -> bool:
+        raise NotImplementedError()
+
+    def get_status(self) -> Optional[Status]:
+        raise NotImplementedError()
+
+    def get_processes(self, gpu_index: int) -> List[GpuProcess]:
+        """The processes running on a GPU. Not part of get_status(), it's only read when requested"""
+        return []
+
+    def get_unsupported_probes(self) -> Dict[str, List[str]]:
+        """The functions/attributes that each device doesn't support and that are no longer queried"""
+        return {}
+
+    def get_fan_write_latency(self) -> Optional[LatencyStats]:
+        return None
+
+    def set_overclock(self, gpu_index: int, perf: int, gpu_offset: int, memory_offset: int) -> bool:
+        raise NotImplementedError()
+
+    def set_power_limit(self, gpu_index: int, limit: int) -> bool:
+        raise NotImplementedError()
+
+    def set_fan_speed(self,
+                      gpu_index: int,
+                      speed: int = 100,
+                      manual_control: bool = False,
+                      cooler: Optional[int] = None) -> bool:
+        raise NotImplementedError()
+
+    def set_fan_speeds(self, commands: Dict[FanTarget, Tuple[int, bool]]) -> Dict[FanTarget, bool]:
+        """Sets the fans of several GPUs, commands maps a FanTarget to (speed, manual_control). Returns the targets
+        mapped to True for the writes that failed, like set_fan_speed()."""
+        return {target: self.set_fan_speed(target[0], speed, manual_control, target[1])
+                for target, (speed, manual_control) in commands.items()}
+
+    def set_all_gpus_fan_to_auto(self) -> None:
+        raise NotImplementedError()
+
+    def reset_fans_to_auto(self, gpu_indexes: List[int]) -> bool:
+        """Switches the fans of the GPUs to the VBIOS automatic control without going through what get_status() uses,
+        so that it works even while a read hangs. Returns True if a write failed, like set_fan_speed()."""
+        error = False
+        for gpu_index in gpu_indexes:
+            error = self.set_fan_speed(gpu_index, manual_control=False) or error
+        return error
+
+    def close(self) -> None:
+        raise NotImplementedError()
@@ -0,0 +1,65 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+from typing import Optional, List
+
+_LOG = logging.getLogger(__name__)
+# Poll at the floor interval when the temperature is this close to a step of the applied fan curve
+_STEP_PROXIMITY_C = 3
+# or when it's rising faster than this
+_FAST_RISE_C_PER_S = 0.5
+# Readings are stable when the temperature moved at most this much since the previous one
+_STABLE_DELTA_C = 1
+# While hidden and stable, the interval grows by this factor at every refresh until it reaches the ceiling
+_BACKOFF_FACTOR = 1.5
+
+
+class AdaptiveRefreshInterval:
+    """Computes the interval until the next refresh, between a floor and a ceiling, from the latest readings"""
+
+    def __init__(self, base_s: float, floor_s: float, ceiling_s: float) -> None:
+        self.floor_s = min(floor_s, ceiling_s)
+        self.ceiling_s = max(floor_s, ceiling_s)
+        self.base_s = min(max(base_s, self.floor_s), self.ceiling_s)
+        self.interval_s = self.base_s
+        self._last_temp: Optional[int] = None
+        self._last_timestamp: Optional[float] = None
+
+    def update(self,
+               temp: Optional[int],
+               timestamp: float,
+               window_visible: bool,
+               fan_step_temps: Optional[List[int]] = None) -> float:
+        reason = None
+        interval_s = self.base_s
+        if temp is not None and self._last_temp is not None and self._last_timestamp is not None:
+            delta_c = temp - self._last_temp
+            elapsed_s = timestamp - self._last_timestamp
+            if fan_step_temps and min(abs(temp - step) for step in fan_step_temps) <= _STEP_PROXIMITY_C:
+                interval_s, reason = self.floor_s, "near a fan curve step"
+            elif elapsed_s > 0 and delta_c / elapsed_s >= _FAST_RISE_C_PER_S:
+                interval_s, reason = self.floor_s, "temperature rising quickly"
+            elif not window_visible and abs(delta_c) <= _STABLE_DELTA_C:
+                interval_s = min(self.ceiling_s, max(self.base_s, self.interval_s * _BACKOFF_FACTOR))
+                reason = "window hidden and readings stable"
+        self._last_temp = temp
+        self._last_timestamp = timestamp
+        if interval_s != self.interval_s:
+            _LOG.info(f"Refresh interval {self.interval_s:.2f} s -> {interval_s:.2f} s "
+                      f"({reason or 'default'}, {60 / interval_s:.1f} refreshes per minute)")
+            self.interval_s = interval_s
+        return interval_s
@@ -0,0 +1,120 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import threading
+import time
+from typing import Callable, Dict, List, Tuple, TypeVar, Any
+
+# Upper bounds of the latency histogram buckets, the last bucket counts all the slower calls
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250)
+
+T = TypeVar('T')
+
+
+class CallStats:
+    """Call count, error count and latency histogram of a single driver function on a single device"""
+
+    def __init__(self, function: str, device: str) -> None:
+        self.function = function
+        self.device = device
+        self.count = 0
+        self.error_count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    @property
+    def mean_s(self) -> float:
+        return self.total_s / self.count if self.count else 0.0
+
+    def record(self, duration_s: float, error: bool) -> None:
+        self.count += 1
+        if error:
+            self.error_count += 1
+        self.total_s += duration_s
+        self.max_s = max(self.max_s, duration_s)
+        duration_ms = duration_s * 1000
+        bucket = 0
+        while bucket < len(LATENCY_BUCKETS_MS) and duration_ms > LATENCY_BUCKETS_MS[bucket]:
+            bucket += 1
+        self.buckets[bucket] += 1
+
+    def copy(self) -> 'CallStats':
+        stats = CallStats(self.function, self.device)
+        stats.count = self.count
+        stats.error_count = self.error_count
+        stats.total_s = self.total_s
+        stats.max_s = self.max_s
+        stats.buckets = list(self.buckets)
+        return stats
+
+    def format_histogram(self) -> str:
+        labels = [f"≤{bound:g}" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]:g}"]
+        return ' '.join(f"{label}:{count}" for label, count in zip(labels, self.buckets) if count)
+
+
+class CallMetrics:
+    """Always-on counters of the driver calls made while sampling, keyed by function and device"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], CallStats] = {}
+
+    def record(self, function: str, device: str, duration_s: float, error: bool = False) -> None:
+        key = (function, device)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = CallStats(function, device)
+                self._stats[key] = stats
+            stats.record(duration_s, error)
+
+    def call(self, device: str, a_function: Callable[..., T], *args: Any) -> T:
+        """Calls a_function(*args), counting it as an error if it raises"""
+        error = True
+        start = time.perf_counter()
+        try:
+            result = a_function(*args)
+            error = False
+            return result
+        finally:
+            self.record(a_function.__name__, device, time.perf_counter() - start, error)
+
+    def get_snapshot(self) -> List[CallStats]:
+        with self._lock:
+            return sorted((stats.copy() for stats in self._stats.values()),
+                          key=lambda stats: (stats.device, stats.function))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def format_table(self) -> str:
+        snapshot = self.get_snapshot()
+        if not snapshot:
+            return "No driver calls recorded"
+        rows = [("Device", "Function", "Calls", "Errors", "Mean ms", "Max ms", "Histogram (ms:calls)")]
+        for stats in snapshot:
+            rows.append((stats.device,
+                         stats.function,
+                         str(stats.count),
+                         str(stats.error_count),
+                         f"{stats.mean_s * 1000:.3f}",
+                         f"{stats.max_s * 1000:.3f}",
+                         stats.format_histogram()))
+        widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]) - 1)]
+        return '\n'.join('  '.join([cell.ljust(width) for cell, width in zip(row, widths)] + [row[-1]])
+                         for row in rows)
@@ -0,0 +1,127 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import statistics
+import threading
+from collections import deque
+from typing import Optional, Deque
+
+_HOUR_S = 3600
+
+
+class TemperatureFilter:
+    """Smooths the temperature fed to the fan curve. The base class passes every reading through unchanged."""
+
+    def update(self, temp: float) -> float:
+        return temp
+
+    def reset(self) -> None:
+        pass
+
+
+class EmaTemperatureFilter(TemperatureFilter):
+    """Exponential moving average, weighted like a simple moving average of the given number of samples"""
+
+    def __init__(self, samples: int) -> None:
+        self._alpha = 2 / (samples + 1)
+        self._value: Optional[float] = None
+
+    def update(self, temp: float) -> float:
+        self._value = temp if self._value is None else self._alpha * temp + (1 - self._alpha) * self._value
+        return self._value
+
+    def reset(self) -> None:
+        self._value = None
+
+
+class MedianTemperatureFilter(TemperatureFilter):
+    """Median of the latest readings, which ignores isolated spikes entirely"""
+
+    def __init__(self, samples: int) -> None:
+        self._window: Deque[float] = deque(maxlen=samples)
+
+    def update(self, temp: float) -> float:
+        self._window.append(temp)
+        return statistics.median(self._window)
+
+    def reset(self) -> None:
+        self._window.clear()
+
+
+def create_temperature_filter(samples: int, median: bool = False) -> TemperatureFilter:
+    if samples <= 1:
+        return TemperatureFilter()
+    return MedianTemperatureFilter(samples) if median else EmaTemperatureFilter(samples)
+
+
+class FanDutyLimiter:
+    """Sits between the fan curve and the fan writes: limits how fast the duty moves (max_slew_per_s, in % per
+    second) and how often it changes (min_dwell_s). A limit set to 0 is disabled."""
+
+    def __init__(self, max_slew_per_s: float = 0, min_dwell_s: float = 0) -> None:
+        self.max_slew_per_s = max_slew_per_s
+        self.min_dwell_s = min_dwell_s
+        self._duty: Optional[int] = None
+        self._timestamp = 0.0
+
+    def limit(self, target: int, timestamp: float) -> Optional[int]:
+        """Returns the duty to write now to move towards target, None if nothing should be written"""
+        if self._duty is None:
+            return target
+        if target == self._duty:
+            return None
+        elapsed_s = timestamp - self._timestamp
+        if elapsed_s < self.min_dwell_s:
+            return None
+        if self.max_slew_per_s > 0:
+            max_step = max(1, int(self.max_slew_per_s * elapsed_s))
+            return self._duty + max(-max_step, min(max_step, target - self._duty))
+        return target
+
+    def on_written(self, duty: Optional[int], timestamp: float) -> None:
+        """duty is None when the VBIOS took over the fans, the next target is then applied right away"""
+        self._duty = duty
+        self._timestamp = timestamp
+
+
+class WriteRate:
+    """Counts the fan writes, in total and in the last hour"""
+
+    def __init__(self, start_timestamp: float) -> None:
+        self._lock = threading.Lock()
+        self._start_timestamp = start_timestamp
+        self._timestamps: Deque[float] = deque()
+        self.count = 0
+
+    def record(self, timestamp: float) -> None:
+        with self._lock:
+            self.count += 1
+            self._timestamps.append(timestamp)
+            self._evict(timestamp)
+
+    def get_last_hour_count(self, timestamp: float) -> int:
+        with self._lock:
+            self._evict(timestamp)
+            return len(self._timestamps)
+
+    def get_per_hour(self, timestamp: float) -> float:
+        """The average since start, extrapolated when less than an hour has passed"""
+        elapsed_s = timestamp - self._start_timestamp
+        return self.count * _HOUR_S / elapsed_s if elapsed_s > 0 else 0.0
+
+    def _evict(self, timestamp: float) -> None:
+        while self._timestamps and self._timestamps[0] <= timestamp - _HOUR_S:
+            self._timestamps.popleft()
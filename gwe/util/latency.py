@@ -0,0 +1,69 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Iterator
+
+_LOG = logging.getLogger(__name__)
+
+
+class LatencyStats:
+    """Running statistics of the duration of an operation, optionally checked against a latency budget"""
+
+    def __init__(self, name: str, budget_s: Optional[float] = None) -> None:
+        self._lock = threading.Lock()
+        self.name = name
+        self.budget_s = budget_s
+        self.count = 0
+        self.over_budget_count = 0
+        self.total_s = 0.0
+        self.last_s = 0.0
+        self.max_s = 0.0
+
+    @property
+    def mean_s(self) -> float:
+        return self.total_s / self.count if self.count else 0.0
+
+    def record(self, duration_s: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_s += duration_s
+            self.last_s = duration_s
+            self.max_s = max(self.max_s, duration_s)
+            over_budget = self.budget_s is not None and duration_s > self.budget_s
+            if over_budget:
+                self.over_budget_count += 1
+        if over_budget:
+            _LOG.warning(f"{self.name} took {duration_s * 1000:.3f} ms, "
+                         f"over the budget of {self.budget_s * 1000:.0f} ms")  # type: ignore
+        else:
+            _LOG.debug(f"{self.name} took {duration_s * 1000:.3f} ms (max {self.max_s * 1000:.3f} ms)")
+
+    @contextmanager
+    def measure(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - start)
+
+    def __str__(self) -> str:
+        return (f"{self.name}: count={self.count}, last={self.last_s * 1000:.3f} ms, "
+                f"mean={self.mean_s * 1000:.3f} ms, max={self.max_s * 1000:.3f} ms, "
+                f"over budget={self.over_budget_count}")
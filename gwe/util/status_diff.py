@@ -0,0 +1,52 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+from typing import Dict, Optional, Set
+
+from gwe.model.gpu_status import GpuStatus
+from gwe.model.status import Status
+
+_SECTIONS = ('info', 'power', 'temp', 'clocks', 'fan', 'overclock')
+
+
+class StatusDiffer:
+    """Compares each Status with the previous one and returns, per GPU index, the fields that changed, named like
+    "power.draw" or "fan.fan_list". A GPU seen for the first time has all its fields changed."""
+
+    def __init__(self) -> None:
+        self._previous: Dict[int, GpuStatus] = {}
+
+    def diff(self, status: Status) -> Dict[int, Set[str]]:
+        result: Dict[int, Set[str]] = {}
+        for gpu_status in status.gpu_status_list:
+            result[gpu_status.index] = get_changed_fields(self._previous.get(gpu_status.index), gpu_status)
+        self._previous = {gpu_status.index: gpu_status for gpu_status in status.gpu_status_list}
+        return result
+
+    def reset(self) -> None:
+        self._previous.clear()
+
+
+def get_changed_fields(old: Optional[GpuStatus], new: GpuStatus) -> Set[str]:
+    changed: Set[str] = set()
+    for section in _SECTIONS:
+        new_section = getattr(new, section)
+        old_section = getattr(old, section) if old is not None else None
+        for field in type(new_section).__slots__:
+            value = getattr(new_section, field)
+            if old_section is None or getattr(old_section, field) != value:
+                changed.add(f"{section}.{field}")
+    return changed
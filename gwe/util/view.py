@@ -22,8 +22,10 @@ from matplotlib.backends.backend_gtk3agg import FigureCanvasGTK3Agg as FigureCan
 from matplotlib.colors import ColorConverter
 from matplotlib.figure import Figure
 
-from gwe.conf import MIN_TEMP, MAX_TEMP, FAN_MAX_DUTY, GRAPH_COLOR_HEX
+from gwe.conf import MIN_TEMP, MAX_TEMP, GRAPH_COLOR_HEX
+from gwe.model.fan_curve import FanCurve
 from gwe.model.fan_profile import FanProfile
+from gwe.model.speed_step import SpeedStep
 
 
 def build_glib_option(long_name: str,
@@ -110,16 +112,9 @@ def init_plot_chart(scrolled_window: Gtk.ScrolledWindow,
     return growing_line[0], decreasing_line[0]
 
 
-def get_fan_profile_data(profile: FanProfile) -> Dict[int, int]:
-    data = {p.temperature: p.duty for p in profile.steps}
-    if data:
-        # if profile.single_step:
-        #     data.update({MAX_TEMP: profile.steps[0].duty})
-        # else:
-        if MIN_TEMP not in data:
-            data[MIN_TEMP] = data[min(data.keys())]
-        data.update({MAX_TEMP: FAN_MAX_DUTY})
-    return data
+def get_fan_profile_data(profile: FanProfile, cooler: Optional[int] = None) -> Dict[int, int]:
+    steps = SpeedStep.select_by_cooler(profile, cooler)
+    return FanCurve(profile.id, [(step.temperature, step.duty) for step in steps]).get_chart_data()
 
 
 def is_dazzle_version_supported() -> bool:
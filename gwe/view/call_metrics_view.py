@@ -0,0 +1,59 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+import logging
+from typing import List, Tuple
+
+from gi.repository import Gtk
+from injector import singleton, inject
+
+from gwe.view.di import CallMetricsBuilder
+from gwe.presenter.call_metrics_presenter import CallMetricsViewInterface, CallMetricsPresenter
+
+_LOG = logging.getLogger(__name__)
+
+
+@singleton
+class CallMetricsView(CallMetricsViewInterface):
+    @inject
+    def __init__(self,
+                 presenter: CallMetricsPresenter,
+                 builder: CallMetricsBuilder,
+                 ) -> None:
+        _LOG.debug('init CallMetricsView')
+        self._presenter: CallMetricsPresenter = presenter
+        self._presenter.view = self
+        self._builder: Gtk.Builder = builder
+        self._builder.connect_signals(self._presenter)
+        self._init_widgets()
+
+    def _init_widgets(self) -> None:
+        self._dialog: Gtk.Dialog = self._builder.get_object('dialog')
+        self._liststore: Gtk.ListStore = self._builder.get_object('liststore')
+
+    def set_transient_for(self, window: Gtk.Window) -> None:
+        self._dialog.set_transient_for(window)
+
+    def show(self) -> None:
+        self._dialog.show_all()
+
+    def hide(self) -> None:
+        self._dialog.hide()
+
+    def refresh_metrics(self, data: List[Tuple[str, str, int, int, str, str, str]]) -> None:
+        self._liststore.clear()
+        for row in data:
+            self._liststore.append(list(row))
@@ -0,0 +1,105 @@
+# This file is part of gwe.
+#
+# Copyright (c) 2018 Roberto Leinardi
+#
+# gwe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# gwe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with gwe.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+from typing import NewType
+
+from gi.repository import Gtk
+from injector import Module, provider, singleton
+
+from gwe.conf import APP_PACKAGE_NAME, APP_MAIN_UI_NAME, APP_EDIT_FAN_PROFILE_UI_NAME, APP_PREFERENCES_UI_NAME, \
+    APP_HISTORICAL_DATA_UI_NAME, APP_EDIT_OC_PROFILE_UI_NAME, APP_CALL_METRICS_UI_NAME, APP_GPU_PROCESSES_UI_NAME
+
+_LOG = logging.getLogger(__name__)
+
+MainBuilder = NewType('MainBuilder', Gtk.Builder)
+EditFanProfileBuilder = NewType('EditFanProfileBuilder', Gtk.Builder)
+EditOverclockProfileBuilder = NewType('EditOverclockProfileBuilder', Gtk.Builder)
+HistoricalDataBuilder = NewType('HistoricalDataBuilder', Gtk.Builder)
+PreferencesBuilder = NewType('PreferencesBuilder', Gtk.Builder)
+CallMetricsBuilder = NewType('CallMetricsBuilder', Gtk.Builder)
+GpuProcessesBuilder = NewType('GpuProcessesBuilder', Gtk.Builder)
+
+_UI_RESOURCE_PATH = "/com/leinardi/gwe/ui/{}"
+
+
+# pylint: disable=no-self-use
+class ViewProviderModule(Module):
+    """The Gtk.Builder providers, kept apart from gwe.di so that the daemon can use the injector without Gtk"""
+
+    @singleton
+    @provider
+    def provide_main_builder(self) -> MainBuilder:
+        _LOG.debug("provide Gtk.Builder")
+        builder = MainBuilder(Gtk.Builder())
+        builder.set_translation_domain(APP_PACKAGE_NAME)
+        builder.add_from_resource(_UI_RESOURCE_PATH.format(APP_MAIN_UI_NAME))
+        return builder
+
+    @singleton
+    @provider
+    def provide_edit_fan_profile_builder(self) -> EditFanProfileBuilder:
+        _LOG.debug("provide Gtk.Builder")
+        builder = EditFanProfileBuilder(Gtk.Builder())
+        builder.set_translation_domain(APP_PACKAGE_NAME)
+        builder.add_from_resource(_UI_RESOURCE_PATH.format(APP_EDIT_FAN_PROFILE_UI_NAME))
+        return builder
+
+    @singleton
+    @provider
+    def provide_edit_overclock_profile_builder(self) -> EditOverclockProfileBuilder:
+        _LOG.debug("provide Gtk.Builder")
+        builder = EditOverclockProfileBuilder(Gtk.Builder())
+        builder.set_translation_domain(APP_PACKAGE_NAME)
+        builder.add_from_resource(_UI_RESOURCE_PATH.format(APP_EDIT_OC_PROFILE_UI_NAME))
+        return builder
+
+    @singleton
+    @provider
+    def provide_historical_data_builder(self) -> HistoricalDataBuilder:
+        _LOG.debug("provide Gtk.Builder")
+        builder = HistoricalDataBuilder(Gtk.Builder())
+        builder.set_translation_domain(APP_PACKAGE_NAME)
+        builder.add_from_resource(_UI_RESOURCE_PATH.format(APP_HISTORICAL_DATA_UI_NAME))
+        return builder
+
+    @singleton
+    @provider
+    def provide_preferences_builder(self) -> PreferencesBuilder:
+        _LOG.debug("provide Gtk.Builder")
+        builder = PreferencesBuilder(Gtk.Builder())
+        builder.set_translation_domain(APP_PACKAGE_NAME)
+        builder.add_from_resource(_UI_RESOURCE_PATH.format(APP_PREFERENCES_UI_NAME))
+        return builder
+
+    @singleton
+    @provider
+    def provide_call_metrics_builder(self) -> CallMetricsBuilder:
+        _LOG.debug("provide Gtk.Builder")
+        builder = CallMetricsBuilder(Gtk.Builder())
+        builder.set_translation_domain(APP_PACKAGE_NAME)
+        builder.add_from_resource(_UI_RESOURCE_PATH.format(APP_CALL_METRICS_UI_NAME))
+        return builder
+
+    @singleton
+    @provider
+    def provide_gpu_processes_builder(self) -> GpuProcessesBuilder:
+        _LOG.debug("provide Gtk.Builder")
+        builder = GpuProcessesBuilder(Gtk.Builder())
+        builder.set_translation_domain(APP_PACKAGE_NAME)
+        builder.add_from_resource(_UI_RESOURCE_PATH.format(APP_GPU_PROCESSES_UI_NAME))
+        return builder
@@ -24,7 +24,7 @@ from matplotlib.backends.backend_gtk3agg import FigureCanvasGTK3Agg as FigureCan
 from matplotlib.figure import Figure
 
 from gwe.conf import MIN_TEMP, FAN_MIN_DUTY, MAX_TEMP, FAN_MAX_DUTY
-from gwe.di import EditFanProfileBuilder
+from gwe.view.di import EditFanProfileBuilder
 from gwe.interactor.settings_interactor import SettingsInteractor
 from gwe.presenter.edit_fan_profile_presenter import EditFanProfileViewInterface, EditFanProfilePresenter
 from gwe.util.view import init_plot_chart, get_fan_profile_data
@@ -56,6 +56,7 @@ class EditFanProfileView(EditFanProfileViewInterface):
             .get_object('delete_profile_button')
         self._profile_name_entry: Gtk.Entry = self._builder \
             .get_object('profile_name_entry')
+        self._cooler_combobox: Gtk.ComboBoxText = self._builder.get_object('cooler_combobox')
         self._liststore: Gtk.ListStore = self._builder.get_object('liststore')
         self._vbios_silent_mode: Gtk.CheckButton = self._builder \
             .get_object("vbios_silent_mode")
@@ -104,9 +105,15 @@ class EditFanProfileView(EditFanProfileViewInterface):
         self._chart_canvas.draw()
         self._chart_canvas.flush_events()
 
-    def show(self, profile: FanProfile) -> None:
+    def show(self, profile: FanProfile, cooler_count: int) -> None:
         self._treeselection.unselect_all()
         self._profile_name_entry.set_text(profile.name)
+        self._cooler_combobox.remove_all()
+        self._cooler_combobox.append_text("All fans")
+        for cooler in range(cooler_count):
+            self._cooler_combobox.append_text(f"Fan {cooler + 1}")
+        self._cooler_combobox.set_active(0)
+        self._cooler_combobox.set_visible(cooler_count > 1)
         self.refresh_liststore(profile)
         self.refresh_controls(profile=profile)
         self._dialog.show_all()
@@ -126,19 +133,20 @@ class EditFanProfileView(EditFanProfileViewInterface):
     def has_a_step_selected(self) -> bool:
         return self._treeselection.get_selected()[1] is not None
 
-    def refresh_liststore(self, profile: FanProfile) -> None:
+    def refresh_liststore(self, profile: FanProfile, cooler: Optional[int] = None) -> None:
         self._liststore.clear()
-        for step in profile.steps:
+        steps = list(SpeedStep.select_by_cooler(profile, cooler).order_by(SpeedStep.temperature))
+        for step in steps:
             self._liststore.append([step.id, step.temperature, step.duty])
-        if profile.steps:
-            if profile.steps[-1].temperature == MAX_TEMP or profile.steps[-1].duty == FAN_MAX_DUTY:
+        if steps:
+            if steps[-1].temperature == MAX_TEMP or steps[-1].duty == FAN_MAX_DUTY:
                 self._add_step_button.set_sensitive(False)
             else:
                 self._add_step_button.set_sensitive(True)
         else:
             self._add_step_button.set_sensitive(True)
 
-        self._plot_chart(get_fan_profile_data(profile))
+        self._plot_chart(get_fan_profile_data(profile, cooler))
 
     def refresh_controls(self,
                          step: Optional[SpeedStep] = None,
@@ -154,13 +162,13 @@ class EditFanProfileView(EditFanProfileViewInterface):
             self._controls_grid.set_sensitive(False)
         else:
             prev_steps = (SpeedStep
-                          .select()
-                          .where(SpeedStep.profile == step.profile, SpeedStep.temperature < step.temperature)
+                          .select_by_cooler(step.profile, step.cooler)
+                          .where(SpeedStep.temperature < step.temperature)
                           .order_by(SpeedStep.temperature.desc())
                           .limit(1))
             next_steps = (SpeedStep
-                          .select()
-                          .where(SpeedStep.profile == step.profile, SpeedStep.temperature > step.temperature)
+                          .select_by_cooler(step.profile, step.cooler)
+                          .where(SpeedStep.temperature > step.temperature)
                           .order_by(SpeedStep.temperature)
                           .limit(1))
             if not prev_steps:
@@ -19,7 +19,7 @@ import logging
 from gi.repository import Gtk
 from injector import singleton, inject
 
-from gwe.di import EditOverclockProfileBuilder
+from gwe.view.di import EditOverclockProfileBuilder
 from gwe.model.overclock_profile import OverclockProfile
 from gwe.model.overclock import Overclock
 from gwe.presenter.edit_overclock_profile_presenter import EditOverclockProfileViewInterface, \
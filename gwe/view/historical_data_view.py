@@ -23,7 +23,7 @@ from gi.repository.GObject import TYPE_DOUBLE
 from injector import singleton, inject
 
 from gwe.conf import GRAPH_COLOR_HEX
-from gwe.di import HistoricalDataBuilder
+from gwe.view.di import HistoricalDataBuilder
 from gwe.presenter.historical_data_presenter import HistoricalDataViewInterface, HistoricalDataPresenter, MONITORING_INTERVAL, \
     GraphType
 from gwe.util.view import is_dazzle_version_supported
@@ -17,7 +17,8 @@
 
 import logging
 from collections import OrderedDict
-from typing import Optional, Dict, List, Tuple, Any
+from functools import partial
+from typing import Optional, Dict, List, Tuple, Any, Set
 
 from injector import inject, singleton
 from gi.repository import Gtk
@@ -25,8 +26,9 @@ from matplotlib.figure import Figure
 from matplotlib.backends.backend_gtk3agg import FigureCanvasGTK3Agg as FigureCanvas
 
 from gwe.interactor.settings_interactor import SettingsInteractor
+from gwe.model.gpu_descriptor import GpuDescriptor
 from gwe.model.status import Status
-from gwe.model.fan_profile import FanProfile
+from gwe.model.fan_curve import FanCurve
 _LOG = logging.getLogger(__name__)
 
 try:  # AppIndicator3 may not be installed
@@ -44,10 +46,12 @@ except (ImportError, ValueError):
     except (ImportError, ValueError):
         AppIndicator3 = None
 
-from gwe.di import MainBuilder
+from gwe.view.di import MainBuilder
 from gwe.view.edit_fan_profile_view import EditFanProfileView
-from gwe.util.view import hide_on_delete, init_plot_chart, get_fan_profile_data, is_dazzle_version_supported
+from gwe.util.view import hide_on_delete, init_plot_chart, is_dazzle_version_supported
 from gwe.view.edit_overclock_profile_view import EditOverclockProfileView
+from gwe.view.call_metrics_view import CallMetricsView
+from gwe.view.gpu_processes_view import GpuProcessesView
 from gwe.view.historical_data_view import HistoricalDataView
 from gwe.view.preferences_view import PreferencesView
 from gwe.conf import APP_PACKAGE_NAME, APP_ID, APP_NAME, APP_VERSION, APP_SOURCE_URL, APP_ICON_NAME_SYMBOLIC
@@ -67,6 +71,8 @@ class MainView(MainViewInterface):
                  edit_overclock_profile_view: EditOverclockProfileView,
                  historical_data_view: HistoricalDataView,
                  preferences_view: PreferencesView,
+                 call_metrics_view: CallMetricsView,
+                 gpu_processes_view: GpuProcessesView,
                  builder: MainBuilder,
                  settings_interactor: SettingsInteractor,
                  ) -> None:
@@ -76,19 +82,27 @@ class MainView(MainViewInterface):
         self._edit_overclock_profile_view = edit_overclock_profile_view
         self._historical_data_view = historical_data_view
         self._preferences_view = preferences_view
+        self._call_metrics_view = call_metrics_view
+        self._gpu_processes_view = gpu_processes_view
         self._presenter.main_view = self
         self._builder: Gtk.Builder = builder
         self._settings_interactor = settings_interactor
         self._first_refresh = True
+        self._descriptor: Optional[GpuDescriptor] = None
+        self._gpu_index: Optional[int] = None
         self._init_widgets()
 
     def _init_widgets(self) -> None:
         self._app_indicator: Optional[AppIndicator3.Indicator] = None
+        self._app_indicator_status: Optional[Any] = None
+        self._app_indicator_label: Optional[str] = None
         self._window = self._builder.get_object("application_window")
         self._edit_fan_profile_view.set_transient_for(self._window)
         self._edit_overclock_profile_view.set_transient_for(self._window)
         self._historical_data_view.set_transient_for(self._window)
         self._preferences_view.set_transient_for(self._window)
+        self._call_metrics_view.set_transient_for(self._window)
+        self._gpu_processes_view.set_transient_for(self._window)
         self._main_menu: Gtk.Menu = self._builder.get_object("main_menu")
         self._main_infobar: Gtk.InfoBar = self._builder.get_object("main_infobar")
         self._main_infobar.connect("response", lambda b, _: b.set_revealed(False))
@@ -162,6 +176,7 @@ class MainView(MainViewInterface):
         self._fan_liststore: Gtk.ListStore = self._builder.get_object('fan_profile_liststore')
         self._overclock_liststore: Gtk.ListStore = self._builder.get_object('overclock_profile_liststore')
         self._fan_combobox: Gtk.ComboBox = self._builder.get_object('fan_profile_combobox')
+        self._gpu_combobox: Gtk.ComboBoxText = self._builder.get_object('gpu_combobox')
         self._overclock_combobox: Gtk.ComboBox = self._builder.get_object('overclock_profile_combobox')
         fan_scrolled_window: Gtk.ScrolledWindow = self._builder.get_object('fan_scrolled_window')
         self._fan_edit_button: Gtk.Button = self._builder.get_object('fan_edit_button')
@@ -191,9 +206,9 @@ class MainView(MainViewInterface):
             # purposes. I gave it the APP_NAME (should be 'gwe', maybe change it to 'GreenWithEnvy' in the future)
             self._app_indicator.set_icon_full(APP_ICON_NAME_SYMBOLIC, APP_NAME)
             if self._settings_interactor.get_bool('settings_show_app_indicator'):
-                self._app_indicator.set_status(AppIndicator3.IndicatorStatus.ACTIVE)
+                self._set_app_indicator_status(AppIndicator3.IndicatorStatus.ACTIVE)
             else:
-                self._app_indicator.set_status(AppIndicator3.IndicatorStatus.PASSIVE)
+                self._set_app_indicator_status(AppIndicator3.IndicatorStatus.PASSIVE)
             self._app_indicator.set_menu(self._main_menu)
 
     def show_main_infobar_message(self, message: str, markup: bool = False) -> None:
@@ -209,6 +224,9 @@ class MainView(MainViewInterface):
         else:
             self._window.show()
 
+    def is_window_visible(self) -> bool:
+        return bool(self._window.props.visible)
+
     def get_power_limit(self) -> Tuple[int, int]:
         return 0, self._power_limit_adjustment.get_value()
 
@@ -225,12 +243,18 @@ class MainView(MainViewInterface):
         dialog.run()
         dialog.destroy()
 
-    def refresh_status(self, status: Optional[Status], gpu_index: int) -> None:
+    def refresh_status(self, status: Optional[Status], gpu_index: int, changed: Optional[Set[str]] = None) -> None:
         _LOG.debug('view status')
         if status:
             gpu_status = status.gpu_status_list[gpu_index]
-            if self._first_refresh:
+            # Static properties are rendered only once, or again when the GPU descriptor has been re-read
+            descriptor = gpu_status.descriptor
+            if self._first_refresh or gpu_index != self._gpu_index \
+                    or (descriptor is not None and descriptor is not self._descriptor):
+                changed = None
                 self._first_refresh = False
+                self._descriptor = descriptor
+                self._gpu_index = gpu_index
                 self._set_entry_text(self._info_name_entry, gpu_status.info.name)
                 self._set_entry_text(self._info_vbios_entry, gpu_status.info.vbios)
                 self._set_entry_text(self._info_driver_entry, gpu_status.info.driver)
@@ -271,58 +295,101 @@ class MainView(MainViewInterface):
                     self._power_limit_scale.set_sensitive(False)
                     self._power_limit_apply_button.set_sensitive(False)
 
-            self._set_entry_text(self._info_pcie_entry, "{}x Gen{} @ {}x Gen{}",
-                                 gpu_status.info.pcie_max_link,
-                                 gpu_status.info.pcie_max_generation,
-                                 gpu_status.info.pcie_current_link,
-                                 gpu_status.info.pcie_current_generation)
-            self._set_entry_text(self._info_memory_entry, "{} MiB / {} MiB",
-                                 gpu_status.info.memory_used,
-                                 gpu_status.info.memory_total)
-            self._set_entry_text(self._info_memory_usage_entry, "{}%", gpu_status.info.memory_usage)
-            self._set_entry_text(self._info_gpu_usage_entry, "{}%", gpu_status.info.gpu_usage)
-            self._set_entry_text(self._info_encoder_usage_entry, "{}%", gpu_status.info.encoder_usage)
-            self._set_entry_text(self._info_decoder_usage_entry, "{}%", gpu_status.info.decoder_usage)
-            self._set_entry_text(self._power_draw_entry, "{:.2f} W", gpu_status.power.draw)
-            self._set_entry_text(self._power_limit_entry, "{:.0f} W", gpu_status.power.limit)
-            self._set_entry_text(self._power_default_entry, "{:.0f} W", gpu_status.power.default)
-            self._set_entry_text(self._power_enforced_entry, "{:.0f} W", gpu_status.power.enforced)
-            self._set_entry_text(self._clocks_graphics_current_entry, "{} MHz", gpu_status.clocks.graphic_current)
-            self._set_entry_text(self._clocks_graphics_max_entry, "{} MHz", gpu_status.clocks.graphic_max)
-            self._set_entry_text(self._clocks_sm_current_entry, "{} MHz", gpu_status.clocks.sm_current)
-            self._set_entry_text(self._clocks_sm_max_entry, "{} MHz", gpu_status.clocks.sm_max)
-            self._set_entry_text(self._clocks_memory_current_entry, "{} MHz", gpu_status.clocks.memory_current)
-            self._set_entry_text(self._clocks_memory_max_entry, "{} MHz", gpu_status.clocks.memory_max)
-            self._set_entry_text(self._clocks_video_current_entry, "{} MHz", gpu_status.clocks.video_current)
-            self._set_entry_text(self._clocks_video_max_entry, "{} MHz", gpu_status.clocks.video_max)
-            self._set_level_bar(self._info_gpu_usage_levelbar, gpu_status.info.gpu_usage)
-            self._set_level_bar(self._info_memory_usage_levelbar, gpu_status.info.memory_usage)
-            self._set_level_bar(self._info_encoder_usage_levelbar, gpu_status.info.encoder_usage)
-            self._set_level_bar(self._info_decoder_usage_levelbar, gpu_status.info.decoder_usage)
+            is_changed = partial(self._is_changed, changed)
+            if is_changed('info.pcie_max_link', 'info.pcie_max_generation',
+                          'info.pcie_current_link', 'info.pcie_current_generation'):
+                self._set_entry_text(self._info_pcie_entry, "{}x Gen{} @ {}x Gen{}",
+                                     gpu_status.info.pcie_max_link,
+                                     gpu_status.info.pcie_max_generation,
+                                     gpu_status.info.pcie_current_link,
+                                     gpu_status.info.pcie_current_generation)
+            if is_changed('info.memory_used', 'info.memory_total'):
+                self._set_entry_text(self._info_memory_entry, "{} MiB / {} MiB",
+                                     gpu_status.info.memory_used,
+                                     gpu_status.info.memory_total)
+            if is_changed('info.memory_usage'):
+                self._set_entry_text(self._info_memory_usage_entry, "{}%", gpu_status.info.memory_usage)
+                self._set_level_bar(self._info_memory_usage_levelbar, gpu_status.info.memory_usage)
+            if is_changed('info.gpu_usage'):
+                self._set_entry_text(self._info_gpu_usage_entry, "{}%", gpu_status.info.gpu_usage)
+                self._set_level_bar(self._info_gpu_usage_levelbar, gpu_status.info.gpu_usage)
+            if is_changed('info.encoder_usage'):
+                self._set_entry_text(self._info_encoder_usage_entry, "{}%", gpu_status.info.encoder_usage)
+                self._set_level_bar(self._info_encoder_usage_levelbar, gpu_status.info.encoder_usage)
+            if is_changed('info.decoder_usage'):
+                self._set_entry_text(self._info_decoder_usage_entry, "{}%", gpu_status.info.decoder_usage)
+                self._set_level_bar(self._info_decoder_usage_levelbar, gpu_status.info.decoder_usage)
+            if is_changed('power.draw'):
+                self._set_entry_text(self._power_draw_entry, "{:.2f} W", gpu_status.power.draw)
+            if is_changed('power.limit'):
+                self._set_entry_text(self._power_limit_entry, "{:.0f} W", gpu_status.power.limit)
+            if is_changed('power.default'):
+                self._set_entry_text(self._power_default_entry, "{:.0f} W", gpu_status.power.default)
+            if is_changed('power.enforced'):
+                self._set_entry_text(self._power_enforced_entry, "{:.0f} W", gpu_status.power.enforced)
+            if is_changed('clocks.graphic_current'):
+                self._set_entry_text(self._clocks_graphics_current_entry, "{} MHz", gpu_status.clocks.graphic_current)
+            if is_changed('clocks.graphic_max'):
+                self._set_entry_text(self._clocks_graphics_max_entry, "{} MHz", gpu_status.clocks.graphic_max)
+            if is_changed('clocks.sm_current'):
+                self._set_entry_text(self._clocks_sm_current_entry, "{} MHz", gpu_status.clocks.sm_current)
+            if is_changed('clocks.sm_max'):
+                self._set_entry_text(self._clocks_sm_max_entry, "{} MHz", gpu_status.clocks.sm_max)
+            if is_changed('clocks.memory_current'):
+                self._set_entry_text(self._clocks_memory_current_entry, "{} MHz", gpu_status.clocks.memory_current)
+            if is_changed('clocks.memory_max'):
+                self._set_entry_text(self._clocks_memory_max_entry, "{} MHz", gpu_status.clocks.memory_max)
+            if is_changed('clocks.video_current'):
+                self._set_entry_text(self._clocks_video_current_entry, "{} MHz", gpu_status.clocks.video_current)
+            if is_changed('clocks.video_max'):
+                self._set_entry_text(self._clocks_video_max_entry, "{} MHz", gpu_status.clocks.video_max)
             if gpu_status.overclock.available:
-                self._set_entry_text(self._overclock_gpu_offset_entry, "{} MHz", gpu_status.overclock.gpu_offset)
-                self._set_entry_text(self._overclock_mem_offset_entry, "{} MHz", gpu_status.overclock.memory_offset)
-            self._set_label_markup(self._temp_gpu_value,
-                                   "<span size=\"xx-large\">{}</span> °C", gpu_status.temp.gpu)
-            for index, value in enumerate(self._fan_duty):
-                if gpu_status.fan.fan_list and index < len(gpu_status.fan.fan_list):
-                    self._set_label_markup(value,
-                                           "<span size=\"large\">{}</span> %", gpu_status.fan.fan_list[index][0])
-                    self._set_label_markup(self._fan_rpm[index],
-                                           "<span size=\"large\">{}</span> RPM", gpu_status.fan.fan_list[index][1])
-                else:
-                    value.set_visible(False)
-                    self._fan_rpm[index].set_visible(False)
+                if is_changed('overclock.available', 'overclock.gpu_offset'):
+                    self._set_entry_text(self._overclock_gpu_offset_entry, "{} MHz", gpu_status.overclock.gpu_offset)
+                if is_changed('overclock.available', 'overclock.memory_offset'):
+                    self._set_entry_text(self._overclock_mem_offset_entry, "{} MHz",
+                                         gpu_status.overclock.memory_offset)
+            if is_changed('temp.gpu'):
+                self._set_label_markup(self._temp_gpu_value,
+                                       "<span size=\"xx-large\">{}</span> °C", gpu_status.temp.gpu)
+            if is_changed('fan.fan_list'):
+                for index, value in enumerate(self._fan_duty):
+                    if gpu_status.fan.fan_list and index < len(gpu_status.fan.fan_list):
+                        value.set_visible(True)
+                        self._fan_rpm[index].set_visible(True)
+                        self._set_label_markup(value,
+                                               "<span size=\"large\">{}</span> %", gpu_status.fan.fan_list[index][0])
+                        self._set_label_markup(self._fan_rpm[index],
+                                               "<span size=\"large\">{}</span> RPM",
+                                               gpu_status.fan.fan_list[index][1])
+                    else:
+                        value.set_visible(False)
+                        self._fan_rpm[index].set_visible(False)
 
             if self._app_indicator:
                 if self._settings_interactor.get_bool('settings_show_app_indicator'):
-                    self._app_indicator.set_status(AppIndicator3.IndicatorStatus.ACTIVE)
+                    self._set_app_indicator_status(AppIndicator3.IndicatorStatus.ACTIVE)
                 else:
-                    self._app_indicator.set_status(AppIndicator3.IndicatorStatus.PASSIVE)
+                    self._set_app_indicator_status(AppIndicator3.IndicatorStatus.PASSIVE)
                 if self._settings_interactor.get_bool('settings_app_indicator_show_gpu_temp') and gpu_status.temp.gpu:
-                    self._app_indicator.set_label(f" {gpu_status.temp.gpu}°C", " XX°C")
+                    self._set_app_indicator_label(f" {gpu_status.temp.gpu}°C")
                 else:
-                    self._app_indicator.set_label("", "")
+                    self._set_app_indicator_label("")
+
+    @staticmethod
+    def _is_changed(changed: Optional[Set[str]], *fields: str) -> bool:
+        return changed is None or not changed.isdisjoint(fields)
+
+    # The indicator settings can change without a status change, so it's compared with what was last applied
+    def _set_app_indicator_status(self, status: Any) -> None:
+        if self._app_indicator is not None and status != self._app_indicator_status:
+            self._app_indicator_status = status
+            self._app_indicator.set_status(status)
+
+    def _set_app_indicator_label(self, label: str) -> None:
+        if self._app_indicator is not None and label != self._app_indicator_label:
+            self._app_indicator_label = label
+            self._app_indicator.set_label(label, " XX°C" if label else "")
 
     @staticmethod
     def _set_entry_text(label: Gtk.Entry, text: Optional[str], *args: Any) -> None:
@@ -358,14 +425,14 @@ class MainView(MainViewInterface):
             levelbar.set_value(0)
             levelbar.set_sensitive(False)
 
-    def refresh_chart(self, profile: Optional[FanProfile] = None, reset: bool = False) -> None:
-        if profile is None and reset is None:
+    def refresh_chart(self, curve: Optional[FanCurve] = None, reset: bool = False) -> None:
+        if curve is None and reset is None:
             raise ValueError("Both parameters are note!")
 
         if reset:
             self._plot_chart({})
-        else:
-            self._plot_chart(get_fan_profile_data(profile))
+        elif curve is not None:
+            self._plot_chart(curve.get_chart_data())
 
     def refresh_fan_profile_combobox(self, data: List[Tuple[int, str]], active: Optional[int]) -> None:
         self._fan_liststore.clear()
@@ -378,6 +445,13 @@ class MainView(MainViewInterface):
         else:
             self.refresh_chart(reset=True)
 
+    def refresh_gpu_combobox(self, names: List[str], active: int) -> None:
+        self._gpu_combobox.remove_all()
+        for name in names:
+            self._gpu_combobox.append_text(name)
+        self._gpu_combobox.set_active(active)
+        self._gpu_combobox.set_visible(len(names) > 1)
+
     def set_apply_fan_profile_button_enabled(self, enabled: bool) -> None:
         self._fan_apply_button.set_sensitive(enabled)
 
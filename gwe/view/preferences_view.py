@@ -20,7 +20,7 @@ from typing import Dict, Any
 from gi.repository import Gtk
 from injector import singleton, inject
 
-from gwe.di import PreferencesBuilder
+from gwe.view.di import PreferencesBuilder
 from gwe.presenter.preferences_presenter import PreferencesViewInterface, PreferencesPresenter
 from gwe.util.deployment import is_flatpak
 from gwe.util.view import hide_on_delete
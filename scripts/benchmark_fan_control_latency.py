@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Measures the sample→write latency of the fan control while the GTK main loop is stalled, e.g. by a modal dialog or
+# a slow chart redraw. The samples of the simulated backend are handed to the FanController in two ways:
+#  - poller: straight from the polling thread, like GetStatusInteractor does
+#  - main loop: through a thread standing in for the GTK main loop, which stalls for STALL_S once, like the fan
+#    control did when it ran in MainPresenter
+# The latency of a sample goes from the end of its poll to the submission of a write for it or for a newer sample
+# (the controller skips the samples it can't keep up with). The 50 ms coalescing window of the FanCommandCoalescer
+# comes on top of it in both cases.
+#
+# Usage: python3 scripts/benchmark_fan_control_latency.py [STALL_S] [SAMPLE_COUNT]
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Callable, Tuple, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# pylint: disable=wrong-import-position
+from gwe.model.fan_curve import FanCurve  # noqa: E402
+from gwe.model.status import Status  # noqa: E402
+from gwe.repository.fan_controller import FanController  # noqa: E402
+from gwe.repository.simulated_backend import SimulatedBackend  # noqa: E402
+
+STALL_S = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+SAMPLE_COUNT = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+POLL_INTERVAL_S = 0.05
+# duty == temperature, so that every sample asks for a different duty and the write tells which sample caused it
+IDENTITY_CURVE = FanCurve(None, [(0, 0), (100, 100)])
+
+
+class _RecordingCoalescer:
+    def __init__(self) -> None:
+        self.writes: List[Tuple[int, float]] = []
+
+    def submit_batch(self, commands: Dict[int, Tuple[int, bool]]) -> None:
+        for speed, manual_control in commands.values():
+            if manual_control:
+                self.writes.append((speed, time.perf_counter()))
+
+    @staticmethod
+    def take_results() -> Dict[Tuple[int, Optional[int]], bool]:
+        # Every sample asks for a new duty, the outcome of the previous writes doesn't matter
+        return {}
+
+
+def _samples() -> List[Status]:
+    backend = SimulatedBackend(gpu_count=1, latency_ms=0)
+    samples = []
+    for index in range(SAMPLE_COUNT):
+        status = backend.get_status()
+        gpu_status = status.gpu_status_list[0]
+        gpu_status.temp.gpu = index + 1
+        gpu_status.fan.control_allowed = True
+        gpu_status.fan.fan_list = [(0, 0)]
+        samples.append(status)
+    return samples
+
+
+def _run(deliver: Callable[[FanController, Status], None]) -> Tuple[int, List[float]]:
+    poll_times: Dict[int, float] = {}
+    coalescer = _RecordingCoalescer()
+    controller = FanController(coalescer)
+    samples = _samples()
+    controller.set_fan_curve(samples[0].gpu_status_list[0].info.uuid, IDENTITY_CURVE)
+    for status in samples:
+        time.sleep(POLL_INTERVAL_S)
+        poll_times[status.gpu_status_list[0].temp.gpu] = time.perf_counter()
+        deliver(controller, status)
+    time.sleep(STALL_S + 0.2)
+    controller.stop()
+    latencies = [next(write_time for speed, write_time in coalescer.writes if speed >= temp) - poll_time
+                 for temp, poll_time in poll_times.items()]
+    return len(coalescer.writes), latencies
+
+
+def _through_main_loop() -> Callable[[FanController, Status], None]:
+    main_loop: queue.Queue = queue.Queue()
+
+    def run_main_loop() -> None:
+        stalled = False
+        while True:
+            controller, status = main_loop.get()
+            if not stalled and status.gpu_status_list[0].temp.gpu >= SAMPLE_COUNT // 2:
+                stalled = True
+                time.sleep(STALL_S)
+            controller.submit(status)
+
+    threading.Thread(target=run_main_loop, daemon=True).start()
+    return lambda controller, status: main_loop.put((controller, status))
+
+
+def main() -> None:
+    print(f"{SAMPLE_COUNT} samples every {POLL_INTERVAL_S * 1000:.0f} ms, main loop stalled once for {STALL_S} s")
+    print(f"{'':<10} {'writes':>7} {'mean ms':>8} {'max ms':>8}")
+    for label, deliver in (('poller', lambda controller, status: controller.submit(status)),
+                           ('main loop', _through_main_loop())):
+        write_count, latencies = _run(deliver)
+        print(f"{label:<10} {write_count:>7} {sum(latencies) / len(latencies) * 1000:>8.2f} "
+              f"{max(latencies) * 1000:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# Replays one hour of a noisy temperature trace, alternating idle and load every 10 minutes, through the fan control
+# with different smoothing and limiter settings, and reports the fan writes per hour together with how far the
+# written duty strays from the curve evaluated on the noise-free temperature.
+#
+# Usage: python3 scripts/benchmark_fan_writes.py [POLL_INTERVAL_S] [NOISE_C]
+import math
+import random
+import sys
+import types
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# pylint: disable=wrong-import-position
+from gwe.model.fan_curve import FanCurve  # noqa: E402
+from gwe.repository import fan_controller  # noqa: E402
+from gwe.repository.fan_controller import FanController  # noqa: E402
+from gwe.repository.simulated_backend import SimulatedBackend  # noqa: E402
+
+POLL_INTERVAL_S = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+NOISE_C = float(sys.argv[2]) if len(sys.argv) > 2 else 0.7
+DURATION_S = 3600
+# The default "Custom" profile
+CURVE = FanCurve(None, [(20, 0), (30, 25), (40, 45), (65, 70), (70, 90), (75, 100)])
+# (label, hysteresis, smoothing samples, median, max slew, min dwell)
+CONFIGURATIONS = [
+    ('no filtering', 0, 1, False, 0, 0),
+    ('hysteresis 2', 2, 1, False, 0, 0),
+    ('+ EMA 5', 2, 5, False, 0, 0),
+    ('+ median 5', 2, 5, True, 0, 0),
+    ('+ EMA 5, 2%/s, 10 s', 2, 5, False, 2, 10),
+]
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return self.now
+
+
+class _CountingCoalescer:
+    """Drops the commands equal to the last one, like FanCommandCoalescer"""
+
+    def __init__(self) -> None:
+        self.duty: Optional[int] = None
+        self.write_count = 0
+        self.results: Dict[Tuple[int, Optional[int]], bool] = {}
+
+    def submit_batch(self, commands: Dict[Tuple[int, Optional[int]], Tuple[int, bool]]) -> None:
+        for target, (speed, manual_control) in commands.items():
+            duty = speed if manual_control else None
+            if duty != self.duty:
+                self.duty = duty
+                self.write_count += 1
+            self.results[target] = True
+
+    def take_results(self) -> Dict[Tuple[int, Optional[int]], bool]:
+        results = self.results
+        self.results = {}
+        return results
+
+    def invalidate(self, _: Optional[List[int]] = None) -> None:
+        self.duty = None
+
+
+def _trace() -> List[Tuple[float, int]]:
+    rng = random.Random(42)
+    trace = []
+    temp = 40.0
+    for step in range(int(DURATION_S / POLL_INTERVAL_S)):
+        timestamp = step * POLL_INTERVAL_S
+        target = 75.0 if (timestamp // 600) % 2 else 40.0
+        temp += (target - temp) * (1 - math.exp(-POLL_INTERVAL_S / 30))
+        trace.append((temp, round(temp + rng.gauss(0, NOISE_C))))
+    return trace
+
+
+def main() -> None:
+    clock = _Clock()
+    fan_controller.time = types.SimpleNamespace(monotonic=clock.monotonic, perf_counter=clock.perf_counter,
+                                                time=clock.time)
+    status = SimulatedBackend(gpu_count=1, latency_ms=0).get_status()
+    gpu_status = status.gpu_status_list[0]
+    gpu_status.fan.control_allowed = True
+    trace = _trace()
+    print(f"Poll every {POLL_INTERVAL_S} s, sensor noise {NOISE_C} °C")
+    print(f"{'':<22} {'writes/h':>9} {'mean error %':>13}")
+    for label, hysteresis, samples, median, max_slew, min_dwell in CONFIGURATIONS:
+        coalescer = _CountingCoalescer()
+        controller = FanController(coalescer)
+        curves = {gpu_status.info.uuid: CURVE}
+        error = 0.0
+        for index, (true_temp, measured_temp) in enumerate(trace):
+            clock.now = index * POLL_INTERVAL_S
+            gpu_status.timestamp = clock.now
+            gpu_status.temp.gpu = measured_temp
+            gpu_status.fan.fan_list = [(coalescer.duty or 0, 0)]
+            gpu_status.fan.manual_control = coalescer.duty is not None
+            # pylint: disable=protected-access
+            commands = controller._control(status, curves, hysteresis, (samples, median), (max_slew, min_dwell))
+            coalescer.submit_batch(commands)
+            error += abs((coalescer.duty or 0) - CURVE.get_duty(true_temp))
+        print(f"{label:<22} {coalescer.write_count * 3600 / DURATION_S:>9.0f} {error / len(trace):>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# Measures how many Status fields change between two refreshes, i.e. how many widgets the main window still has to
+# update now that it only applies the changed fields, and how long computing the delta takes. The "idle" stream
+# repeats the same reading with only the power draw moving, like a GPU sitting at the desktop.
+#
+# Usage: python3 scripts/benchmark_status_diff.py [GPU_COUNT] [SAMPLE_COUNT]
+import copy
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# pylint: disable=wrong-import-position
+from gwe.model.status import Status  # noqa: E402
+from gwe.repository.simulated_backend import SimulatedBackend  # noqa: E402
+from gwe.util.status_diff import StatusDiffer, get_changed_fields  # noqa: E402
+
+GPU_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+SAMPLE_COUNT = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+
+def _simulated_stream(backend: SimulatedBackend) -> List[Status]:
+    return [backend.get_status() for _ in range(SAMPLE_COUNT)]
+
+
+def _idle_stream(backend: SimulatedBackend) -> List[Status]:
+    template = backend.get_status()
+    stream = []
+    for _ in range(SAMPLE_COUNT):
+        status = copy.deepcopy(template)
+        for gpu_status in status.gpu_status_list:
+            gpu_status.power.draw = round(random.uniform(20, 22), 2)
+        stream.append(status)
+    return stream
+
+
+def _measure(stream: List[Status]) -> Tuple[float, float]:
+    differ = StatusDiffer()
+    differ.diff(stream[0])
+    changed_count = 0
+    start_time = time.perf_counter()
+    for status in stream[1:]:
+        changed_count += sum(len(fields) for fields in differ.diff(status).values())
+    elapsed = time.perf_counter() - start_time
+    refreshes = (len(stream) - 1) * GPU_COUNT
+    return changed_count / refreshes, elapsed / (len(stream) - 1) * 1000000
+
+
+def main() -> None:
+    backend = SimulatedBackend(gpu_count=GPU_COUNT, latency_ms=0)
+    total_fields = len(get_changed_fields(None, backend.get_status().gpu_status_list[0]))
+    print(f"{GPU_COUNT} GPU(s), {SAMPLE_COUNT} refreshes, {total_fields} fields per GPU")
+    print(f"{'':<10} {'changed/GPU':>12} {'updated':>8} {'us/diff':>8}")
+    for label, stream in (('simulated', _simulated_stream(backend)), ('idle', _idle_stream(backend))):
+        changed, micros = _measure(stream)
+        print(f"{label:<10} {changed:>12.1f} {changed / total_fields * 100:>7.0f}% {micros:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# Compares the memory footprint and the allocations of the Status samples built by the simulated backend, with the
+# slotted model classes (current) and with dict-backed copies of the same classes (before __slots__ was added).
+#
+# Usage: python3 scripts/benchmark_status_memory.py [GPU_COUNT] [SAMPLE_COUNT]
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# pylint: disable=wrong-import-position
+from gwe.repository import simulated_backend  # noqa: E402
+from gwe.repository.simulated_backend import SimulatedBackend  # noqa: E402
+
+MODEL_CLASS_NAMES = ('Status', 'GpuStatus', 'Info', 'Power', 'Temp', 'Clocks', 'Fan', 'Overclock')
+GPU_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+SAMPLE_COUNT = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+
+def _dict_backed_classes() -> Dict[str, type]:
+    return {name: type(name, (), {'__init__': getattr(simulated_backend, name).__init__})
+            for name in MODEL_CLASS_NAMES}
+
+
+def _measure(backend: SimulatedBackend) -> Tuple[float, float, float]:
+    tracemalloc.start()
+    samples: List[object] = []
+    start_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    start_size = tracemalloc.get_traced_memory()[0]
+    start_time = time.perf_counter()
+    for _ in range(SAMPLE_COUNT):
+        samples.append(backend.get_status())
+    elapsed = time.perf_counter() - start_time
+    size = tracemalloc.get_traced_memory()[0] - start_size
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename')) - start_blocks
+    tracemalloc.stop()
+    return size / SAMPLE_COUNT, blocks / SAMPLE_COUNT, elapsed / SAMPLE_COUNT * 1000000
+
+
+def main() -> None:
+    slotted_classes = {name: getattr(simulated_backend, name) for name in MODEL_CLASS_NAMES}
+    results = {}
+    for label, classes in (('dict-backed', _dict_backed_classes()), ('slotted', slotted_classes)):
+        for name, cls in classes.items():
+            setattr(simulated_backend, name, cls)
+        backend = SimulatedBackend(gpu_count=GPU_COUNT)
+        backend.get_status()  # Warm up
+        results[label] = _measure(backend)
+    print(f"{GPU_COUNT} GPU(s), {SAMPLE_COUNT} samples retained")
+    print(f"{'':<12} {'bytes/sample':>14} {'blocks/sample':>14} {'us/sample':>10}")
+    for label, (size, blocks, micros) in results.items():
+        print(f"{label:<12} {size:>14.0f} {blocks:>14.1f} {micros:>10.1f}")
+    before, after = results['dict-backed'][0], results['slotted'][0]
+    print(f"Footprint per sample: {after / before * 100:.0f}% of the dict-backed one")
+
+
+if __name__ == '__main__':
+    main()